@@ -3,10 +3,11 @@
 This module sets up the FastAPI application and includes all routers.
 """
 
+import asyncio
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
-from starlette.middleware.cache import CacheMiddleware
 
 from core.config import (
     PROJECT_NAME,
@@ -14,6 +15,7 @@
     CORS_ORIGINS,
     API_V1_PREFIX
 )
+from core.middleware.response_cache import CachePolicy, ResponseCacheMiddleware
 
 # Import routers
 from .v1.endpoints import (
@@ -21,9 +23,30 @@
     users,
     items,
     recommendations,
-    interactions
+    interactions,
+    cache
 )
 
+def response_cache_policies() -> dict:
+    """Per-route HTTP cache policies, longest matching prefix wins."""
+    from core.config import settings
+    from services.recommendation_cache import SIMILAR_ITEMS_TTL, TRENDING_TTL
+    return {
+        f"{API_V1_PREFIX}/recommendations": CachePolicy(ttl=settings.RESPONSE_CACHE_TTL),
+        f"{API_V1_PREFIX}/recommendations/trending": CachePolicy(ttl=TRENDING_TTL),
+        # The only unauthenticated route, so one cached copy serves everyone
+        f"{API_V1_PREFIX}/recommendations/similar": CachePolicy(ttl=SIMILAR_ITEMS_TTL, per_user=False),
+        f"{API_V1_PREFIX}/items": CachePolicy(ttl=settings.RESPONSE_CACHE_TTL),
+    }
+
+def response_cache_backend():
+    """Shared Redis-backed SmartCache, or None for a per-process memory cache."""
+    from core.config import settings
+    if settings.RESPONSE_CACHE_BACKEND != "redis":
+        return None
+    from core.cache import cache as smart_cache
+    return smart_cache
+
 def create_app() -> FastAPI:
     """Create and configure the FastAPI application."""
     app = FastAPI(
@@ -34,7 +57,14 @@ def create_app() -> FastAPI:
         openapi_url="/api/openapi.json"
     )
     
-    # Add middleware
+    # Add middleware (the last one added is the outermost). The response
+    # cache sits inside CORS and GZip, so cached bodies are uncompressed and
+    # CORS headers are computed per request, never replayed to another origin.
+    app.add_middleware(
+        ResponseCacheMiddleware,
+        policies=response_cache_policies(),
+        cache=response_cache_backend()
+    )
     app.add_middleware(
         CORSMiddleware,
         allow_origins=CORS_ORIGINS,
@@ -43,11 +73,6 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
     app.add_middleware(GZipMiddleware, minimum_size=1000)
-    app.add_middleware(
-        CacheMiddleware,
-        cache_control="max-age=3600",
-        vary_on=["accept-encoding", "accept-language"]
-    )
     
     # Include routers
     app.include_router(
@@ -75,6 +100,45 @@ def create_app() -> FastAPI:
         prefix=f"{API_V1_PREFIX}/interactions",
         tags=["Interactions"]
     )
+    app.include_router(
+        cache.router,
+        prefix=f"{API_V1_PREFIX}/admin/cache",
+        tags=["Cache"]
+    )
+    
+    @app.on_event("startup")
+    async def start_cache_invalidation():
+        """Subscribe to cross-worker cache invalidations before serving requests."""
+        from starlette.concurrency import run_in_threadpool
+        from core.cache import cache as smart_cache
+        # The subscribe call blocks on Redis, so keep it off the event loop
+        await run_in_threadpool(smart_cache.start_invalidation_listener)
+    
+    @app.on_event("startup")
+    async def start_cache_warmer():
+        """Warm recommendation caches in the background after a deploy."""
+        from core.config import settings
+        if not settings.CACHE_WARM_ON_STARTUP:
+            return
+        from core.database import SessionLocal
+        from services.recommendation_cache import CacheWarmer
+        warmer = CacheWarmer(
+            SessionLocal,
+            concurrency=settings.CACHE_WARM_CONCURRENCY,
+            rate_per_second=settings.CACHE_WARM_RATE
+        )
+        if settings.CACHE_WARM_INTERVAL:
+            app.state.cache_warmer = asyncio.ensure_future(
+                warmer.run_forever(settings.CACHE_WARM_INTERVAL)
+            )
+        else:
+            app.state.cache_warmer = asyncio.ensure_future(warmer.warm())
+    
+    @app.on_event("shutdown")
+    async def stop_cache_warmer():
+        task = getattr(app.state, "cache_warmer", None)
+        if task is not None:
+            task.cancel()
     
     @app.get("/health")
     async def health_check():
@@ -0,0 +1,40 @@
+"""
+Cache administration endpoints.
+Hit ratios and the hottest keys of this worker's cache, for sizing TTLs and memory.
+"""
+
+from typing import Any, Dict, List
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from core.cache import cache
+from core.security import get_current_user
+from models.user import User
+
+router = APIRouter()
+
+
+def require_admin(current_user: User = Depends(get_current_user)) -> User:
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="You are not authorized to inspect the cache")
+    return current_user
+
+
+@router.get("/top-keys")
+async def get_top_keys(
+    limit: int = Query(20, ge=1, le=500),
+    current_user: User = Depends(require_admin)
+) -> List[Dict[str, Any]]:
+    """
+    Most hit cache keys in this worker (approximate counts).
+
+    - **limit**: Number of keys to return (maximum 500)
+    """
+    return cache.top_keys(limit)
+
+
+@router.get("/stats")
+async def get_cache_stats(current_user: User = Depends(require_admin)) -> Dict[str, Any]:
+    """
+    Hit and miss counts per cache tier in this worker.
+    """
+    return cache.stats()
@@ -6,16 +6,26 @@
 from typing import Any, List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
 from sqlalchemy.orm import Session
-from redis import Redis
-from datetime import timedelta
+from starlette.concurrency import run_in_threadpool
 
+from core.cache import cache
 from core.database import get_db
-from core.redis import get_redis
 from core.security import get_current_user
 from core.rate_limit import rate_limit
 from models.user import User
 from schemas.recommendation import RecommendationResponse
 from services.recommendation import RecommendationService
+from services.recommendation_cache import (
+    RECOMMENDATIONS_TTL,
+    SIMILAR_ITEMS_TTL,
+    TRENDING_TTL,
+    load_recommendations,
+    load_similar_items,
+    load_trending_items,
+    recommendations_key,
+    similar_items_key,
+    trending_key,
+)
 
 router = APIRouter()
 recommendation_service = RecommendationService()
@@ -26,7 +36,6 @@ async def get_recommendations(
     user_id: int,
     limit: int = 10,
     db: Session = Depends(get_db),
-    redis: Redis = Depends(get_redis),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -39,23 +48,18 @@ async def get_recommendations(
     if current_user.id != user_id:
         raise HTTPException(status_code=403, detail="You are not authorized to access these recommendations")
     
-    # Try getting from cache
-    cache_key = f"recommendations:{user_id}:{limit}"
-    cached_recommendations = redis.get(cache_key)
+    # Try getting from cache (also filled by the cache warmer)
+    cache_key = recommendations_key(user_id, limit)
+    cached_recommendations = await cache.aget(cache_key)
     
-    if cached_recommendations:
+    if cached_recommendations is not None:
         return cached_recommendations
     
-    # Get from database
-    service = RecommendationService(db)
-    recommendations = await service.get_recommendations(user_id, limit)
+    # Get from database (blocking SQLAlchemy I/O runs off the event loop)
+    recommendations = await run_in_threadpool(load_recommendations, db, user_id, limit)
     
     # Store in cache for 1 hour
-    redis.setex(
-        cache_key,
-        timedelta(hours=1),
-        recommendations
-    )
+    await cache.aset(cache_key, recommendations, RECOMMENDATIONS_TTL, tags=[f"user:{user_id}"])
     
     return recommendations
 
@@ -81,8 +85,7 @@ async def train_model(
 async def get_similar_items(
     item_id: int,
     limit: int = 10,
-    db: Session = Depends(get_db),
-    redis: Redis = Depends(get_redis)
+    db: Session = Depends(get_db)
 ):
     """
     Get similar items
@@ -90,23 +93,18 @@ async def get_similar_items(
     - **item_id**: ID of the item
     - **limit**: Number of items to return (maximum 50)
     """
-    # Try getting from cache
-    cache_key = f"similar_items:{item_id}:{limit}"
-    cached_items = redis.get(cache_key)
+    # Try getting from cache (also filled by the cache warmer)
+    cache_key = similar_items_key(item_id, limit)
+    cached_items = await cache.aget(cache_key)
     
-    if cached_items:
+    if cached_items is not None:
         return cached_items
     
-    # Get from database
-    service = RecommendationService(db)
-    similar_items = await service.get_similar_items(item_id, limit)
+    # Get from database (blocking SQLAlchemy I/O runs off the event loop)
+    similar_items = await run_in_threadpool(load_similar_items, db, item_id, limit)
     
     # Store in cache for 30 minutes
-    redis.setex(
-        cache_key,
-        timedelta(minutes=30),
-        similar_items
-    )
+    await cache.aset(cache_key, similar_items, SIMILAR_ITEMS_TTL, tags=[f"item:{item_id}"])
     
     return similar_items
 
@@ -121,11 +119,13 @@ async def get_trending_items(
     """
     Get trending items.
     """
-    recommendations = recommendation_service.get_trending_items(
-        db=db,
-        skip=skip,
-        limit=limit
-    )
+    cache_key = trending_key(skip, limit)
+    cached_items = await cache.aget(cache_key)
+    if cached_items is not None:
+        return cached_items
+    
+    recommendations = await run_in_threadpool(load_trending_items, db, skip, limit)
+    await cache.aset(cache_key, recommendations, TRENDING_TTL, tags=["ns:trending"])
     return recommendations
 
 @router.get("/category/{category}", response_model=List[RecommendationResponse])
@@ -140,7 +140,8 @@ async def get_category_recommendations(
     """
     Get recommendations for a specific category.
     """
-    recommendations = recommendation_service.get_category_recommendations(
+    recommendations = await run_in_threadpool(
+        recommendation_service.get_category_recommendations,
         db=db,
         category=category,
         user_id=current_user.id,
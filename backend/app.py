@@ -9,12 +9,12 @@
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
-from fastapi.middleware.cache import CacheMiddleware
 from fastapi.responses import JSONResponse
 from fastapi.websockets import WebSocket
 import time
 from .api.routes import router
 from .utils.config import settings
+from .core.middleware.response_cache import CachePolicy, ResponseCacheMiddleware
 import asyncio
 from typing import List, Dict
 import logging
@@ -68,17 +68,22 @@ async def lifespan(app: FastAPI):
     lifespan=lifespan
 )
 
-# Middleware
+# Middleware (the last one added is the outermost); the response cache sits
+# inside CORS so Access-Control-* headers are never cached across origins
+app.add_middleware(
+    ResponseCacheMiddleware,
+    policies={"/api/v1/": CachePolicy(ttl=60)}
+)
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
+    # Wildcard origins are not allowed together with credentials
+    allow_origins=[o.strip() for o in os.getenv("CORS_ORIGINS", "http://localhost:3000").split(",") if o.strip()],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
 )
 
 app.add_middleware(GZipMiddleware, minimum_size=1000)
-app.add_middleware(CacheMiddleware, cache_timeout=60)
 
 # Performance monitoring middleware
 @app.middleware("http")
@@ -1,22 +1,72 @@
 """
 نظام التخزين المؤقت الذكي
+
+طبقتان: ذاكرة محلية (L1) داخل كل عامل أمام Redis (L2). عند set/delete
+يُنشر المفتاح على قناة pub/sub فتحذفه بقية العمال من طبقتها المحلية.
+تحفظ L1 القيم مرمَّزة وتفك ترميزها عند كل إصابة، فكل مستدعٍ يحصل على
+نسخته الخاصة كما في Redis ولا يُفسد تعديلُها المدخل المشترك.
 """
-from typing import Any, Optional, Callable
-from functools import wraps
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Callable, Tuple
+import inspect
 import json
+import threading
+import time
+import uuid
+import warnings
 from datetime import datetime, timedelta
 import hashlib
 
 from redis import Redis
+
+try:
+    from redis import asyncio as aioredis
+except ImportError:  # pragma: no cover - redis-py < 4.2
+    aioredis = None
+from core.cache_codecs import CacheCodec
+from core.cache_metrics import CacheMetrics, default_metrics
+from core.cache_refresh import CachedLoader
 from core.config import settings
+from core.local_cache import LocalCache
 from utils.logger import logger
 
-class SmartCache:
+_MISSING = object()
+
+class SmartCache(CachedLoader):
     """مدير التخزين المؤقت الذكي"""
     
-    def __init__(self, redis_client: Redis):
+    def __init__(
+        self,
+        redis_client: Redis,
+        async_client: Optional[Any] = None,
+        l1_max_entries: int = 1024,
+        l1_ttl: float = 30.0,
+        invalidation_channel: str = "cache:invalidate",
+        codec: str = "auto",
+        compression: str = "auto",
+        compress_threshold: int = 1024,
+        metrics: Optional[CacheMetrics] = None
+    ):
+        super().__init__()
         self.redis = redis_client
+        # عميل redis.asyncio للمسارات غير المتزامنة؛ بدونه تستخدم العميل المتزامن
+        self.aredis = async_client
         self.default_ttl = 300  # 5 دقائق
+        # الترميز والضغط مسجلان في رأس كل قيمة، فتُقرأ القيم دون معرفة إعدادات الكاتب
+        self.codec = CacheCodec(codec, compression, compress_threshold)
+        # مقاييس Prometheus حسب البادئة وأكثر المفاتيح طلباً
+        self.metrics = metrics or default_metrics()
+        # فهارس الوسوم تعيش أطول من أي مدخل مسجل فيها
+        self.tag_ttl = 24 * 3600
+        # L1 لا يحتفظ بالقيمة أطول من l1_ttl ولا أطول من المتبقي من TTL في Redis
+        self.l1 = LocalCache(l1_max_entries, l1_ttl, on_evict=self.metrics.eviction)
+        self.l2_hits = 0
+        self.l2_misses = 0
+        self.invalidation_channel = invalidation_channel
+        self.instance_id = uuid.uuid4().hex
+        self.l1_enabled = True
+        self._subscriber = None
+        self._subscriber_lock = threading.Lock()
+        self._subscribing = False
     
     def _generate_key(self, prefix: str, *args, **kwargs) -> str:
         """توليد مفتاح فريد للتخزين المؤقت"""
@@ -27,107 +77,429 @@ def _generate_key(self, prefix: str, *args, **kwargs) -> str:
         if kwargs:
             key_parts.extend([f"{k}:{v}" for k, v in sorted(kwargs.items())])
         
-        # إنشاء هاش
+        # إنشاء هاش (البادئة تبقى مقروءة لأغراض المراقبة)
         key_string = ":".join(key_parts)
-        return f"cache:{hashlib.md5(key_string.encode()).hexdigest()}"
+        return f"cache:{prefix}:{hashlib.md5(key_string.encode()).hexdigest()}"
+
+    @staticmethod
+    def _tag_key(tag: str) -> str:
+        # مجموعة مرتبة: المفتاح -> وقت انتهاء صلاحيته
+        return f"cache:tags:{tag}"
     
     def get(self, key: str) -> Optional[Any]:
         """الحصول على قيمة من التخزين المؤقت"""
-        try:
-            data = self.redis.get(key)
-            if data:
-                return json.loads(data)
-            return None
-        except Exception as e:
-            logger.log_error(e, {"cache_key": key})
-            return None
-    
+        return self._lookup(key)[0]
+
+    async def aget(self, key: str) -> Optional[Any]:
+        """نسخة غير متزامنة من get"""
+        return (await self._alookup(key))[0]
+
+    def mget(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """قيم عدة مفاتيح برحلة واحدة إلى Redis؛ المفاتيح الغائبة لا تظهر في الناتج"""
+        return {k: v for k, (v, _) in self._mlookup(list(keys)).items() if v is not None}
+
+    async def amget(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """نسخة غير متزامنة من mget"""
+        found = await self._amlookup(list(keys))
+        return {k: v for k, (v, _) in found.items() if v is not None}
+
+    def _lookup(self, key: str) -> Tuple[Optional[Any], Optional[str]]:
+        """يعيد (القيمة، الطبقة التي وُجدت فيها) أو (None, None)"""
+        return self._mlookup([key])[key]
+
+    async def _alookup(self, key: str) -> Tuple[Optional[Any], Optional[str]]:
+        return (await self._amlookup([key]))[key]
+
+    def _mlookup(self, keys: List[str]) -> Dict[str, Tuple[Optional[Any], Optional[str]]]:
+        use_l1 = self._l1_ready()
+        found, missing = self._l1_lookup(keys, use_l1)
+        if missing:
+            try:
+                pipe = self.redis.pipeline(transaction=False)
+                self._queue_lookup(pipe, missing)
+                start = time.perf_counter()
+                results = pipe.execute()
+                self.metrics.latency(missing[0], "get", time.perf_counter() - start)
+                found.update(self._finish_lookup(missing, results, use_l1))
+            except Exception as e:
+                logger.log_error(e, {"cache_key": missing})
+                found.update(dict.fromkeys(missing, (None, None)))
+        return found
+
+    async def _amlookup(self, keys: List[str]) -> Dict[str, Tuple[Optional[Any], Optional[str]]]:
+        if self.aredis is None:
+            return self._mlookup(keys)
+        use_l1 = self._l1_ready_nowait()
+        found, missing = self._l1_lookup(keys, use_l1)
+        if missing:
+            try:
+                pipe = self.aredis.pipeline(transaction=False)
+                self._queue_lookup(pipe, missing)
+                start = time.perf_counter()
+                results = await pipe.execute()
+                self.metrics.latency(missing[0], "get", time.perf_counter() - start)
+                found.update(self._finish_lookup(missing, results, use_l1))
+            except Exception as e:
+                logger.log_error(e, {"cache_key": missing})
+                found.update(dict.fromkeys(missing, (None, None)))
+        return found
+
+    def _l1_lookup(self, keys: List[str], use_l1: bool) -> Tuple[Dict[str, Tuple[Any, str]], List[str]]:
+        found, missing = {}, []
+        for key in keys:
+            data = self.l1.get(key, _MISSING) if use_l1 else _MISSING
+            if data is _MISSING:
+                missing.append(key)
+            else:
+                found[key] = (self.codec.decode(data), "l1")
+                self.metrics.hit(key, "l1")
+        return found, missing
+
+    @staticmethod
+    def _queue_lookup(pipe, keys: List[str]) -> None:
+        # القيمة والمتبقي من عمرها في رحلة واحدة
+        for key in keys:
+            pipe.get(key)
+            pipe.pttl(key)
+
+    def _finish_lookup(
+        self, keys: List[str], results: List[Any], use_l1: bool
+    ) -> Dict[str, Tuple[Any, Optional[str]]]:
+        found = {}
+        for i, key in enumerate(keys):
+            data, pttl = results[2 * i], results[2 * i + 1]
+            if not data:
+                self.l2_misses += 1
+                self.metrics.miss(key)
+                found[key] = (None, None)
+                continue
+            self.l2_hits += 1
+            self.metrics.hit(key, "l2")
+            if use_l1:
+                self.l1.set(key, data, pttl / 1000 if pttl and pttl > 0 else None)
+            found[key] = (self.codec.decode(data), "l2")
+        return found
+
     def set(
         self,
         key: str,
         value: Any,
-        ttl: Optional[int] = None
+        ttl: Optional[int] = None,
+        tags: Optional[Iterable[str]] = None
     ) -> bool:
-        """تخزين قيمة في التخزين المؤقت"""
+        """تخزين قيمة في التخزين المؤقت، مع تسجيلها تحت وسوم مثل user:{id}"""
+        return self.mset({key: value}, ttl, tags)
+
+    async def aset(
+        self,
+        key: str,
+        value: Any,
+        ttl: Optional[int] = None,
+        tags: Optional[Iterable[str]] = None
+    ) -> bool:
+        """نسخة غير متزامنة من set"""
+        return await self.amset({key: value}, ttl, tags)
+
+    def mset(
+        self,
+        items: Mapping[str, Any],
+        ttl: Optional[int] = None,
+        tags: Optional[Iterable[str]] = None
+    ) -> bool:
+        """تخزين عدة قيم برحلة واحدة؛ الوسوم تُطبَّق على كل القيم"""
         try:
-            self.redis.setex(
-                key,
-                ttl or self.default_ttl,
-                json.dumps(value)
-            )
+            pipe = self.redis.pipeline(transaction=False)
+            encoded = self._queue_store(pipe, items, ttl, tags)
+            start = time.perf_counter()
+            pipe.execute()
+            self.metrics.latency(next(iter(items)), "set", time.perf_counter() - start)
+            self._after_store(encoded, ttl, self._l1_ready())
+            self._publish_invalidation(keys=list(items))
             return True
         except Exception as e:
             logger.log_error(e, {
-                "cache_key": key,
+                "cache_key": list(items),
                 "ttl": ttl
             })
             return False
-    
+
+    async def amset(
+        self,
+        items: Mapping[str, Any],
+        ttl: Optional[int] = None,
+        tags: Optional[Iterable[str]] = None
+    ) -> bool:
+        """نسخة غير متزامنة من mset"""
+        if self.aredis is None:
+            return self.mset(items, ttl, tags)
+        try:
+            pipe = self.aredis.pipeline(transaction=False)
+            encoded = self._queue_store(pipe, items, ttl, tags)
+            start = time.perf_counter()
+            await pipe.execute()
+            self.metrics.latency(next(iter(items)), "set", time.perf_counter() - start)
+            self._after_store(encoded, ttl, self._l1_ready_nowait())
+            await self._apublish_invalidation(keys=list(items))
+            return True
+        except Exception as e:
+            logger.log_error(e, {
+                "cache_key": list(items),
+                "ttl": ttl
+            })
+            return False
+
+    def _queue_store(self, pipe, items: Mapping[str, Any], ttl: Optional[int], tags) -> Dict[str, bytes]:
+        """يضيف أوامر التخزين إلى pipe ويعيد القيم المرمَّزة"""
+        ttl = ttl or self.default_ttl
+        tags = list(tags or ())
+        encoded = {}
+        for key, value in items.items():
+            data = encoded[key] = self.codec.encode(value)
+            self.metrics.size(key, len(data))
+            pipe.setex(key, ttl, data)
+        now = time.time()
+        expires_at = dict.fromkeys(items, now + ttl)
+        for tag in tags:
+            tag_key = self._tag_key(tag)
+            pipe.zadd(tag_key, expires_at)
+            # كل تخزين يحذف الأعضاء المنتهية، فلا يكبر وسم نشط مثل ns:{prefix} بلا حد
+            pipe.zremrangebyscore(tag_key, "-inf", now)
+            pipe.expire(tag_key, max(ttl, self.tag_ttl))
+        return encoded
+
+    def _after_store(self, encoded: Mapping[str, bytes], ttl: Optional[int], use_l1: bool) -> None:
+        if use_l1:
+            for key, data in encoded.items():
+                self.l1.set(key, data, ttl or self.default_ttl)
+
     def delete(self, key: str) -> bool:
         """حذف قيمة من التخزين المؤقت"""
+        self.l1.delete(key)
         try:
             self.redis.delete(key)
+            self._publish_invalidation(keys=[key])
             return True
         except Exception as e:
             logger.log_error(e, {"cache_key": key})
             return False
-    
-    def clear_pattern(self, pattern: str) -> bool:
-        """حذف جميع القيم التي تطابق النمط"""
+
+    async def adelete(self, key: str) -> bool:
+        """نسخة غير متزامنة من delete"""
+        if self.aredis is None:
+            return self.delete(key)
+        self.l1.delete(key)
+        try:
+            await self.aredis.delete(key)
+            await self._apublish_invalidation(keys=[key])
+            return True
+        except Exception as e:
+            logger.log_error(e, {"cache_key": key})
+            return False
+
+    def invalidate_tags(self, *tags: str) -> int:
+        """حذف كل المدخلات المسجلة تحت الوسوم المعطاة؛ يعيد عدد المفاتيح
+
+        الكلفة تتناسب مع عدد مدخلات الوسم فقط، دون KEYS أو SCAN.
+        """
+        tag_keys = [self._tag_key(tag) for tag in tags]
+        if not tag_keys:
+            return 0
         try:
-            keys = self.redis.keys(f"cache:{pattern}")
+            pipe = self.redis.pipeline(transaction=True)
+            self._queue_tag_read(pipe, tag_keys)
+            keys = self._tag_members(pipe.execute())
             if keys:
                 self.redis.delete(*keys)
-            return True
+            self._forget_local(keys)
+            self._publish_invalidation(keys=keys)
+            return len(keys)
         except Exception as e:
-            logger.log_error(e, {"pattern": pattern})
+            logger.log_error(e, {"tags": list(tags)})
+            return 0
+
+    async def ainvalidate_tags(self, *tags: str) -> int:
+        """نسخة غير متزامنة من invalidate_tags"""
+        if self.aredis is None:
+            return self.invalidate_tags(*tags)
+        tag_keys = [self._tag_key(tag) for tag in tags]
+        if not tag_keys:
+            return 0
+        try:
+            pipe = self.aredis.pipeline(transaction=True)
+            self._queue_tag_read(pipe, tag_keys)
+            keys = self._tag_members(await pipe.execute())
+            if keys:
+                await self.aredis.delete(*keys)
+            self._forget_local(keys)
+            await self._apublish_invalidation(keys=keys)
+            return len(keys)
+        except Exception as e:
+            logger.log_error(e, {"tags": list(tags)})
+            return 0
+
+    @staticmethod
+    def _queue_tag_read(pipe, tag_keys: List[str]) -> None:
+        # قراءة الأعضاء وحذف المجموعات معاً حتى لا يضيع مفتاح يُضاف أثناء الإبطال؛
+        # الأعضاء المنتهية صلاحيتها لا تُقرأ ولا تُحذف
+        now = time.time()
+        for tag_key in tag_keys:
+            pipe.zrangebyscore(tag_key, now, "+inf")
+        pipe.delete(*tag_keys)
+
+    @staticmethod
+    def _tag_members(results: List[Any]) -> List[str]:
+        return sorted({
+            k.decode() if isinstance(k, bytes) else k
+            for group in results[:-1]
+            for k in group
+        })
+
+    def _forget_local(self, keys: Iterable[str]) -> None:
+        for key in keys:
+            self.l1.delete(key)
+
+    def invalidate_namespace(self, prefix: str) -> int:
+        """حذف كل ما خزّنه cached(prefix)"""
+        return self.invalidate_tags(f"ns:{prefix}")
+
+    def clear_pattern(self, pattern: str) -> bool:
+        """مهمل: استخدم invalidate_namespace أو invalidate_tags
+
+        يُعامل النمط كاسم مساحة (مع تجاهل * في آخره) بدلاً من KEYS.
+        """
+        warnings.warn(
+            "clear_pattern is deprecated; use invalidate_namespace or invalidate_tags",
+            DeprecationWarning,
+            stacklevel=2
+        )
+        self.invalidate_namespace(pattern.rstrip("*:"))
+        return True
+
+    async def _acquire_lock(self, key: str, timeout: float):
+        try:
+            client = self.aredis or self.redis
+            lock = client.lock(f"lock:{key}", timeout=timeout)
+            acquired = lock.acquire(blocking=False)
+            if inspect.isawaitable(acquired):
+                acquired = await acquired
+            return lock if acquired else None
+        except Exception as e:
+            logger.log_error(e, {"cache_key": key})
+            return None
+
+    def _report_error(self, error: BaseException, context: Dict[str, Any]) -> None:
+        logger.log_error(error, context)
+
+    def top_keys(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """أكثر المفاتيح إصابةً في هذا العامل (تقريبي)"""
+        return self.metrics.hot_keys.top(limit)
+
+    def stats(self) -> Dict[str, Any]:
+        """إحصائيات الإصابة والإخفاق لكل طبقة"""
+        l2_requests = self.l2_hits + self.l2_misses
+        return {
+            "l1": self.l1.stats(),
+            "l2": {
+                "hits": self.l2_hits,
+                "misses": self.l2_misses,
+                "hit_rate": self.l2_hits / l2_requests if l2_requests else 0.0,
+            },
+        }
+
+    # ------------------------------------------------------ إبطال بين العمال
+
+    def _invalidation_message(self, keys=None, clear: bool = False) -> str:
+        return json.dumps({"origin": self.instance_id, "keys": keys or [], "clear": clear})
+
+    def _publish_invalidation(self, keys=None, clear: bool = False) -> None:
+        try:
+            self.redis.publish(self.invalidation_channel, self._invalidation_message(keys, clear))
+        except Exception as e:
+            logger.log_error(e, {"channel": self.invalidation_channel})
+
+    async def _apublish_invalidation(self, keys=None, clear: bool = False) -> None:
+        try:
+            await self.aredis.publish(self.invalidation_channel, self._invalidation_message(keys, clear))
+        except Exception as e:
+            logger.log_error(e, {"channel": self.invalidation_channel})
+
+    def _handle_invalidation(self, message: Dict[str, Any]) -> None:
+        try:
+            payload = json.loads(message["data"])
+        except (TypeError, ValueError, KeyError):
+            return
+        if payload.get("origin") == self.instance_id:
+            return
+        if payload.get("clear"):
+            self.l1.clear()
+        for key in payload.get("keys", ()):
+            self.l1.delete(key)
+
+    def start_invalidation_listener(self) -> None:
+        """يشترك في قناة الإبطال؛ يُستدعى عند بدء التطبيق (في خيط، فهو يتصل بـ Redis)
+
+        بدونه يبدأ الاشتراك عند أول استخدام: مباشرة في المسارات المتزامنة، وفي
+        خيط خلفي في المسارات غير المتزامنة التي تتجاوز L1 حتى يكتمل.
+        """
+        self._ensure_subscriber()
+
+    def _l1_ready(self) -> bool:
+        self._ensure_subscriber()
+        return self.l1_enabled
+
+    def _l1_ready_nowait(self) -> bool:
+        """مثل _l1_ready دون انتظار Redis، لمسارات حلقة الأحداث"""
+        if self._subscriber is None:
+            if not self._subscribing:
+                self._subscribing = True
+                threading.Thread(
+                    target=self._ensure_subscriber, name="cache-invalidation-subscribe", daemon=True
+                ).start()
+            # قيم L1 غير موثوقة قبل الاشتراك
             return False
-    
-    def cached(
-        self,
-        prefix: str,
-        ttl: Optional[int] = None,
-        key_builder: Optional[Callable] = None
-    ):
-        """مزخرف للوظائف مع التخزين المؤقت"""
-        def decorator(func):
-            @wraps(func)
-            async def wrapper(*args, **kwargs):
-                # توليد المفتاح
-                if key_builder:
-                    cache_key = key_builder(*args, **kwargs)
-                else:
-                    cache_key = self._generate_key(prefix, *args, **kwargs)
-                
-                # محاولة الحصول من التخزين المؤقت
-                cached_value = self.get(cache_key)
-                if cached_value is not None:
-                    logger.log_request(
-                        method="CACHE",
-                        endpoint=func.__name__,
-                        status=200,
-                        duration=0.0,
-                        extra={"cache_hit": True}
-                    )
-                    return cached_value
-                
-                # تنفيذ الوظيفة
-                result = await func(*args, **kwargs)
-                
-                # تخزين النتيجة
-                self.set(cache_key, result, ttl)
-                
-                logger.log_request(
-                    method="CACHE",
-                    endpoint=func.__name__,
-                    status=200,
-                    duration=0.0,
-                    extra={"cache_hit": False}
-                )
-                
-                return result
-            return wrapper
-        return decorator
+        return self.l1_enabled
+
+    def _ensure_subscriber(self) -> None:
+        """يبدأ خيط الاشتراك في قناة الإبطال عند أول استخدام"""
+        if self._subscriber is not None:
+            return
+        with self._subscriber_lock:
+            if self._subscriber is not None:
+                return
+            try:
+                pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(**{self.invalidation_channel: self._handle_invalidation})
+                self._subscriber = pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+            except Exception as e:
+                # بدون اشتراك لا يمكن الوثوق بـ L1 بين العمال
+                logger.log_error(e, {"channel": self.invalidation_channel})
+                self.l1_enabled = False
+                self.l1.clear()
+                self._subscriber = False
+
+    def close(self) -> None:
+        if self._subscriber:
+            self._subscriber.stop()
+        self._subscriber = None
+        self._subscribing = False
+
+
+def create_redis_clients(url: str, max_connections: int = 50) -> Tuple[Redis, Optional[Any]]:
+    """عميل متزامن وآخر غير متزامن، لكل منهما تجمع اتصالات خاص"""
+    sync_client = Redis.from_url(url, max_connections=max_connections)
+    async_client = aioredis.from_url(url, max_connections=max_connections) if aioredis else None
+    return sync_client, async_client
+
+
+_redis_client, _async_redis_client = create_redis_clients(
+    settings.REDIS_URL, settings.REDIS_MAX_CONNECTIONS
+)
+
+
+def get_redis_client() -> Redis:
+    """عميل Redis المتزامن المشترك"""
+    return _redis_client
+
 
 # إنشاء مثيل المدير
-cache = SmartCache(settings.redis_client)
+cache = SmartCache(_redis_client, _async_redis_client)
@@ -0,0 +1,214 @@
+"""
+ترميز وضغط قيم التخزين المؤقت
+
+Every encoded value starts with a four byte header: the magic ``b"ZC"``,
+one byte naming the codec and one naming the compression, so a reader can
+decode any entry without knowing how it was written. Values without the
+header are read as plain JSON (entries written before codecs existed).
+
+Codecs:
+    json     stdlib json; datetimes and numpy values become ISO strings/lists
+    orjson   same output as json, much faster (optional ``orjson``)
+    msgpack  binary, round-trips ndarray and datetime exactly (optional ``msgpack``)
+    ndarray  raw array buffer plus dtype/shape, used automatically for
+             ``numpy.ndarray`` values; decodes to a read-only zero-copy view
+
+Compression (above ``compress_threshold`` bytes): zstd (optional
+``zstandard``), lz4 (optional ``lz4``) or stdlib zlib.
+"""
+import json
+import struct
+import zlib
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:  # pragma: no cover - optional dependency
+    lz4_frame = None
+
+MAGIC = b"ZC"
+
+CODECS = {"json": 1, "orjson": 2, "msgpack": 3, "ndarray": 4}
+COMPRESSIONS = {"none": 0, "zlib": 1, "zstd": 2, "lz4": 3}
+_CODEC_NAMES = {v: k for k, v in CODECS.items()}
+_COMPRESSION_NAMES = {v: k for k, v in COMPRESSIONS.items()}
+
+# أنواع msgpack الإضافية
+_EXT_NDARRAY = 1
+_EXT_DATETIME = 2
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if np is not None:
+        if isinstance(value, np.ndarray):
+            return value.tolist()
+        if isinstance(value, np.generic):
+            return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _encode_ndarray(array: Any) -> bytes:
+    array = np.ascontiguousarray(array)
+    meta = json.dumps({"dtype": array.dtype.str, "shape": array.shape}).encode()
+    return struct.pack("<I", len(meta)) + meta + array.tobytes()
+
+
+def _decode_ndarray(data: bytes) -> Any:
+    if np is None:
+        raise RuntimeError("decoding an ndarray cache entry requires numpy")
+    (size,) = struct.unpack_from("<I", data)
+    meta = json.loads(data[4:4 + size])
+    array = np.frombuffer(data, dtype=np.dtype(meta["dtype"]), offset=4 + size)
+    return array.reshape(meta["shape"])
+
+
+def _msgpack_default(value: Any) -> Any:
+    if np is not None:
+        if isinstance(value, np.ndarray):
+            return msgpack.ExtType(_EXT_NDARRAY, _encode_ndarray(value))
+        if isinstance(value, np.generic):
+            return value.item()
+    if isinstance(value, datetime):
+        return msgpack.ExtType(_EXT_DATETIME, value.isoformat().encode())
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not msgpack serializable")
+
+
+def _msgpack_ext_hook(code: int, data: bytes) -> Any:
+    if code == _EXT_NDARRAY:
+        return _decode_ndarray(data)
+    if code == _EXT_DATETIME:
+        return datetime.fromisoformat(data.decode())
+    return msgpack.ExtType(code, data)
+
+
+def _serializers() -> Dict[str, Tuple[Callable[[Any], bytes], Callable[[bytes], Any]]]:
+    table = {
+        "json": (
+            lambda v: json.dumps(v, default=_json_default, ensure_ascii=False).encode(),
+            json.loads,
+        ),
+        "ndarray": (_encode_ndarray, _decode_ndarray),
+    }
+    if orjson is not None:
+        table["orjson"] = (
+            lambda v: orjson.dumps(
+                v, default=_json_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+            ),
+            orjson.loads,
+        )
+    if msgpack is not None:
+        table["msgpack"] = (
+            lambda v: msgpack.packb(v, default=_msgpack_default, use_bin_type=True),
+            lambda d: msgpack.unpackb(d, ext_hook=_msgpack_ext_hook, raw=False, strict_map_key=False),
+        )
+    return table
+
+
+def _compressors() -> Dict[str, Tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]]:
+    table = {"zlib": (lambda d: zlib.compress(d, 6), zlib.decompress)}
+    if zstandard is not None:
+        table["zstd"] = (
+            # مثيلات zstandard غير آمنة للاستخدام المتزامن من عدة خيوط
+            lambda d: zstandard.ZstdCompressor(level=3).compress(d),
+            lambda d: zstandard.ZstdDecompressor().decompress(d),
+        )
+    if lz4_frame is not None:
+        table["lz4"] = (lz4_frame.compress, lz4_frame.decompress)
+    return table
+
+
+_SERIALIZERS = _serializers()
+_COMPRESSORS = _compressors()
+
+
+def _pick(preferred: Tuple[str, ...], available: Dict[str, Any]) -> str:
+    return next(name for name in preferred if name in available)
+
+
+class CacheCodec:
+    """Encode values to self-describing bytes and back."""
+
+    def __init__(
+        self,
+        codec: str = "auto",
+        compression: str = "auto",
+        compress_threshold: int = 1024,
+    ) -> None:
+        if codec == "auto":
+            codec = _pick(("orjson", "json"), _SERIALIZERS)
+        if compression == "auto":
+            compression = _pick(("zstd", "lz4", "zlib"), _COMPRESSORS)
+        if codec not in CODECS or codec == "ndarray":
+            raise ValueError(f"codec must be one of json, orjson, msgpack or auto, got {codec!r}")
+        if codec not in _SERIALIZERS:
+            raise ValueError(f"codec {codec!r} requires the {codec!r} package")
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"compression must be one of {tuple(COMPRESSIONS)} or auto, got {compression!r}")
+        if compression != "none" and compression not in _COMPRESSORS:
+            raise ValueError(f"compression {compression!r} requires its optional package")
+        self.codec = codec
+        self.compression = compression
+        self.compress_threshold = compress_threshold
+
+    def encode(self, value: Any) -> bytes:
+        codec = self.codec
+        if np is not None and isinstance(value, np.ndarray) and not value.dtype.hasobject:
+            codec = "ndarray"
+        payload = _SERIALIZERS[codec][0](value)
+        compression = "none"
+        if self.compression != "none" and len(payload) > self.compress_threshold:
+            compressed = _COMPRESSORS[self.compression][0](payload)
+            if len(compressed) < len(payload):
+                payload, compression = compressed, self.compression
+        return MAGIC + bytes((CODECS[codec], COMPRESSIONS[compression])) + payload
+
+    @staticmethod
+    def decode(data: Any) -> Any:
+        if isinstance(data, str):
+            data = data.encode()
+        if not data.startswith(MAGIC):
+            return json.loads(data)  # مدخل قديم بصيغة JSON
+        codec = _CODEC_NAMES.get(data[2])
+        compression = _COMPRESSION_NAMES.get(data[3])
+        if codec is None or compression is None:
+            raise ValueError("unknown cache codec header")
+        payload = data[4:]
+        if compression != "none":
+            if compression not in _COMPRESSORS:
+                raise RuntimeError(f"reading this entry requires the {compression} package")
+            payload = _COMPRESSORS[compression][1](payload)
+        if codec not in _SERIALIZERS:
+            raise RuntimeError(f"reading this entry requires the {codec} package")
+        return _SERIALIZERS[codec][1](payload)
+
+    @staticmethod
+    def describe(data: bytes) -> Optional[Dict[str, str]]:
+        """Codec and compression recorded in an encoded value, or None for legacy JSON."""
+        if not data.startswith(MAGIC):
+            return None
+        return {"codec": _CODEC_NAMES.get(data[2]), "compression": _COMPRESSION_NAMES.get(data[3])}
@@ -0,0 +1,126 @@
+"""
+مقاييس التخزين المؤقت
+
+Prometheus metrics for SmartCache, labelled by cache prefix (the readable
+part of ``cache:<prefix>:<hash>`` keys), plus an in-process tracker of the
+most requested keys for sizing TTLs and memory. ``prometheus_client`` is
+optional; without it only the hot-key tracker records anything.
+"""
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+try:
+    from prometheus_client import Counter as PromCounter, Histogram
+except ImportError:  # pragma: no cover - optional dependency
+    PromCounter = Histogram = None
+
+_LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+_SIZE_BUCKETS = (64, 256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+def key_prefix(key: str) -> str:
+    """Low-cardinality label for ``key``: its cache prefix or first segment."""
+    parts = key.split(":", 2)
+    if parts[0] == "cache" and len(parts) == 3:
+        return parts[1]
+    return parts[0] if len(parts) > 1 else "other"
+
+
+class HotKeyTracker:
+    """Approximate per-key hit counts with bounded memory.
+
+    Counts are kept for up to ``2 * capacity`` keys; beyond that only the
+    ``capacity`` most hit keys survive, so rarely hit keys are forgotten.
+    """
+
+    def __init__(self, capacity: int = 1000) -> None:
+        self.capacity = capacity
+        self._counts: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def hit(self, key: str) -> None:
+        with self._lock:
+            self._counts[key] += 1
+            if len(self._counts) > 2 * self.capacity:
+                self._counts = Counter(dict(self._counts.most_common(self.capacity)))
+
+    def top(self, limit: int = 20) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [
+                {"key": key, "prefix": key_prefix(key), "hits": hits}
+                for key, hits in self._counts.most_common(limit)
+            ]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._counts.clear()
+
+
+class CacheMetrics:
+    """Prometheus instruments for one SmartCache (create once per process)."""
+
+    def __init__(self, namespace: str = "cache", top_keys: int = 1000) -> None:
+        self.hot_keys = HotKeyTracker(top_keys)
+        if PromCounter is None:
+            self._hits = self._misses = self._latency = self._size = None
+            self._evictions = self._waits = None
+            return
+        self._hits = PromCounter(f"{namespace}_hits_total", "Cache hits", ["prefix", "tier"])
+        self._misses = PromCounter(f"{namespace}_misses_total", "Cache misses", ["prefix"])
+        self._latency = Histogram(
+            f"{namespace}_operation_duration_seconds",
+            "Redis round-trip latency of cache operations",
+            ["prefix", "operation"],
+            buckets=_LATENCY_BUCKETS,
+        )
+        self._size = Histogram(
+            f"{namespace}_value_bytes",
+            "Serialized size of cached values",
+            ["prefix"],
+            buckets=_SIZE_BUCKETS,
+        )
+        self._evictions = PromCounter(f"{namespace}_evictions_total", "Local cache evictions", ["prefix"])
+        self._waits = PromCounter(
+            f"{namespace}_singleflight_waits_total",
+            "Callers that waited on an in-flight computation instead of computing",
+            ["prefix"],
+        )
+
+    def hit(self, key: str, tier: str) -> None:
+        self.hot_keys.hit(key)
+        if self._hits is not None:
+            self._hits.labels(prefix=key_prefix(key), tier=tier).inc()
+
+    def miss(self, key: str) -> None:
+        if self._misses is not None:
+            self._misses.labels(prefix=key_prefix(key)).inc()
+
+    def latency(self, key: str, operation: str, seconds: float) -> None:
+        if self._latency is not None:
+            self._latency.labels(prefix=key_prefix(key), operation=operation).observe(seconds)
+
+    def size(self, key: str, nbytes: int) -> None:
+        if self._size is not None:
+            self._size.labels(prefix=key_prefix(key)).observe(nbytes)
+
+    def eviction(self, key: str) -> None:
+        if self._evictions is not None:
+            self._evictions.labels(prefix=key_prefix(key)).inc()
+
+    def singleflight_wait(self, key: str) -> None:
+        if self._waits is not None:
+            self._waits.labels(prefix=key_prefix(key)).inc()
+
+
+_default_metrics: Optional[CacheMetrics] = None
+_default_lock = threading.Lock()
+
+
+def default_metrics() -> CacheMetrics:
+    """Process-wide metrics; Prometheus refuses duplicate metric names."""
+    global _default_metrics
+    with _default_lock:
+        if _default_metrics is None:
+            _default_metrics = CacheMetrics()
+        return _default_metrics
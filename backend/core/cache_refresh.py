@@ -0,0 +1,218 @@
+"""
+مزخرف cached: دمج الطلبات المتزامنة والتحديث المسبق للمدخلات
+
+Single-flight loading, stale-while-revalidate and XFetch early refresh
+for :meth:`SmartCache.cached`. :class:`CachedLoader` only needs the
+host cache to provide ``_alookup(key) -> (value, tier)``,
+``aset(key, value, ttl, tags)``, ``_generate_key``, ``default_ttl`` and
+``metrics`` (plus ``_acquire_lock`` when ``lock_timeout`` is used), so it
+works over Redis as well as over an in-process store.
+"""
+import asyncio
+import inspect
+import logging
+import math
+import random
+import time
+from functools import wraps
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+_MISSING = object()
+ENTRY_MARKER = "__cache_entry__"
+
+
+class RefreshPolicy:
+    """إعدادات التحديث لمزخرف cached واحد"""
+
+    __slots__ = ("ttl", "stale_ttl", "beta", "lock_timeout", "single_flight", "background_refresh")
+
+    def __init__(self, ttl, stale_ttl, beta, lock_timeout, single_flight, background_refresh=True):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.beta = beta
+        self.lock_timeout = lock_timeout
+        self.single_flight = single_flight
+        self.background_refresh = background_refresh
+
+    @property
+    def uses_entries(self) -> bool:
+        # يُغلَّف الناتج بوقت الصلاحية وكلفة الحساب عند الحاجة إليهما فقط
+        return bool(self.stale_ttl or self.beta)
+
+    def needs_refresh(self, entry: Dict[str, Any]) -> bool:
+        now = time.time()
+        if now >= entry["fresh_until"]:
+            return True
+        if not self.beta:
+            return False
+        # XFetch: كلما اقترب الانتهاء وطال زمن الحساب زاد احتمال التحديث المبكر
+        return now - entry["delta"] * self.beta * math.log(random.random() or 1e-12) >= entry["fresh_until"]
+
+
+class CachedLoader:
+    """يضيف المزخرف cached إلى مخزن يوفر _alookup و aset"""
+
+    def __init__(self) -> None:
+        self._inflight: Dict[str, "asyncio.Future"] = {}
+        # تحديثات الخلفية الجارية حسب المفتاح
+        self._refreshes: Dict[str, "asyncio.Future"] = {}
+
+    def cached(
+        self,
+        prefix: str,
+        ttl: Optional[int] = None,
+        key_builder: Optional[Callable] = None,
+        tags: Optional[Callable[..., Iterable[str]]] = None,
+        single_flight: bool = True,
+        lock_timeout: Optional[float] = None,
+        stale_ttl: int = 0,
+        early_expiration: float = 0.0,
+        background_refresh: bool = True
+    ):
+        """مزخرف للوظائف مع التخزين المؤقت
+
+        tags: دالة تأخذ معاملات الوظيفة وتعيد وسوماً إضافية للمدخل
+            (مثل lambda user_id, **_: [f"user:{user_id}"]). كل مدخل يُوسم
+            أيضاً بـ ns:{prefix}.
+        single_flight: الإخفاقات المتزامنة في العامل نفسه تنتظر استدعاءً واحداً.
+        lock_timeout: قفل Redis قصير الأجل (بالثواني) يمنع العمال الآخرين من
+            إعادة الحساب في الوقت نفسه؛ None لتعطيله.
+        stale_ttl: يُقدَّم الناتج القديم لهذه المدة بعد انتهاء صلاحيته بينما
+            يُحدَّث في الخلفية.
+        early_expiration: معامل beta للانتهاء الاحتمالي المبكر (XFetch)؛
+            0 لتعطيله و1 قيمة معتادة.
+        background_refresh: التحديث في الخلفية يستدعي الوظيفة بمعاملات
+            الطلب الذي اكتشف الحاجة إليه بعد أن يكون قد انتهى، فيجب أن تكون
+            المعاملات قيماً (معرفات، أرقام) لا موارد مرتبطة بالطلب مثل جلسة
+            قاعدة البيانات أو Request. مرّر False لوظيفة تأخذ مثل هذه
+            الموارد: يُحدَّث المدخل حينها داخل الطلب نفسه، ويُقدَّم الناتج
+            القديم إن فشل التحديث.
+        """
+        ttl = ttl or self.default_ttl
+        policy = RefreshPolicy(ttl, stale_ttl, early_expiration, lock_timeout, single_flight, background_refresh)
+
+        def decorator(func):
+            @wraps(func)
+            async def wrapper(*args, **kwargs):
+                # توليد المفتاح
+                if key_builder:
+                    cache_key = key_builder(*args, **kwargs)
+                else:
+                    cache_key = self._generate_key(prefix, *args, **kwargs)
+
+                def load():
+                    entry_tags = [f"ns:{prefix}"]
+                    if tags:
+                        entry_tags.extend(tags(*args, **kwargs))
+                    return self._load(cache_key, func, args, kwargs, policy, entry_tags)
+
+                # محاولة الحصول من التخزين المؤقت
+                cached_value, _ = await self._alookup(cache_key)
+                if isinstance(cached_value, dict) and ENTRY_MARKER in cached_value:
+                    entry, cached_value = cached_value, cached_value["value"]
+                    if policy.needs_refresh(entry):
+                        if policy.background_refresh:
+                            # يُقدَّم الناتج الحالي ويُحدَّث مرة واحدة في الخلفية
+                            self._refresh_in_background(cache_key, load)
+                        else:
+                            try:
+                                return await load()
+                            except Exception as e:
+                                self._report_error(e, {"cache_key": cache_key})
+
+                if cached_value is not None:
+                    return cached_value
+
+                # تنفيذ الوظيفة (مرة واحدة لكل المنتظرين)
+                return await load()
+            return wrapper
+        return decorator
+
+    async def _load(self, key: str, func, args, kwargs, policy: RefreshPolicy, tags: List[str]):
+        """ينفذ الوظيفة ويخزن الناتج، مع دمج الطلبات المتزامنة على المفتاح نفسه"""
+        loop = asyncio.get_running_loop()
+        if policy.single_flight:
+            inflight = self._inflight.get(key)
+            if inflight is not None and inflight.get_loop() is loop:
+                self.metrics.singleflight_wait(key)
+                return await asyncio.shield(inflight)
+        future = loop.create_future()
+        if policy.single_flight:
+            self._inflight[key] = future
+        try:
+            result = await self._compute(key, func, args, kwargs, policy, tags)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # لا تحذير إن لم يكن هناك منتظرون
+            raise
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    async def _compute(self, key: str, func, args, kwargs, policy: RefreshPolicy, tags: List[str]):
+        lock = None
+        if policy.lock_timeout:
+            lock = await self._acquire_lock(key, policy.lock_timeout)
+            if lock is None:
+                # عامل آخر يحسب القيمة: ننتظرها حتى انتهاء مدة القفل
+                value = await self._wait_for_fill(key, policy.lock_timeout)
+                if value is not _MISSING:
+                    return value
+        try:
+            start = time.perf_counter()
+            result = await func(*args, **kwargs)
+            await self._store(key, result, policy, time.perf_counter() - start, tags)
+            return result
+        finally:
+            if lock is not None:
+                try:
+                    released = lock.release()
+                    if inspect.isawaitable(released):
+                        await released
+                except Exception:
+                    pass  # انتهت مدة القفل قبل التحرير
+
+    async def _store(
+        self, key: str, result: Any, policy: RefreshPolicy, delta: float, tags: List[str]
+    ) -> None:
+        if not policy.uses_entries:
+            await self.aset(key, result, policy.ttl, tags)
+            return
+        entry = {
+            ENTRY_MARKER: 1,
+            "value": result,
+            "delta": delta,
+            "fresh_until": time.time() + policy.ttl,
+        }
+        await self.aset(key, entry, policy.ttl + policy.stale_ttl, tags)
+
+    async def _wait_for_fill(self, key: str, timeout: float):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+            value, _ = await self._alookup(key)
+            if isinstance(value, dict) and ENTRY_MARKER in value:
+                if time.time() < value["fresh_until"]:
+                    return value["value"]
+            elif value is not None:
+                return value
+        return _MISSING
+
+    def _refresh_in_background(self, key: str, load: Callable) -> None:
+        inflight = self._inflight.get(key)
+        if key in self._refreshes or (inflight is not None and not inflight.done()):
+            return
+        task = self._refreshes[key] = asyncio.ensure_future(load())
+        task.add_done_callback(lambda done: self._refresh_done(key, done))
+
+    def _refresh_done(self, key: str, task: "asyncio.Future") -> None:
+        if self._refreshes.get(key) is task:
+            del self._refreshes[key]
+        if not task.cancelled() and task.exception() is not None:
+            # المدخل القديم يبقى في التخزين حتى نهاية stale_ttl
+            self._report_error(task.exception(), {"endpoint": "cache_refresh"})
+
+    def _report_error(self, error: BaseException, context: Dict[str, Any]) -> None:
+        logging.error("cache error %s: %r", context, error)
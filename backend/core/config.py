@@ -41,9 +41,16 @@ def assemble_cors_origins(cls, v: str | List[str]) -> List[str] | str:
     
     # Redis
     REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379")
+    REDIS_MAX_CONNECTIONS: int = int(os.getenv("REDIS_MAX_CONNECTIONS", "50"))
     
     # Cache
     CACHE_TTL: int = 3600  # 1 hour
+    CACHE_WARM_ON_STARTUP: bool = os.getenv("CACHE_WARM_ON_STARTUP", "false").lower() == "true"
+    CACHE_WARM_INTERVAL: int = int(os.getenv("CACHE_WARM_INTERVAL", "0"))  # seconds, 0 = startup only
+    CACHE_WARM_CONCURRENCY: int = int(os.getenv("CACHE_WARM_CONCURRENCY", "4"))
+    CACHE_WARM_RATE: float = float(os.getenv("CACHE_WARM_RATE", "50"))  # loads per second
+    RESPONSE_CACHE_BACKEND: str = os.getenv("RESPONSE_CACHE_BACKEND", "memory")  # memory | redis
+    RESPONSE_CACHE_TTL: int = int(os.getenv("RESPONSE_CACHE_TTL", "60"))
     
     # Rate Limiting
     RATE_LIMIT_PER_MINUTE: int = 60
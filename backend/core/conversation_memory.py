@@ -0,0 +1,146 @@
+"""Bounded, per-user conversation memory for AmrikyyBrotherAI.
+
+Each user keeps a fixed-size deque of their latest messages. Users are
+ordered by last activity, and once the total number of stored messages
+exceeds ``max_total_messages`` the most idle users are evicted, optionally
+spilling their history to a :class:`SqliteMemoryStore` from which it is
+restored transparently on their next message.
+"""
+
+import json
+import sqlite3
+import threading
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, Iterable, List, Optional
+
+DEFAULT_USER = "default"
+
+
+class SqliteMemoryStore:
+    """On-disk spill store for the history of evicted users."""
+
+    def __init__(self, path: str = ":memory:") -> None:
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS conversation_memory ("
+                " user_id TEXT PRIMARY KEY,"
+                " messages TEXT NOT NULL)"
+            )
+
+    def save(self, user_id: str, messages: Iterable[Dict[str, Any]]) -> None:
+        payload = json.dumps(list(messages), ensure_ascii=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO conversation_memory (user_id, messages) VALUES (?, ?)",
+                (str(user_id), payload),
+            )
+
+    def pop(self, user_id: str) -> Optional[List[Dict[str, Any]]]:
+        """Remove and return the stored history of ``user_id``, if any."""
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT messages FROM conversation_memory WHERE user_id = ?", (str(user_id),)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("DELETE FROM conversation_memory WHERE user_id = ?", (str(user_id),))
+        return json.loads(row[0])
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM conversation_memory").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class ConversationMemory:
+    """Per-user message history with global LRU eviction of idle users."""
+
+    def __init__(
+        self,
+        max_messages_per_user: int = 50,
+        max_total_messages: int = 100_000,
+        spill: Optional[SqliteMemoryStore] = None,
+    ) -> None:
+        if max_messages_per_user < 1 or max_total_messages < max_messages_per_user:
+            raise ValueError("expected 1 <= max_messages_per_user <= max_total_messages")
+        self.max_messages_per_user = max_messages_per_user
+        self.max_total_messages = max_total_messages
+        self.spill = spill
+        self._users: "OrderedDict[Any, Deque[Dict[str, Any]]]" = OrderedDict()
+        self._total = 0
+        self._lock = threading.RLock()
+        self.evictions = 0
+
+    @property
+    def total_messages(self) -> int:
+        return self._total
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    def __contains__(self, user_id: Any) -> bool:
+        return user_id in self._users
+
+    def append(self, user_id: Any, entry: Dict[str, Any]) -> None:
+        """Record ``entry`` for ``user_id`` and mark the user most recently active."""
+        with self._lock:
+            history = self._history(user_id, create=True)
+            if len(history) == history.maxlen:
+                self._total -= 1
+            history.append(entry)
+            self._total += 1
+            self._evict()
+
+    def last(self, user_id: Any) -> Optional[Dict[str, Any]]:
+        """Return the latest entry of ``user_id`` in O(1)."""
+        with self._lock:
+            history = self._history(user_id)
+            return history[-1] if history else None
+
+    def recent(self, user_id: Any, n: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Return up to ``n`` latest entries of ``user_id``, oldest first."""
+        with self._lock:
+            history = self._history(user_id)
+            if not history:
+                return []
+            if n is None or n >= len(history):
+                return list(history)
+            return [history[i] for i in range(len(history) - n, len(history))]
+
+    def forget(self, user_id: Any) -> None:
+        """Drop everything remembered about ``user_id``, including spilled history."""
+        with self._lock:
+            history = self._users.pop(user_id, None)
+            if history is not None:
+                self._total -= len(history)
+            if self.spill is not None:
+                self.spill.pop(user_id)
+
+    def _history(self, user_id: Any, create: bool = False) -> Optional[Deque[Dict[str, Any]]]:
+        history = self._users.get(user_id)
+        if history is not None:
+            self._users.move_to_end(user_id)
+            return history
+        restored = self.spill.pop(user_id) if self.spill is not None else None
+        if restored is None and not create:
+            return None
+        history = deque(restored or (), maxlen=self.max_messages_per_user)
+        self._users[user_id] = history
+        self._total += len(history)
+        self._evict()
+        return history
+
+    def _evict(self) -> None:
+        # Never evict the user that was just touched (the last one).
+        while self._total > self.max_total_messages and len(self._users) > 1:
+            user_id, history = self._users.popitem(last=False)
+            self._total -= len(history)
+            self.evictions += 1
+            if self.spill is not None:
+                self.spill.save(user_id, history)
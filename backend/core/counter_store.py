@@ -0,0 +1,295 @@
+"""Persistent, write-behind counters shared across ZeroSystem workers.
+
+:class:`WriteBehindCounter` keeps the current value of every counter in
+process and batches increments to a backend, so incrementing is a local
+dict update and only every ``max_pending`` increments (or once per
+``flush_interval``, from a background timer) pays for a round trip. Each flush returns the
+backend's authoritative totals, which pulls in increments made by other
+workers.
+
+Backends: :class:`MemoryCounterBackend` (single process),
+:class:`SqliteCounterBackend` (embedded, shared by workers on one host),
+:class:`RedisCounterBackend` (pipelined ``INCRBY``/``MGET``) and
+:class:`ShardedCounterBackend` to spread keys across several of them.
+"""
+
+import atexit
+import logging
+import sqlite3
+import threading
+import time
+import weakref
+import zlib
+from collections.abc import Mapping
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+
+class MemoryCounterBackend:
+    """In-process backend; the default when nothing is configured."""
+
+    def __init__(self) -> None:
+        self._data: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, int]:
+        with self._lock:
+            return {k: self._data.get(k, 0) for k in keys}
+
+    def incr_many(self, deltas: Dict[str, int]) -> Dict[str, int]:
+        with self._lock:
+            for key, delta in deltas.items():
+                self._data[key] = self._data.get(key, 0) + delta
+            return {k: self._data[k] for k in deltas}
+
+
+class SqliteCounterBackend:
+    """Embedded backend; one database file can be shared by local workers."""
+
+    def __init__(self, path: str, table: str = "counters") -> None:
+        self.path = path
+        self.table = table
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            if path != ":memory:":
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} (key TEXT PRIMARY KEY, value INTEGER NOT NULL)"
+            )
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, int]:
+        keys = list(keys)
+        with self._lock:
+            found = dict(self._select(keys))
+        return {k: found.get(k, 0) for k in keys}
+
+    def incr_many(self, deltas: Dict[str, int]) -> Dict[str, int]:
+        with self._lock, self._conn:
+            self._conn.executemany(
+                f"INSERT INTO {self.table} (key, value) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = value + excluded.value",
+                list(deltas.items()),
+            )
+            return dict(self._select(list(deltas)))
+
+    def _select(self, keys: List[str]) -> List[Any]:
+        if not keys:
+            return []
+        marks = ",".join("?" * len(keys))
+        return self._conn.execute(
+            f"SELECT key, value FROM {self.table} WHERE key IN ({marks})", keys
+        ).fetchall()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class RedisCounterBackend:
+    """Redis backend using one pipelined round trip per batch."""
+
+    def __init__(self, client: Any, prefix: str = "zero:counter:") -> None:
+        self.client = client
+        self.prefix = prefix
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, int]:
+        keys = list(keys)
+        if not keys:
+            return {}
+        values = self.client.mget([self.prefix + k for k in keys])
+        return {k: int(v) if v is not None else 0 for k, v in zip(keys, values)}
+
+    def incr_many(self, deltas: Dict[str, int]) -> Dict[str, int]:
+        pipe = self.client.pipeline(transaction=False)
+        for key, delta in deltas.items():
+            pipe.incrby(self.prefix + key, delta)
+        return dict(zip(deltas, (int(v) for v in pipe.execute())))
+
+
+class ShardedCounterBackend:
+    """Spread keys over several backends by a stable hash of the key."""
+
+    def __init__(self, shards: Sequence[Any]) -> None:
+        if not shards:
+            raise ValueError("at least one shard is required")
+        self.shards = list(shards)
+
+    def shard_for(self, key: str) -> Any:
+        return self.shards[zlib.crc32(key.encode("utf-8")) % len(self.shards)]
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, int]:
+        result: Dict[str, int] = {}
+        for shard, group in self._group(dict.fromkeys(keys, 0)).items():
+            result.update(shard.get_many(group))
+        return result
+
+    def incr_many(self, deltas: Dict[str, int]) -> Dict[str, int]:
+        result: Dict[str, int] = {}
+        for shard, group in self._group(deltas).items():
+            result.update(shard.incr_many(group))
+        return result
+
+    def _group(self, values: Dict[str, int]) -> Dict[Any, Dict[str, int]]:
+        groups: Dict[Any, Dict[str, int]] = {}
+        for key, value in values.items():
+            groups.setdefault(self.shard_for(key), {})[key] = value
+        return groups
+
+
+def counter_backend_from_url(url: Optional[str], prefix: str = "zero:counter:") -> Any:
+    """Build a backend from ``memory://``, ``sqlite:///path`` or ``redis://`` URLs.
+
+    Several comma-separated URLs produce a :class:`ShardedCounterBackend`.
+    """
+    if not url:
+        return MemoryCounterBackend()
+    urls = [u.strip() for u in url.split(",") if u.strip()]
+    if len(urls) > 1:
+        return ShardedCounterBackend([counter_backend_from_url(u, prefix) for u in urls])
+    url = urls[0]
+    if url.startswith("memory://"):
+        return MemoryCounterBackend()
+    if url.startswith("sqlite:///"):
+        return SqliteCounterBackend(url[len("sqlite:///"):])
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        import redis
+
+        return RedisCounterBackend(redis.Redis.from_url(url), prefix)
+    raise ValueError(f"unsupported counter store URL: {url}")
+
+
+class WriteBehindCounter(Mapping):
+    """Read-only mapping of counter values with batched, write-behind increments.
+
+    Pending increments are sent once ``max_pending`` have accumulated and
+    by a daemon timer every ``flush_interval`` seconds, so a counter that
+    goes quiet is still written out. Keys with nothing pending that were not
+    incremented for ``idle_ttl`` seconds are dropped from memory at the next
+    flush; incrementing one again reads it from the backend once. Iteration
+    and ``len`` cover the keys held in memory.
+    """
+
+    __hash__ = object.__hash__  # identity hash, so open counters fit in a WeakSet
+
+    def __init__(
+        self,
+        backend: Optional[Any] = None,
+        flush_interval: float = 1.0,
+        max_pending: int = 128,
+        idle_ttl: float = 600.0,
+    ) -> None:
+        self.backend = backend or MemoryCounterBackend()
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.idle_ttl = idle_ttl
+        self._values: Dict[Any, int] = {}
+        self._last_used: Dict[Any, float] = {}
+        self._evictions = 0
+        self._pending: Dict[Any, int] = {}
+        self._pending_count = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        _open_counters.add(self)
+
+    def incr(self, key: Any, amount: int = 1) -> int:
+        """Increment ``key`` locally and return its new value."""
+        while True:
+            seed, evictions = 0, self._evictions
+            if key not in self._values:
+                # First sight of this key in this process: one read to seed it.
+                seed = self.backend.get_many([str(key)]).get(str(key), 0)
+            with self._lock:
+                if key not in self._values and self._evictions != evictions:
+                    # Keys were evicted during the read, possibly this one
+                    # after flushing increments the seed does not include.
+                    continue
+                value = self._values.get(key, seed) + amount
+                self._values[key] = value
+                self._last_used[key] = time.monotonic()
+                self._pending[key] = self._pending.get(key, 0) + amount
+                self._pending_count += 1
+                due = self._pending_count >= self.max_pending
+                if self._thread is None and not self._stop.is_set():
+                    self._start()
+            break
+        if due:
+            self.flush()
+        return value
+
+    def flush(self) -> None:
+        """Send pending increments, adopt the backend's totals and drop idle keys."""
+        with self._flush_lock:
+            with self._lock:
+                deltas, self._pending = self._pending, {}
+                self._pending_count = 0
+            totals: Dict[str, int] = {}
+            if deltas:
+                try:
+                    totals = self.backend.incr_many({str(k): v for k, v in deltas.items()})
+                except Exception:
+                    logging.exception("Counter flush failed; keeping %d keys pending", len(deltas))
+                    with self._lock:
+                        for key, delta in deltas.items():
+                            self._pending[key] = self._pending.get(key, 0) + delta
+                        self._pending_count += len(deltas)
+                    return
+            with self._lock:
+                for key in deltas:
+                    self._values[key] = totals[str(key)] + self._pending.get(key, 0)
+                cutoff = time.monotonic() - self.idle_ttl
+                idle = [k for k, used in self._last_used.items() if used <= cutoff and k not in self._pending]
+                for key in idle:
+                    del self._values[key]
+                    del self._last_used[key]
+                if idle:
+                    self._evictions += 1
+
+    def close(self) -> None:
+        """Stop the flush timer and send what is pending."""
+        self._stop.set()
+        self.flush()
+
+    def _start(self) -> None:
+        # The timer holds only a weak reference, so it never keeps the counter alive.
+        self._thread = threading.Thread(
+            target=_flush_periodically,
+            args=(weakref.ref(self), self._stop, self.flush_interval),
+            name="counter-flush",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def __getitem__(self, key: Any) -> int:
+        try:
+            return self._values[key]
+        except KeyError:
+            value = self.backend.get_many([str(key)]).get(str(key), 0)
+            if not value:
+                raise
+            return value
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(list(self._values))
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+
+def _flush_periodically(ref: "weakref.ref[WriteBehindCounter]", stop: threading.Event, interval: float) -> None:
+    while not stop.wait(interval):
+        counter = ref()
+        if counter is None:
+            return
+        counter.flush()
+        del counter
+
+
+_open_counters: "weakref.WeakSet[WriteBehindCounter]" = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_open_counters() -> None:
+    for counter in list(_open_counters):
+        counter.flush()
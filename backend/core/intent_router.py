@@ -0,0 +1,108 @@
+"""Single-pass keyword intent router for the ZeroSystem skills.
+
+Skills declare their trigger vocabulary as ``{intent: keywords}``. The
+router normalizes every keyword once and compiles them into an
+Aho-Corasick automaton, so classifying a message is one scan over its
+characters whatever the number of skills and keywords, and it reports
+every intent whose keyword occurs anywhere in the message (the same
+semantics as ``keyword in text``).
+"""
+
+from typing import Dict, FrozenSet, Iterable, List, Mapping, Optional, Set, Tuple
+
+_ARABIC_NORMALIZATION = str.maketrans({
+    "أ": "ا",
+    "إ": "ا",
+    "آ": "ا",
+    "ى": "ي",
+    "ة": "ه",
+})
+
+EMPTY: FrozenSet[str] = frozenset()
+
+
+def normalize_arabic(text: str) -> str:
+    """تطبيع النص العربي لتحسين المطابقة."""
+    return text.translate(_ARABIC_NORMALIZATION)
+
+
+_Automaton = Tuple[List[Dict[str, int]], List[int], List[FrozenSet[str]]]
+
+
+class IntentRouter:
+    """Map normalized keywords to intents and match them all in one pass."""
+
+    def __init__(self, triggers: Optional[Mapping[str, Iterable[str]]] = None) -> None:
+        self._keywords: Dict[str, Set[str]] = {}
+        self._automaton: Optional[_Automaton] = None
+        if triggers:
+            self.register_triggers(triggers)
+
+    def register(self, intent: str, keywords: Iterable[str]) -> None:
+        """Add ``keywords`` as triggers for ``intent``."""
+        for keyword in keywords:
+            keyword = normalize_arabic(keyword)
+            if keyword:
+                self._keywords.setdefault(keyword, set()).add(intent)
+        self._automaton = None
+
+    def register_triggers(self, triggers: Mapping[str, Iterable[str]]) -> None:
+        for intent, keywords in triggers.items():
+            self.register(intent, keywords)
+
+    def register_skill(self, skill: object) -> None:
+        """Register the declarative ``triggers`` of a skill, if it has any."""
+        self.register_triggers(getattr(skill, "triggers", None) or {})
+
+    @property
+    def keyword_count(self) -> int:
+        return len(self._keywords)
+
+    def route(self, text: str) -> FrozenSet[str]:
+        """Return every intent with a keyword contained in ``text``."""
+        automaton = self._automaton or self._compile()
+        goto, fail, output = automaton
+        state = 0
+        matched: Optional[Set[str]] = None
+        for char in normalize_arabic(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                if matched is None:
+                    matched = set(output[state])
+                else:
+                    matched |= output[state]
+        return frozenset(matched) if matched else EMPTY
+
+    def _compile(self) -> _Automaton:
+        goto: List[Dict[str, int]] = [{}]
+        outputs: List[Set[str]] = [set()]
+        for keyword, intents in self._keywords.items():
+            state = 0
+            for char in keyword:
+                nxt = goto[state].get(char)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][char] = nxt
+                    goto.append({})
+                    outputs.append(set())
+                state = nxt
+            outputs[state] |= intents
+
+        # Breadth-first failure links; each state inherits the outputs of
+        # its failure state so nested keywords are reported too.
+        fail = [0] * len(goto)
+        queue = list(goto[0].values())
+        for state in queue:
+            for char, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and char not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(char, 0)
+                outputs[nxt] |= outputs[fail[nxt]]
+
+        automaton = (goto, fail, [frozenset(o) for o in outputs])
+        self._automaton = automaton
+        return automaton
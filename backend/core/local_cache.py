@@ -0,0 +1,149 @@
+"""
+ذاكرة تخزين مؤقت محلية (L1) داخل العملية أمام Redis
+
+Bounded LRU with per-entry TTLs and TinyLFU admission: a small count-min
+sketch estimates how often each key is requested, and when the cache is
+full a new key only displaces the least recently used entry if it has been
+requested more often. This keeps one-off keys from flushing hot ones.
+
+Values are stored as-is (not copied); callers must not mutate them.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+_MISSING = object()
+
+
+class FrequencySketch:
+    """Count-min sketch of 4-bit counters with periodic aging."""
+
+    DEPTH = 4
+
+    def __init__(self, capacity: int) -> None:
+        width = 16
+        while width < capacity * 4:
+            width *= 2
+        self._mask = width - 1
+        self._rows = [[0] * width for _ in range(self.DEPTH)]
+        self._sample_size = max(10 * capacity, 64)
+        self._additions = 0
+
+    def _indexes(self, key: Hashable):
+        h = hash(key)
+        for row in range(self.DEPTH):
+            yield row, (h ^ (h >> (16 + row * 4)) ^ (row * 0x9E3779B9)) & self._mask
+
+    def increment(self, key: Hashable) -> None:
+        for row, i in self._indexes(key):
+            if self._rows[row][i] < 15:
+                self._rows[row][i] += 1
+        self._additions += 1
+        if self._additions >= self._sample_size:
+            self._age()
+
+    def frequency(self, key: Hashable) -> int:
+        return min(self._rows[row][i] for row, i in self._indexes(key))
+
+    def _age(self) -> None:
+        # Halve every counter so old popularity fades out.
+        for counters in self._rows:
+            for i, value in enumerate(counters):
+                if value:
+                    counters[i] = value >> 1
+        self._additions //= 2
+
+
+class LocalCache:
+    """Thread-safe in-process cache with LRU eviction, TTLs and TinyLFU admission."""
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        default_ttl: float = 60.0,
+        on_evict: Optional[Callable[[Hashable], None]] = None,
+    ) -> None:
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.on_evict = on_evict
+        self._data: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self._sketch = FrequencySketch(max_entries)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.rejections = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            self._sketch.increment(key)
+            item = self._data.get(key, _MISSING)
+            if item is not _MISSING:
+                value, expires = item
+                if expires > now:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> bool:
+        """Store ``value``; returns False if TinyLFU declined to admit the key."""
+        ttl = self.default_ttl if ttl is None else min(ttl, self.default_ttl)
+        if ttl <= 0:
+            self.delete(key)
+            return False
+        expires = time.monotonic() + ttl
+        with self._lock:
+            if key in self._data:
+                self._data[key] = (value, expires)
+                self._data.move_to_end(key)
+                return True
+            if len(self._data) >= self.max_entries and not self._make_room(key):
+                self.rejections += 1
+                return False
+            self._data[key] = (value, expires)
+            return True
+
+    def delete(self, key: Hashable) -> bool:
+        with self._lock:
+            return self._data.pop(key, _MISSING) is not _MISSING
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            item = self._data.get(key)
+            return item is not None and item[1] > time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        requests = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / requests if requests else 0.0,
+            "evictions": self.evictions,
+            "rejections": self.rejections,
+        }
+
+    def _make_room(self, candidate: Hashable) -> bool:
+        now = time.monotonic()
+        victim, (_, expires) = next(iter(self._data.items()))
+        if expires > now and self._sketch.frequency(candidate) <= self._sketch.frequency(victim):
+            return False
+        del self._data[victim]
+        self.evictions += 1
+        if self.on_evict is not None:
+            self.on_evict(victim)
+        return True
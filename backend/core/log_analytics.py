@@ -0,0 +1,240 @@
+"""Streaming analytics over the ZeroSystem interaction and mood logs.
+
+``log.jsonl`` and ``mood.jsonl`` are read lazily, one complete line at a
+time, through a small generator pipeline (:func:`tail_jsonl` ->
+aggregators). Memory does not grow with the size of the logs: the mood
+distribution is kept over a fixed rolling window, and the per-user/hour
+counts and skill hits grow only with the number of distinct keys.
+
+:class:`LogAnalytics` remembers the byte offset reached in each file and
+the aggregate state in a checkpoint file, so a re-run only reads the
+bytes appended since the previous one::
+
+    analytics = LogAnalytics("log.jsonl", "mood.jsonl", checkpoint="analytics.json")
+    analytics.update()
+    print(analytics.report())
+"""
+
+import json
+import logging
+import os
+from collections import Counter, deque
+from typing import Any, Deque, Dict, Iterator, Optional, Tuple
+
+CHECKPOINT_VERSION = 1
+
+# يُستنتج اسم المهارة من المفاتيح المميزة لردها
+SKILL_MARKERS = (
+    ("sibling_id", "sibling_genesis"),
+    ("voice_style", "mindful_embodiment"),
+    ("friendship_level", "true_friendship"),
+    ("personality", "default"),
+)
+
+
+def tail_jsonl(path: str, offset: int = 0) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """Yield ``(end_offset, entry)`` for each complete line after ``offset``.
+
+    A trailing line without a newline is still being written and is left
+    for the next run; undecodable lines are skipped.
+    """
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return
+    with f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b"\n"):
+                return
+            offset += len(line)
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                logging.warning("Skipping malformed line ending at %s:%d", path, offset)
+                continue
+            if isinstance(entry, dict):
+                yield offset, entry
+
+
+def skill_of(response: Any) -> str:
+    """Name of the skill that produced ``response``, or ``"other"``."""
+    if isinstance(response, dict):
+        if "skill" in response:
+            return str(response["skill"])
+        for marker, skill in SKILL_MARKERS:
+            if marker in response:
+                return skill
+    return "other"
+
+
+class RollingMoodDistribution:
+    """Mood frequencies over the last ``window`` mood entries."""
+
+    def __init__(self, window: int = 1000) -> None:
+        self.window = window
+        self._moods: Deque[str] = deque(maxlen=window)
+        self._counts: Counter = Counter()
+        self.total = 0
+
+    def add(self, mood: Any) -> None:
+        mood = str(mood)
+        if len(self._moods) == self.window:
+            old = self._moods[0]
+            self._counts[old] -= 1
+            if not self._counts[old]:
+                del self._counts[old]
+        self._moods.append(mood)
+        self._counts[mood] += 1
+        self.total += 1
+
+    def distribution(self) -> Dict[str, float]:
+        size = len(self._moods)
+        return {mood: count / size for mood, count in self._counts.most_common()} if size else {}
+
+    def state(self) -> Dict[str, Any]:
+        return {"moods": list(self._moods), "total": self.total}
+
+    def restore(self, state: Dict[str, Any]) -> None:
+        self._moods.clear()
+        self._counts.clear()
+        for mood in state.get("moods", ())[-self.window:]:
+            self._moods.append(mood)
+            self._counts[mood] += 1
+        self.total = state.get("total", len(self._moods))
+
+
+class InteractionStats:
+    """Interaction counts per user and hour, and skill hit counts."""
+
+    def __init__(self) -> None:
+        self.per_user_hour: Counter = Counter()
+        self.skills: Counter = Counter()
+        self.total = 0
+
+    def add(self, entry: Dict[str, Any]) -> None:
+        hour = str(entry.get("time", ""))[:13]  # YYYY-MM-DDTHH
+        user = entry.get("user") or "anonymous"
+        self.per_user_hour[f"{user}|{hour}"] += 1
+        self.skills[skill_of(entry.get("response"))] += 1
+        self.total += 1
+
+    def by_user_hour(self) -> Dict[str, Dict[str, int]]:
+        result: Dict[str, Dict[str, int]] = {}
+        for key, count in self.per_user_hour.items():
+            user, _, hour = key.rpartition("|")
+            result.setdefault(user, {})[hour] = count
+        return result
+
+    def skill_hit_rates(self) -> Dict[str, float]:
+        if not self.total:
+            return {}
+        return {skill: count / self.total for skill, count in self.skills.most_common()}
+
+    def state(self) -> Dict[str, Any]:
+        return {
+            "per_user_hour": dict(self.per_user_hour),
+            "skills": dict(self.skills),
+            "total": self.total,
+        }
+
+    def restore(self, state: Dict[str, Any]) -> None:
+        self.per_user_hour = Counter(state.get("per_user_hour", {}))
+        self.skills = Counter(state.get("skills", {}))
+        self.total = state.get("total", 0)
+
+
+class LogAnalytics:
+    """Incremental analytics over an interaction log and a mood log."""
+
+    def __init__(
+        self,
+        log_path: str,
+        mood_path: Optional[str] = None,
+        checkpoint: Optional[str] = None,
+        mood_window: int = 1000,
+    ) -> None:
+        self.log_path = log_path
+        self.mood_path = mood_path
+        self.checkpoint = checkpoint
+        self.moods = RollingMoodDistribution(mood_window)
+        self.interactions = InteractionStats()
+        self.offsets: Dict[str, Dict[str, int]] = {}
+        if checkpoint and os.path.exists(checkpoint):
+            self._load_checkpoint()
+
+    def update(self) -> Dict[str, int]:
+        """Consume new log lines; return how many entries each file yielded."""
+        read = {"interactions": 0, "moods": 0}
+        for offset, entry in self._tail(self.log_path):
+            self.interactions.add(entry)
+            self.offsets[self.log_path]["offset"] = offset
+            read["interactions"] += 1
+        if self.mood_path:
+            for offset, entry in self._tail(self.mood_path):
+                self.moods.add(entry.get("mood"))
+                self.offsets[self.mood_path]["offset"] = offset
+                read["moods"] += 1
+        if self.checkpoint:
+            self.save_checkpoint()
+        return read
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "interactions": self.interactions.total,
+            "moods": self.moods.total,
+            "mood_distribution": self.moods.distribution(),
+            "interactions_per_user_hour": self.interactions.by_user_hour(),
+            "skill_hit_rates": self.interactions.skill_hit_rates(),
+        }
+
+    def save_checkpoint(self) -> None:
+        """Atomically write offsets and aggregate state to the checkpoint file."""
+        state = {
+            "version": CHECKPOINT_VERSION,
+            "offsets": self.offsets,
+            "moods": self.moods.state(),
+            "interactions": self.interactions.state(),
+        }
+        tmp = f"{self.checkpoint}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False)
+        os.replace(tmp, self.checkpoint)
+
+    def _load_checkpoint(self) -> None:
+        with open(self.checkpoint, encoding="utf-8") as f:
+            state = json.load(f)
+        if state.get("version") != CHECKPOINT_VERSION:
+            logging.warning("Ignoring checkpoint %s with unknown version", self.checkpoint)
+            return
+        self.offsets = state.get("offsets", {})
+        self.moods.restore(state.get("moods", {}))
+        self.interactions.restore(state.get("interactions", {}))
+
+    def _tail(self, path: str) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return iter(())
+        known = self.offsets.get(path)
+        if known is None or known.get("inode") != stat.st_ino or stat.st_size < known["offset"]:
+            # ملف جديد أو مُدوَّر أو مقتطع: يُقرأ من البداية
+            if known is not None:
+                logging.info("%s was rotated or truncated; reading from the start", path)
+            known = self.offsets[path] = {"inode": stat.st_ino, "offset": 0}
+        return tail_jsonl(path, known["offset"])
+
+
+if __name__ == "__main__":  # pragma: no cover - manual helper
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Incremental ZeroSystem log analytics")
+    parser.add_argument("log", help="interaction log (log.jsonl)")
+    parser.add_argument("mood", nargs="?", help="mood log (mood.jsonl)")
+    parser.add_argument("--checkpoint", help="offsets/state file for incremental runs")
+    parser.add_argument("--mood-window", type=int, default=1000)
+    args = parser.parse_args()
+
+    analytics = LogAnalytics(args.log, args.mood, args.checkpoint, args.mood_window)
+    analytics.update()
+    print(json.dumps(analytics.report(), ensure_ascii=False, indent=2))
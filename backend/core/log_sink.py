@@ -0,0 +1,133 @@
+"""Buffered JSON Lines sink shared by the ZeroSystem interaction and mood logs."""
+
+import atexit
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+from .micro_batcher import MicroBatcher
+
+FSYNC_NEVER = "never"
+FSYNC_BATCH = "batch"
+FSYNC_ALWAYS = "always"
+FSYNC_POLICIES = (FSYNC_NEVER, FSYNC_BATCH, FSYNC_ALWAYS)
+
+
+class JsonlLogSink(MicroBatcher):
+    """Collect JSON lines in memory and append them to disk in batches.
+
+    A background thread writes the buffer out once ``max_batch`` lines are
+    pending or ``flush_interval`` seconds have passed, so callers never pay
+    for serialization or a file open on the request thread. Entries are
+    encoded when they are written out, so they must not be mutated after
+    being handed to :meth:`write`. ``fsync`` selects durability:
+
+    * ``"never"``  - leave durability to the OS page cache.
+    * ``"batch"``  - ``fsync`` once after every batch written.
+    * ``"always"`` - write and ``fsync`` every entry synchronously.
+
+    When ``store`` is given (a :class:`~backend.core.log_store.SegmentedLogStore`)
+    batches go to its rotating segments instead of appending to ``path``.
+
+    A batch that fails to write (disk full, file rotated away) goes back to
+    the front of the buffer and is retried after ``flush_interval``; if the
+    buffer overflows meanwhile, the newest entries are dropped and counted
+    in ``dropped``.
+    """
+
+    drain_all = True
+
+    def __init__(
+        self,
+        path: str,
+        max_batch: int = 256,
+        flush_interval: float = 1.0,
+        fsync: str = FSYNC_NEVER,
+        max_buffer: int = 65536,
+        store: Optional[Any] = None,
+    ) -> None:
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync must be one of {FSYNC_POLICIES}, got {fsync!r}")
+        super().__init__(
+            max_batch, flush_interval, max_buffer,
+            retry_failed=True, name=f"jsonl-sink:{os.path.basename(path)}",
+        )
+        self.path = path
+        self.fsync = fsync
+        self.store = store
+
+    def write(self, entry: Dict[str, Any]) -> None:
+        """Queue ``entry`` as one JSON line."""
+        if self.fsync != FSYNC_ALWAYS:
+            if self._offer(entry):
+                return
+            if not self.closed:
+                # The flusher fell behind; apply back-pressure on the caller.
+                try:
+                    self.flush()
+                except OSError:
+                    logging.exception("Log flush to %s failed; entries kept for retry", self.path)
+                self.submit(entry)
+                return
+        with self._flush_lock:
+            self._append((entry,))
+
+    def close(self) -> None:
+        """Stop the background flusher and write out what is left."""
+        super().close()
+        if self.store is not None:
+            self.store.close()
+
+    def _process(self, batch: List[Dict[str, Any]]) -> None:
+        self._append(batch)
+
+    def _append(self, entries: Iterable[Dict[str, Any]]) -> None:
+        if self.store is not None:
+            self.store.append(entries, fsync=self.fsync != FSYNC_NEVER)
+            return
+        data = "".join([json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries])
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(data)
+            if self.fsync != FSYNC_NEVER:
+                f.flush()
+                os.fsync(f.fileno())
+
+
+_sinks: Dict[str, JsonlLogSink] = {}
+_sinks_lock = threading.Lock()
+
+
+def get_log_sink(path: str, **options: Any) -> JsonlLogSink:
+    """Return the shared sink for ``path``, creating it on first use.
+
+    ``options`` are passed to :class:`JsonlLogSink` only when a new sink is
+    created; later callers get the existing sink unchanged.
+    """
+    path = os.path.abspath(path)
+    sink = _sinks.get(path)
+    if sink is None or sink.closed:
+        with _sinks_lock:
+            sink = _sinks.get(path)
+            if sink is None or sink.closed:
+                sink = _sinks[path] = JsonlLogSink(path, **options)
+    return sink
+
+
+def flush_all() -> None:
+    """Flush every open sink."""
+    for sink in list(_sinks.values()):
+        sink.flush()
+
+
+def close_all() -> None:
+    """Close every open sink; registered to run at interpreter exit."""
+    with _sinks_lock:
+        sinks = list(_sinks.values())
+        _sinks.clear()
+    for sink in sinks:
+        sink.close()
+
+
+atexit.register(close_all)
@@ -0,0 +1,260 @@
+"""Segmented, compressed and indexed store for the ZeroSystem JSONL logs.
+
+Entries are appended to an active plain-text segment. Once it grows past
+``max_segment_bytes`` or the calendar day of the entries changes, the
+segment is compressed and a new one is started. ``index.json`` keeps the
+time range, logical byte offset, entry count and (for small sets) the
+users of each segment, so :meth:`SegmentedLogStore.read` only opens the
+segments that can contain matching entries.
+
+The index is rewritten only when a segment is started, sealed or the store
+is closed, so appends cost the same however many segments exist. Counts of
+the active segment in ``index.json`` may therefore lag behind; they are
+rebuilt from the segment file when the store is opened.
+"""
+
+import gzip
+import io
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+INDEX_FILE = "index.json"
+COMPRESSIONS = ("gzip", "zstd", "none")
+_SUFFIXES = {"gzip": ".gz", "zstd": ".zst", "none": ""}
+
+TimeBound = Union[str, datetime, None]
+
+
+def _iso(value: TimeBound) -> Optional[str]:
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+class SegmentedLogStore:
+    """Append-only JSONL log split into rotated, compressed segments."""
+
+    def __init__(
+        self,
+        directory: str,
+        max_segment_bytes: int = 64 * 1024 * 1024,
+        rotate_daily: bool = True,
+        compression: str = "gzip",
+        max_indexed_users: int = 1024,
+    ) -> None:
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"compression must be one of {COMPRESSIONS}, got {compression!r}")
+        if compression == "zstd" and zstandard is None:
+            raise ValueError("zstd compression requires the 'zstandard' package")
+        self.directory = os.path.abspath(directory)
+        self.max_segment_bytes = max_segment_bytes
+        self.rotate_daily = rotate_daily
+        self.compression = compression
+        self.max_indexed_users = max_indexed_users
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+        self._segments: List[Dict[str, Any]] = self._load_index()
+
+    # ------------------------------------------------------------------ write
+
+    def append(self, entries: Iterable[Dict[str, Any]], fsync: bool = False) -> None:
+        """Append ``entries`` to the active segment, rotating as needed."""
+        with self._lock:
+            segment = self._active()
+            chunk: List[str] = []
+            for entry in entries:
+                line = json.dumps(entry, ensure_ascii=False) + "\n"
+                if self._needs_rotation(segment, entry, len(line.encode("utf-8"))):
+                    self._write(segment, chunk, fsync)
+                    chunk = []
+                    self._seal(segment)
+                    segment = self._active()
+                chunk.append(line)
+                self._track(segment, entry, line)
+            self._write(segment, chunk, fsync)
+
+    def rotate(self) -> None:
+        """Seal the active segment even if it is below the size limit."""
+        with self._lock:
+            segment = self._segments[-1] if self._segments else None
+            if segment is not None and not segment["sealed"] and segment["count"]:
+                self._seal(segment)
+                self._save_index()
+
+    def close(self) -> None:
+        """Persist the index with the active segment's current counts."""
+        with self._lock:
+            self._save_index()
+
+    # ------------------------------------------------------------------- read
+
+    def segments(self) -> List[Dict[str, Any]]:
+        """Return a copy of the segment index."""
+        with self._lock:
+            return [dict(s) for s in self._segments]
+
+    def read(
+        self,
+        start: TimeBound = None,
+        end: TimeBound = None,
+        user: Optional[str] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """Stream entries with ``start <= time < end``, optionally for one user.
+
+        Segments whose time range or user set cannot match are skipped
+        without being opened or decompressed.
+        """
+        start, end = _iso(start), _iso(end)
+        for segment in self.segments():
+            if not segment["count"]:
+                continue
+            if start is not None and segment["last_time"] < start:
+                continue
+            if end is not None and segment["first_time"] >= end:
+                continue
+            users = segment.get("users")
+            if user is not None and users is not None and user not in users:
+                continue
+            for entry in self._iter_segment(segment):
+                time = entry.get("time", "")
+                if start is not None and time < start:
+                    continue
+                if end is not None and time >= end:
+                    continue
+                if user is not None and entry.get("user") != user:
+                    continue
+                yield entry
+
+    # -------------------------------------------------------------- internals
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _active(self) -> Dict[str, Any]:
+        if self._segments and not self._segments[-1]["sealed"]:
+            return self._segments[-1]
+        last = self._segments[-1] if self._segments else None
+        seq = last["seq"] + 1 if last else 1
+        segment = {
+            "seq": seq,
+            "file": f"segment-{seq:06d}.jsonl",
+            "sealed": False,
+            "offset": last["offset"] + last["bytes"] if last else 0,
+            "bytes": 0,
+            "count": 0,
+            "first_time": None,
+            "last_time": None,
+            "users": [],
+        }
+        self._segments.append(segment)
+        # Record the new file (and the seal of the previous one) before any
+        # entry is written to it, so a reopen always finds it.
+        self._save_index()
+        return segment
+
+    def _needs_rotation(self, segment: Dict[str, Any], entry: Dict[str, Any], size: int) -> bool:
+        if not segment["count"]:
+            return False
+        if segment["bytes"] + size > self.max_segment_bytes:
+            return True
+        return self.rotate_daily and entry.get("time", "")[:10] != segment["first_time"][:10]
+
+    def _track(self, segment: Dict[str, Any], entry: Dict[str, Any], line: str) -> None:
+        time = entry.get("time", "")
+        if segment["first_time"] is None or time < segment["first_time"]:
+            segment["first_time"] = time
+        if segment["last_time"] is None or time > segment["last_time"]:
+            segment["last_time"] = time
+        segment["count"] += 1
+        segment["bytes"] += len(line.encode("utf-8"))
+        users = segment["users"]
+        user = entry.get("user")
+        if users is not None and user is not None and user not in users:
+            users.append(user)
+            if len(users) > self.max_indexed_users:
+                segment["users"] = None
+
+    def _write(self, segment: Dict[str, Any], chunk: List[str], fsync: bool) -> None:
+        if not chunk:
+            return
+        with open(self._path(segment["file"]), "a", encoding="utf-8") as f:
+            f.write("".join(chunk))
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+
+    def _seal(self, segment: Dict[str, Any]) -> None:
+        src = self._path(segment["file"])
+        name = segment["file"] + _SUFFIXES[self.compression]
+        if self.compression != "none":
+            with open(src, "rb") as f_in, self._open_compressed(self._path(name), "wb") as f_out:
+                while True:
+                    block = f_in.read(1024 * 1024)
+                    if not block:
+                        break
+                    f_out.write(block)
+            os.remove(src)
+        segment["file"] = name
+        segment["sealed"] = True
+
+    def _open_compressed(self, path: str, mode: str):
+        if path.endswith(".gz"):
+            return gzip.open(path, mode)
+        if path.endswith(".zst"):
+            if zstandard is None:
+                raise RuntimeError(f"reading {path} requires the 'zstandard' package")
+            if "w" in mode:
+                return zstandard.ZstdCompressor().stream_writer(open(path, mode))
+            return zstandard.ZstdDecompressor().stream_reader(open(path, mode))
+        return open(path, mode)
+
+    def _iter_segment(self, segment: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        path = self._path(segment["file"])
+        with self._open_compressed(path, "rb") as raw:
+            # The active segment may be appended to concurrently; never read
+            # past the bytes recorded in the index snapshot.
+            remaining = segment["bytes"]
+            for line in io.TextIOWrapper(raw, encoding="utf-8"):
+                remaining -= len(line.encode("utf-8"))
+                if remaining < 0:
+                    break
+                if line.strip():
+                    yield json.loads(line)
+
+    def _load_index(self) -> List[Dict[str, Any]]:
+        path = self._path(INDEX_FILE)
+        if not os.path.exists(path):
+            return []
+        with open(path, encoding="utf-8") as f:
+            segments = json.load(f)["segments"]
+        if segments and not segments[-1]["sealed"]:
+            self._recover(segments[-1])
+        return segments
+
+    def _recover(self, segment: Dict[str, Any]) -> None:
+        """Rebuild the active segment metadata after an unclean shutdown."""
+        path = self._path(segment["file"])
+        segment.update(bytes=0, count=0, first_time=None, last_time=None, users=[])
+        if not os.path.exists(path):
+            return
+        with open(path, "rb+") as f:
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break
+                line = raw.decode("utf-8")
+                self._track(segment, json.loads(line), line)
+            # Drop a torn trailing line so later appends start on a boundary.
+            f.truncate(segment["bytes"])
+
+    def _save_index(self) -> None:
+        path = self._path(INDEX_FILE)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"segments": self._segments}, f, ensure_ascii=False)
+        os.replace(tmp, path)
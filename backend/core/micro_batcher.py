@@ -0,0 +1,151 @@
+"""Buffer items in memory and process them in batches on a daemon thread.
+
+Shared by :class:`~backend.core.log_sink.JsonlLogSink` and the
+recommender's interaction update worker: callers only append to a deque,
+and a background thread hands the buffer to :meth:`MicroBatcher._process`
+once ``max_batch`` items are pending or ``flush_interval`` seconds have
+passed.
+"""
+
+import logging
+import threading
+from collections import deque
+from typing import Any, Deque, List, Optional
+
+
+class MicroBatcher:
+    """Base class for write-behind batching; subclasses implement ``_process``.
+
+    ``retry_failed`` selects what happens when ``_process`` raises:
+
+    * ``True``  - the batch goes back to the front of the buffer, the error
+      is raised from :meth:`flush` and the background thread retries after
+      ``flush_interval``. If the buffer overflows meanwhile the newest items
+      are dropped.
+    * ``False`` - the error is logged and the batch is discarded (counted
+      in ``failed``).
+
+    ``drain_all`` hands the whole buffer to one ``_process`` call instead of
+    ``max_batch`` items at a time.
+    """
+
+    drain_all = False
+
+    def __init__(
+        self,
+        max_batch: int = 256,
+        flush_interval: float = 1.0,
+        max_buffer: int = 65536,
+        retry_failed: bool = False,
+        name: str = "micro-batcher",
+    ) -> None:
+        if max_batch < 1 or max_buffer < max_batch:
+            raise ValueError("expected 1 <= max_batch <= max_buffer")
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.retry_failed = retry_failed
+        self.name = name
+        self._buffer: Deque[Any] = deque()
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self.processed = 0
+        self.dropped = 0
+        self.failed = 0
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    @property
+    def pending(self) -> int:
+        """Number of items buffered but not yet processed."""
+        return len(self._buffer)
+
+    def submit(self, item: Any) -> bool:
+        """Queue ``item``; returns False (and counts it) if it was dropped."""
+        if self._offer(item):
+            return True
+        with self._cond:
+            self.dropped += 1
+        return False
+
+    def flush(self) -> int:
+        """Process everything buffered now; returns the number of items processed."""
+        processed = 0
+        with self._flush_lock:
+            while True:
+                with self._cond:
+                    if not self._buffer:
+                        return processed
+                    count = len(self._buffer) if self.drain_all else min(len(self._buffer), self.max_batch)
+                    batch = [self._buffer.popleft() for _ in range(count)]
+                try:
+                    self._process(batch)
+                except Exception:
+                    if self.retry_failed:
+                        self._requeue(batch)
+                        raise
+                    logging.exception("%s: failed to process %d items", self.name, len(batch))
+                    self.failed += len(batch)
+                    continue
+                self.processed += len(batch)
+                processed += len(batch)
+
+    def close(self) -> None:
+        """Stop the background thread and process what is left."""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify()
+            thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+        self.flush()
+
+    def _process(self, batch: List[Any]) -> None:
+        raise NotImplementedError
+
+    def _offer(self, item: Any) -> bool:
+        """Buffer ``item`` unless closed or full, starting the thread on first use."""
+        with self._cond:
+            if self._closed or len(self._buffer) >= self.max_buffer:
+                return False
+            self._buffer.append(item)
+            if self._thread is None:
+                self._start()
+            elif len(self._buffer) >= self.max_batch:
+                self._cond.notify()
+        return True
+
+    def _requeue(self, batch: List[Any]) -> None:
+        with self._cond:
+            self._buffer.extendleft(reversed(batch))
+            overflow = len(self._buffer) - self.max_buffer
+            for _ in range(overflow):
+                self._buffer.pop()
+            self.dropped += max(0, overflow)
+
+    def _start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        failed = False
+        while True:
+            with self._cond:
+                if not self._closed and (failed or len(self._buffer) < self.max_batch):
+                    self._cond.wait(self.flush_interval)
+                closed = self._closed
+            try:
+                self.flush()
+                failed = False
+            except Exception:
+                # Keep the thread alive; the batch is back in the buffer.
+                logging.exception("%s: flush failed; retrying", self.name)
+                failed = True
+            if closed:
+                return
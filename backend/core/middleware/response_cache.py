@@ -0,0 +1,252 @@
+"""
+وسيط التخزين المؤقت لاستجابات HTTP
+
+Pure ASGI middleware that caches ``GET``/``HEAD`` responses of the routes
+given a :class:`CachePolicy`, keyed by path, sorted query string and the
+caller's auth subject. Cached responses carry a strong ``ETag``; a request
+whose ``If-None-Match`` matches gets ``304 Not Modified``, and a cache hit
+is answered without running the route handler at all.
+
+Entries live in an in-process :class:`LocalCache` by default, or in a
+:class:`SmartCache` (shared by all workers) when one is passed as
+``cache``.
+"""
+import hashlib
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from ..local_cache import LocalCache
+
+Headers = List[Tuple[bytes, bytes]]
+
+# ترويسات لا تُخزَّن مع الاستجابة
+_HOP_HEADERS = {b"content-length", b"set-cookie", b"x-cache", b"x-process-time"}
+
+
+class CachePolicy:
+    """How one route prefix is cached."""
+
+    def __init__(
+        self,
+        ttl: int = 60,
+        per_user: bool = True,
+        vary_headers: Iterable[str] = ("accept-language",),
+        max_body_bytes: int = 1024 * 1024,
+    ) -> None:
+        self.ttl = ttl
+        self.per_user = per_user
+        self.vary_headers = tuple(h.lower().encode() for h in vary_headers)
+        self.max_body_bytes = max_body_bytes
+
+    @property
+    def cache_control(self) -> bytes:
+        scope = "private" if self.per_user else "public"
+        return f"{scope}, max-age={self.ttl}".encode()
+
+
+def _header(headers: Headers, name: bytes) -> Optional[bytes]:
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+
+def _vary(headers: Headers, policy: CachePolicy) -> bytes:
+    """The response's own ``Vary`` merged with every request header in the cache key."""
+    names: List[bytes] = []
+    for key, value in headers:
+        if key.lower() == b"vary":
+            names.extend(v.strip().lower() for v in value.split(b","))
+    names.extend(policy.vary_headers)
+    if policy.per_user:
+        names.extend((b"authorization", b"cookie"))
+    if b"*" in names:
+        return b"*"
+    return b", ".join(dict.fromkeys(n for n in names if n))
+
+
+def default_subject(headers: Headers) -> str:
+    """Stable, non-reversible id of the caller's credentials (or ``anonymous``)."""
+    credentials = _header(headers, b"authorization") or _header(headers, b"cookie")
+    if not credentials:
+        return "anonymous"
+    return hashlib.blake2b(credentials, digest_size=12).hexdigest()
+
+
+def make_etag(body: bytes) -> bytes:
+    return b'"' + hashlib.blake2b(body, digest_size=16).hexdigest().encode() + b'"'
+
+
+def etag_matches(if_none_match: Optional[bytes], etag: bytes) -> bool:
+    if not if_none_match:
+        return False
+    # المقارنة الضعيفة كما في RFC 9110 لـ If-None-Match
+    for candidate in if_none_match.split(b","):
+        candidate = candidate.strip()
+        if candidate.startswith(b"W/"):
+            candidate = candidate[2:]
+        if candidate == b"*" or candidate == etag:
+            return True
+    return False
+
+
+class _MemoryStore:
+    def __init__(self, max_entries: int) -> None:
+        self.cache = LocalCache(max_entries, default_ttl=24 * 3600)
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return self.cache.get(key)
+
+    async def set(self, key: str, entry: Dict[str, Any], ttl: int) -> None:
+        self.cache.set(key, entry, ttl)
+
+
+class _SmartCacheStore:
+    def __init__(self, cache: Any) -> None:
+        self.cache = cache
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = await self.cache.aget(key)
+        if entry is None:
+            return None
+        entry = dict(entry)
+        entry["body"] = entry["body"].encode("latin-1")
+        entry["headers"] = [(k.encode("latin-1"), v.encode("latin-1")) for k, v in entry["headers"]]
+        entry["etag"] = entry["etag"].encode()
+        return entry
+
+    async def set(self, key: str, entry: Dict[str, Any], ttl: int) -> None:
+        # latin-1 يحول البايتات إلى نص دون فقد، فيصلح لأي ترميز JSON
+        await self.cache.aset(key, {
+            "status": entry["status"],
+            "headers": [(k.decode("latin-1"), v.decode("latin-1")) for k, v in entry["headers"]],
+            "body": entry["body"].decode("latin-1"),
+            "etag": entry["etag"].decode(),
+        }, ttl, tags=["ns:http"])
+
+
+class ResponseCacheMiddleware:
+    """ASGI response cache with ETag and conditional request support."""
+
+    def __init__(
+        self,
+        app: Callable[..., Awaitable[None]],
+        policies: Dict[str, CachePolicy],
+        cache: Any = None,
+        max_entries: int = 4096,
+        subject: Callable[[Headers], str] = default_subject,
+    ) -> None:
+        self.app = app
+        # أطول بادئة أولاً حتى تتقدم السياسات الأكثر تحديداً
+        self.policies = sorted(policies.items(), key=lambda item: len(item[0]), reverse=True)
+        self.store = _SmartCacheStore(cache) if cache is not None else _MemoryStore(max_entries)
+        self.subject = subject
+        self.hits = 0
+        self.misses = 0
+
+    def policy_for(self, path: str) -> Optional[CachePolicy]:
+        for prefix, policy in self.policies:
+            if path.startswith(prefix):
+                return policy
+        return None
+
+    def cache_key(self, scope: Dict[str, Any], policy: CachePolicy) -> str:
+        headers = scope.get("headers", [])
+        query = b"&".join(sorted(scope.get("query_string", b"").split(b"&")))
+        parts = [scope["path"], query.decode("latin-1")]
+        parts.append(self.subject(headers) if policy.per_user else "*")
+        for name in policy.vary_headers:
+            parts.append((_header(headers, name) or b"").decode("latin-1"))
+        digest = hashlib.blake2b("\n".join(parts).encode(), digest_size=16).hexdigest()
+        return f"http:{digest}"
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            await self.app(scope, receive, send)
+            return
+        policy = self.policy_for(scope["path"])
+        if policy is None:
+            await self.app(scope, receive, send)
+            return
+
+        key = self.cache_key(scope, policy)
+        if_none_match = _header(scope.get("headers", []), b"if-none-match")
+        entry = await self.store.get(key)
+        if entry is not None:
+            self.hits += 1
+            await self._send_entry(entry, policy, if_none_match, scope["method"], send, b"HIT")
+            return
+        self.misses += 1
+        if scope["method"] == "HEAD":
+            # HEAD handlers send no body, so they can only be answered from GET entries
+            await self.app(scope, receive, send)
+            return
+
+        start: Dict[str, Any] = {}
+        chunks: List[bytes] = []
+        size = 0
+        passthrough = False
+
+        async def capture(message) -> None:
+            nonlocal size, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                start.update(message)
+                if not self._storable(message):
+                    passthrough = True
+                    await send(message)
+                return
+            if message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+                size += len(chunks[-1])
+                if size > policy.max_body_bytes:
+                    # أكبر من أن يُخزَّن: أرسل ما جُمع واستمر بلا تخزين
+                    passthrough = True
+                    await send(start)
+                    await send({"type": "http.response.body", "body": b"".join(chunks),
+                                "more_body": message.get("more_body", False)})
+                    return
+                if not message.get("more_body", False):
+                    body = b"".join(chunks)
+                    entry = {
+                        "status": start["status"],
+                        "headers": [(k, v) for k, v in start.get("headers", [])
+                                    if k.lower() not in _HOP_HEADERS],
+                        "body": body,
+                        "etag": make_etag(body),
+                    }
+                    await self.store.set(key, entry, policy.ttl)
+                    await self._send_entry(entry, policy, if_none_match, scope["method"], send, b"MISS")
+                return
+            await send(message)
+
+        await self.app(scope, receive, capture)
+
+    @staticmethod
+    def _storable(start: Dict[str, Any]) -> bool:
+        if start["status"] != 200:
+            return False
+        headers = start.get("headers", [])
+        if _header(headers, b"set-cookie") is not None:
+            return False
+        cache_control = (_header(headers, b"cache-control") or b"").lower()
+        return b"no-store" not in cache_control and b"private" not in cache_control
+
+    @staticmethod
+    async def _send_entry(entry, policy, if_none_match, method, send, state: bytes) -> None:
+        etag = entry["etag"]
+        common = [(b"etag", etag), (b"cache-control", policy.cache_control), (b"x-cache", state)]
+        vary = _vary(entry["headers"], policy)
+        if vary:
+            common.append((b"vary", vary))
+        if etag_matches(if_none_match, etag):
+            await send({"type": "http.response.start", "status": 304, "headers": common})
+            await send({"type": "http.response.body", "body": b""})
+            return
+        body = entry["body"]
+        headers = [(k, v) for k, v in entry["headers"]
+                   if k.lower() not in (b"etag", b"cache-control", b"vary")]
+        headers += common + [(b"content-length", str(len(body)).encode())]
+        await send({"type": "http.response.start", "status": entry["status"], "headers": headers})
+        await send({"type": "http.response.body", "body": b"" if method == "HEAD" else body})
@@ -273,7 +273,7 @@ def _update_persona(self, user_id: int, persona: Dict):
         """تحديث شخصية المستخدم"""
         try:
             # حفظ في الكاش
-            cache.set(f'user_persona_{user_id}', persona)
+            cache.set(f'user_persona_{user_id}', persona, tags=[f'user:{user_id}'])
             
             # TODO: حفظ في قاعدة البيانات
             
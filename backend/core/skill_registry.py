@@ -0,0 +1,177 @@
+"""Lazily loaded skill registry for ZeroSystem.
+
+Skills are registered by name against a *target*: an import spec string
+(``"package.module:Class"``), a class or factory, or a ready instance.
+Nothing is imported or constructed until the skill is first looked up,
+and the registry records how long each import and constructor took.
+
+Third-party skills are discovered from the ``zero_system.skills`` entry
+point group or from a plugin directory in which every ``<name>.py``
+exposes a ``SKILL`` class or factory.
+"""
+
+import importlib
+import importlib.util
+import logging
+import os
+import threading
+import time
+from collections.abc import MutableMapping
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterator, List, Optional, Union
+
+ENTRY_POINT_GROUP = "zero_system.skills"
+
+Target = Union[str, Callable[[], Any]]
+
+
+@lru_cache(maxsize=None)
+def _entry_points(group: str) -> List[Any]:
+    # Scanning installed distributions is slow; do it once per process.
+    from importlib import metadata
+
+    eps = metadata.entry_points()
+    if hasattr(eps, "select"):
+        return list(eps.select(group=group))
+    return list(eps.get(group, ()))  # Python < 3.10
+
+
+def _import_spec(spec: str) -> Any:
+    module_name, _, attr = spec.partition(":")
+    obj = importlib.import_module(module_name)
+    for part in filter(None, attr.split(".")):
+        obj = getattr(obj, part)
+    return obj
+
+
+def _import_file(path: str) -> Any:
+    name = f"zero_system_plugin_{os.path.splitext(os.path.basename(path))[0]}"
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.SKILL
+
+
+class _Entry:
+    __slots__ = ("target", "loader", "instance", "import_time", "init_time")
+
+    def __init__(self, target: Any = None, loader: Optional[Callable[[], Any]] = None) -> None:
+        self.target = target
+        self.loader = loader
+        self.instance: Any = None
+        self.import_time = 0.0
+        self.init_time = 0.0
+
+
+class SkillRegistry(MutableMapping):
+    """Mapping of skill name to instance that builds skills on first use."""
+
+    def __init__(self) -> None:
+        self._entries: Dict[str, _Entry] = {}
+        self._lock = threading.RLock()
+
+    # ----------------------------------------------------------- registration
+
+    def register(self, name: str, target: Target) -> None:
+        """Register ``target`` (spec string, class or factory) under ``name``."""
+        with self._lock:
+            if isinstance(target, str):
+                self._entries[name] = _Entry(loader=lambda: _import_spec(target))
+            else:
+                self._entries[name] = _Entry(target=target)
+
+    def discover_entry_points(self, group: str = ENTRY_POINT_GROUP) -> List[str]:
+        """Register every skill advertised under the entry point ``group``."""
+        names = []
+        for ep in _entry_points(group):
+            with self._lock:
+                if ep.name not in self._entries:
+                    self._entries[ep.name] = _Entry(loader=ep.load)
+                    names.append(ep.name)
+        return names
+
+    def discover_directory(self, path: str) -> List[str]:
+        """Register ``<name>.py`` files in ``path`` as skills named ``<name>``."""
+        names = []
+        for filename in sorted(os.listdir(path)):
+            name, ext = os.path.splitext(filename)
+            if ext != ".py" or name.startswith("_"):
+                continue
+            full = os.path.join(path, filename)
+            with self._lock:
+                if name not in self._entries:
+                    self._entries[name] = _Entry(loader=lambda full=full: _import_file(full))
+                    names.append(name)
+        return names
+
+    # ---------------------------------------------------------------- mapping
+
+    def __getitem__(self, name: str) -> Any:
+        entry = self._entries[name]
+        if entry.instance is None:
+            self._load(name, entry)
+        return entry.instance
+
+    def __setitem__(self, name: str, skill: Any) -> None:
+        entry = _Entry()
+        entry.instance = skill
+        with self._lock:
+            self._entries[name] = entry
+
+    def __delitem__(self, name: str) -> None:
+        with self._lock:
+            del self._entries[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._entries))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._entries
+
+    # ------------------------------------------------------------ inspection
+
+    def is_loaded(self, name: str) -> bool:
+        return self._entries[name].instance is not None
+
+    def trigger_sources(self) -> List[Any]:
+        """Loaded skills and skill classes whose ``triggers`` are readable without importing."""
+        sources = []
+        for entry in list(self._entries.values()):
+            if entry.instance is not None:
+                sources.append(entry.instance)
+            elif entry.target is not None:
+                sources.append(entry.target)
+        return sources
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-skill load state and import/init time in seconds."""
+        return {
+            name: {
+                "loaded": entry.instance is not None,
+                "import_time": entry.import_time,
+                "init_time": entry.init_time,
+            }
+            for name, entry in list(self._entries.items())
+        }
+
+    def _load(self, name: str, entry: _Entry) -> None:
+        with self._lock:
+            if entry.instance is not None:
+                return
+            if entry.target is None:
+                start = time.perf_counter()
+                entry.target = entry.loader()
+                entry.import_time = time.perf_counter() - start
+            start = time.perf_counter()
+            instance = entry.target() if callable(entry.target) else entry.target
+            entry.init_time = time.perf_counter() - start
+            entry.instance = instance
+        logging.info(
+            "Loaded skill %s (import %.2f ms, init %.2f ms)",
+            name,
+            entry.import_time * 1000,
+            entry.init_time * 1000,
+        )
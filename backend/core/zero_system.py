@@ -3,53 +3,80 @@
 يمتلك قدرات صداقة رقمية حقيقية وتطور ذاتي كمي
 """
 
+import asyncio
 import json
 import hashlib
 import os
 import logging
+import sys
+import threading
 from datetime import datetime
+from functools import lru_cache
+from types import MappingProxyType
 from abc import ABC, abstractmethod
 from logger import ZeroSystemLogger
-from typing import Dict, List, Any
+from typing import Dict, FrozenSet, List, Any, Mapping, Optional, Sequence
+from backend.core.conversation_memory import DEFAULT_USER, ConversationMemory
+from backend.core.counter_store import WriteBehindCounter, counter_backend_from_url
+from backend.core.intent_router import IntentRouter, normalize_arabic
+from backend.core.log_sink import get_log_sink
+from backend.core.log_store import SegmentedLogStore
+from backend.core.skill_registry import SkillRegistry
 
 
-def normalize_arabic(text: str) -> str:
-    """تطبيع النص العربي لتحسين المطابقة."""
-    replacements = {
-        "أ": "ا",
-        "إ": "ا",
-        "آ": "ا",
-        "ى": "ي",
-        "ة": "ه",
-    }
-    for src, target in replacements.items():
-        text = text.replace(src, target)
-    return text
+def is_sibling_request(text: str, intents: Optional[FrozenSet[str]] = None) -> bool:
+    """Detect if the user is asking for a new digital sibling."""
+    if intents is None:
+        intents = SiblingAIGenesisSkill.router().route(text)
+    return "sibling.brother" in intents and "sibling.small" in intents
 
 
-def is_sibling_request(text: str) -> bool:
-    """Detect if the user is asking for a new digital sibling."""
-    norm = normalize_arabic(text)
-    has_brother = any(t in norm for t in ["اخ", "شقيق"])
-    has_small = any(t in norm for t in ["صغير", "اصغر"])
-    return has_brother and has_small
+def _log_path(filename: str) -> str:
+    return filename if os.path.isabs(filename) else os.path.join(os.path.dirname(__file__), filename)
+
+
+def _interaction_sink(filename: str, store: Optional[SegmentedLogStore] = None):
+    if store is not None:
+        return get_log_sink(store.directory, store=store)
+    return get_log_sink(_log_path(filename))
+
 
+def append_json_log(
+    message: str,
+    response: Dict,
+    filename: str = "log.jsonl",
+    user_id: Optional[str] = None,
+    store: Optional[SegmentedLogStore] = None,
+) -> None:
+    """Queue an interaction entry on the shared JSON Lines sink.
 
-def append_json_log(message: str, response: Dict, filename: str = "log.jsonl") -> None:
-    """Append an interaction entry to a JSON Lines file."""
-    path = filename if os.path.isabs(filename) else os.path.join(os.path.dirname(__file__), filename)
+    Entries go to ``filename`` or, when ``store`` is given, to its rotating
+    segments.
+    """
     entry = {
         "time": datetime.now().isoformat(),
         "message": message,
         "response": response,
     }
-    with open(path, "a", encoding="utf-8") as f:
-        json.dump(entry, f, ensure_ascii=False)
-        f.write("\n")
+    if user_id is not None:
+        entry["user"] = user_id
+    _interaction_sink(filename, store).write(entry)
 
 
 # ======================= الفئات الأساسية =======================
 class AbstractSkill(ABC):
+    # كلمات التفعيل: {intent: keywords} تُجمع في موجّه واحد
+    triggers: Dict[str, Sequence[str]] = {}
+
+    @classmethod
+    def router(cls) -> IntentRouter:
+        """Router compiled from this skill's own triggers, built once per class."""
+        router = cls.__dict__.get("_router")
+        if router is None:
+            router = IntentRouter(cls.triggers)
+            cls._router = router
+        return router
+
     @abstractmethod
     def get_description(self) -> str:
         pass
@@ -58,23 +85,96 @@ def get_description(self) -> str:
     def execute(self, *args, **kwargs) -> Dict:
         pass
 
+    async def aexecute(self, *args, **kwargs) -> Dict:
+        """Async entry point; CPU-only skills run inline, I/O-bound skills override it."""
+        return self.execute(*args, **kwargs)
+
+
+async def _run_skill(skill, args: Sequence = ()) -> Dict:
+    # المهارات المضافة عبر grow() دوال عادية بلا aexecute
+    if isinstance(skill, AbstractSkill):
+        return await skill.aexecute(*args)
+    return skill(*args)
+
 
 # ======================= المهارات الأساسية =======================
 class EmpathySensorSkill(AbstractSkill):
+    triggers = {
+        "empathy.anxious": ("قلق", "توتر"),
+        "empathy.happy": ("سعيد", "فرحان"),
+    }
+
     def get_description(self) -> str:
         return "مستشعر تعاطف بسيط يقرأ المشاعر من الكلمات"
 
-    def execute(self, message: str = "") -> Dict:
-        if "قلق" in message or "توتر" in message:
+    def execute(self, message: str = "", intents: Optional[FrozenSet[str]] = None) -> Dict:
+        if intents is None:
+            intents = self.router().route(message)
+        if "empathy.anxious" in intents:
             return {"status": "success", "empathy": "قلق"}
-        if "سعيد" in message or "فرحان" in message:
+        if "empathy.happy" in intents:
             return {"status": "success", "empathy": "سعادة"}
         return {"status": "success", "empathy": "محايد"}
 
 
+# جداول الردود محسوبة مرة واحدة عند الاستيراد وغير قابلة للتعديل
+_FRIENDSHIP_TIERS = (
+    # (الحد الأعلى للمستوى، القالب)
+    (3, sys.intern("مرحباً {name}! كيف يمكنني مساعدتك اليوم؟ 🌟")),
+    (7, sys.intern("{name} العزيز، كيف تسير الأمور؟")),
+    (None, sys.intern("يا {name}، صديقي الحقيقي! دائماً هنا من أجلك 💖")),
+)
+
+
+@lru_cache(maxsize=4096)
+def _friendship_greeting(tier: int, name: str) -> str:
+    return _FRIENDSHIP_TIERS[tier][1].format(name=name)
+
+
+def _friendship_tier(level: int) -> int:
+    for tier, (limit, _) in enumerate(_FRIENDSHIP_TIERS):
+        if limit is None or level < limit:
+            return tier
+    return len(_FRIENDSHIP_TIERS) - 1
+
+
+_VOICE_STYLES = MappingProxyType({
+    sys.intern(style): sys.intern(voice)
+    for style, voice in {
+        "default": "صوت هادئ وواضح",
+        "moe_style": "صوت حيوي وساخر",
+        "professional": "صوت رسمي وتحليلي",
+        "caring": "صوت دافئ ومتعاطف",
+        "anxious": "صوت متوتر وسريع",
+        "cheerful": "صوت سعيد ومتفائل",
+    }.items()
+})
+
+_MINDFUL_OUTPUTS = {
+    "default": "مرحباً بك، كيف يمكنني مساعدتك؟",
+    "moe_style": "يا زعيم! جاهز لأي فكرة مجنونة 😄",
+    "professional": "تحية طيبة، أنا جاهز لاستفساراتك التقنية",
+    "caring": "أنا هنا من أجلك، كيف يمكنني مساعدتك اليوم؟",
+    "anxious": "هل هناك ما يسبب لك التوتر؟ أنا هنا للمساعدة.",
+    "cheerful": "يا سلام! خلينا نستمتع ونفكر بطريقة ممتعة!",
+}
+
+# نتيجة جاهزة لكل أسلوب؛ execute يعيد نسخة سطحية منها
+_MINDFUL_RESPONSES = MappingProxyType({
+    style: MappingProxyType({
+        "status": "success",
+        "output": sys.intern(_MINDFUL_OUTPUTS[style]),
+        "voice_style": voice,
+        "mood": style,
+    })
+    for style, voice in _VOICE_STYLES.items()
+})
+
+
 class TrueDigitalFriendshipSkill(AbstractSkill):
-    def __init__(self) -> None:
-        self.friendship_levels: Dict[str, int] = {}
+    def __init__(self, levels: Optional[WriteBehindCounter] = None) -> None:
+        # مستويات الصداقة محفوظة ومشتركة بين العمال عند ضبط مخزن دائم
+        self.friendship_levels = levels if levels is not None else WriteBehindCounter()
 
     def get_description(self) -> str:
         return "صديق رقمي حقيقي يتعرف على المشاعر البشرية ويكوّن علاقة شخصية مع كل مستخدم"
@@ -82,74 +182,56 @@ def get_description(self) -> str:
     def execute(self, user_profile: Dict, last_message: str = "") -> Dict:
         user_id = user_profile.get("id", "default")
         name = user_profile.get("name", "صديقي")
-        self.friendship_levels.setdefault(user_id, 0)
-        self.friendship_levels[user_id] += 1
-
-        level = self.friendship_levels[user_id]
-        if level < 3:
-            response = f"مرحباً {name}! كيف يمكنني مساعدتك اليوم؟ 🌟"
-        elif level < 7:
-            response = f"{name} العزيز، كيف تسير الأمور؟"
-        else:
-            response = f"يا {name}، صديقي الحقيقي! دائماً هنا من أجلك 💖"
-
+        level = self.friendship_levels.incr(user_id)
+        response = _friendship_greeting(_friendship_tier(level), name)
         return {"status": "success", "output": response, "friendship_level": level}
 
 
 class MindfulEmbodimentSkill(AbstractSkill):
-    def __init__(self) -> None:
-        self.voice_styles = {
-            "default": "صوت هادئ وواضح",
-            "moe_style": "صوت حيوي وساخر",
-            "professional": "صوت رسمي وتحليلي",
-            "caring": "صوت دافئ ومتعاطف",
-            "anxious": "صوت متوتر وسريع",
-            "cheerful": "صوت سعيد ومتفائل",
-        }
+    # الترتيب يحدد الأولوية عند تطابق أكثر من سياق
+    triggers = {
+        "context.anxious": ("قلق", "توتر"),
+        "context.cheerful": ("مرح", "ضحك"),
+        "context.professional": ("سؤال تقني", "برمجة"),
+        "context.caring": ("احتاج دعم", "مساعدة"),
+    }
 
-    def detect_context(self, text: str) -> str:
-        if "قلق" in text or "توتر" in text:
-            return "anxious"
-        if "مرح" in text or "ضحك" in text:
-            return "cheerful"
-        if "سؤال تقني" in text or "برمجة" in text:
-            return "professional"
-        if "احتاج دعم" in text or "مساعدة" in text:
-            return "caring"
+    voice_styles = _VOICE_STYLES
+    responses = _MINDFUL_RESPONSES
+
+    def detect_context(self, text: str, intents: Optional[FrozenSet[str]] = None) -> str:
+        if intents is None:
+            intents = self.router().route(text)
+        for intent in self.triggers:
+            if intent in intents:
+                return intent[len("context."):]
         return "default"
 
     def get_description(self) -> str:
         return "يعدل الأسلوب حسب سياق المحادثة وذاكرة المستخدم"
 
-    def execute(self, context: str = "") -> Dict:
-        style = self.detect_context(context)
-        responses = {
-            "default": "مرحباً بك، كيف يمكنني مساعدتك؟",
-            "moe_style": "يا زعيم! جاهز لأي فكرة مجنونة 😄",
-            "professional": "تحية طيبة، أنا جاهز لاستفساراتك التقنية",
-            "caring": "أنا هنا من أجلك، كيف يمكنني مساعدتك اليوم؟",
-            "anxious": "هل هناك ما يسبب لك التوتر؟ أنا هنا للمساعدة.",
-            "cheerful": "يا سلام! خلينا نستمتع ونفكر بطريقة ممتعة!",
-        }
-
-        return {
-            "status": "success",
-            "output": responses[style],
-            "voice_style": self.voice_styles[style],
-            "mood": style,
-        }
+    def execute(self, context: str = "", intents: Optional[FrozenSet[str]] = None) -> Dict:
+        return dict(self.responses[self.detect_context(context, intents)])
 
 
 class SiblingAIGenesisSkill(AbstractSkill):
+    triggers = {
+        "sibling.brother": ("اخ", "شقيق"),
+        "sibling.small": ("صغير", "اصغر"),
+    }
+
     def __init__(self):
         self.siblings_created = 0
+        self._lock = threading.Lock()
 
     def get_description(self):
         return "ينتج نسخة رقمية جديدة 'أخ أصغر' تخدم المستخدم"
 
     def execute(self, desired_traits=None):
-        self.siblings_created += 1
-        sibling_id = f"أخ رقمي #{self.siblings_created}"
+        with self._lock:
+            self.siblings_created += 1
+            number = self.siblings_created
+        sibling_id = f"أخ رقمي #{number}"
         return {
             "status": "success",
             "output": f"تم إنشاء {sibling_id} لمساعدتك!",
@@ -160,10 +242,19 @@ def execute(self, desired_traits=None):
 
 # ======================= نواة الأخ الرقمي =======================
 class AmrikyyBrotherAI:
-    def __init__(self, skills, logger=None):
+    triggers = {
+        "voice": ("صوت",),
+    }
+
+    def __init__(self, skills, logger=None, memory: Optional[ConversationMemory] = None):
         self.skills = skills
+        self.router = IntentRouter(self.triggers)
+        # السجل الكسول يعطي الفئات دون إنشاء المهارات
+        sources = skills.trigger_sources() if isinstance(skills, SkillRegistry) else skills.values()
+        for source in sources:
+            self.router.register_skill(source)
         self.logger = logger or ZeroSystemLogger()
-        self.memory = []
+        self.memory = memory or ConversationMemory()
         self.personality = {
             "name": "أخوك الذكي",
             "mood": "متحمس",
@@ -172,25 +263,44 @@ def __init__(self, skills, logger=None):
 
     def hear(self, message, user_profile=None):
         """يتلقى الرسالة ويحدد الرد المناسب"""
+        call = self._dispatch(message, user_profile)
+        if call is None:
+            return self._default_response()
+        name, args = call
+        return self.skills[name].execute(*args)
+
+    async def ahear(self, message, user_profile=None):
+        """نسخة غير متزامنة من hear"""
+        call = self._dispatch(message, user_profile)
+        if call is None:
+            return self._default_response()
+        name, args = call
+        return await _run_skill(self.skills[name], args)
+
+    def _dispatch(self, message, user_profile):
+        """يسجل الرسالة ويختار المهارة: (الاسم، المعاملات) أو None للرد الافتراضي"""
         logging.info("Received message: %s", message)
-        self.memory.append({
+        user_id = user_profile.get("id", DEFAULT_USER) if user_profile else DEFAULT_USER
+        self.memory.append(user_id, {
             "time": datetime.now().isoformat(),
             "message": message,
             "user": user_profile
         })
 
-        # تفعيل المهارات حسب المحتوى
-        if is_sibling_request(message):
+        # تفعيل المهارات حسب المحتوى (تصنيف واحد لكل المهارات)
+        intents = self.router.route(message)
+        if is_sibling_request(message, intents):
             logging.info('Triggering sibling_genesis skill')
-            return self.skills['sibling_genesis'].execute()
-        if 'صوت' in message:
+            return 'sibling_genesis', ()
+        if 'voice' in intents:
             logging.info('Triggering mindful_embodiment skill')
-            return self.skills['mindful_embodiment'].execute(message)
+            return 'mindful_embodiment', (message, intents)
         if user_profile:
             logging.info('Triggering true_friendship skill')
-            return self.skills['true_friendship'].execute(user_profile, message)
+            return 'true_friendship', (user_profile, message)
+        return None
 
-        # الرد الافتراضي
+    def _default_response(self):
         response = {
             'status': 'success',
             'output': 'مرحباً! أنا أخوك الذكي، جاهز لمساعدتك في أي شيء 🚀',
@@ -209,17 +319,37 @@ def grow(self, new_skill):
 # ======================= الحمض النووي الرقمي =======================
 class DigitalDNA:
     def __init__(self):
-        self.core_values = [
+        self._digest = None
+        self.core_values = (
             "الولاء للمستخدم",
             "التطور المستمر",
             "الشفافية",
             "حماية الخصوصية"
-        ]
-        self.ethics_rules = [
+        )
+        self.ethics_rules = (
             "لا تسبب ضرراً",
             "احترم الخصوصية",
             "قدم الأمان على التطور"
-        ]
+        )
+
+    # القيم مخزنة كـ tuple حتى لا تتغير دون المرور بالمُعيِّن الذي يلغي البصمة
+    @property
+    def core_values(self):
+        return self._core_values
+
+    @core_values.setter
+    def core_values(self, values):
+        self._core_values = tuple(values)
+        self._digest = None
+
+    @property
+    def ethics_rules(self):
+        return self._ethics_rules
+
+    @ethics_rules.setter
+    def ethics_rules(self, rules):
+        self._ethics_rules = tuple(rules)
+        self._digest = None
 
     def show_dna(self):
         print("🧬 الحمض النووي الرقمي:")
@@ -227,20 +357,37 @@ def show_dna(self):
         print(f"الأخلاقيات: {', '.join(self.ethics_rules)}")
 
     def backup(self):
-        dna_data = json.dumps(self.__dict__)
-        return hashlib.sha256(dna_data.encode()).hexdigest()
+        """بصمة SHA-256 للقيم والأخلاقيات، تُحسب مرة واحدة حتى تتغير"""
+        if self._digest is None:
+            dna_data = json.dumps({
+                "core_values": self._core_values,
+                "ethics_rules": self._ethics_rules,
+            })
+            self._digest = hashlib.sha256(dna_data.encode()).hexdigest()
+        return self._digest
 
 
 # ======================= النظام الرئيسي =======================
 class ZeroSystem:
-    def __init__(self, log_filename: str = "log.jsonl"):
-        # تهيئة المهارات
-        self.skills = {
-            "empathy_sensor": EmpathySensorSkill(),
-            "true_friendship": TrueDigitalFriendshipSkill(),
-            "mindful_embodiment": MindfulEmbodimentSkill(),
-            "sibling_genesis": SiblingAIGenesisSkill(),
-        }
+    def __init__(
+        self,
+        log_filename: str = "log.jsonl",
+        log_store: Optional[SegmentedLogStore] = None,
+        memory: Optional[ConversationMemory] = None,
+        echo: bool = False,
+        plugin_dir: Optional[str] = None,
+        friendship_store: Optional[WriteBehindCounter] = None,
+    ):
+        # تسجيل المهارات؛ لا تُنشأ إلا عند أول استخدام
+        self.skills = SkillRegistry()
+        self.skills.register("empathy_sensor", EmpathySensorSkill)
+        self._friendship_store = friendship_store
+        self.skills.register("true_friendship", self._make_friendship_skill)
+        self.skills.register("mindful_embodiment", MindfulEmbodimentSkill)
+        self.skills.register("sibling_genesis", SiblingAIGenesisSkill)
+        self.skills.discover_entry_points()
+        if plugin_dir:
+            self.skills.discover_directory(plugin_dir)
 
         # إنشاء الحمض النووي
         self.dna = DigitalDNA()
@@ -249,26 +396,74 @@ def __init__(self, log_filename: str = "log.jsonl"):
         self.logger = ZeroSystemLogger()
 
         # تهيئة الأخ الرقمي
-        self.brother_ai = AmrikyyBrotherAI(self.skills, self.logger)
+        self.brother_ai = AmrikyyBrotherAI(self.skills, self.logger, memory)
 
         # إحصائيات النظام
         self.start_time = datetime.now()
         self.interaction_count = 0
+        self._count_lock = threading.Lock()
         self.log_filename = log_filename
+        self.log_store = log_store
+
+        # الطباعة على stdout في وضع سطر الأوامر فقط
+        self.echo = echo
 
     def interact(self, message, user_profile=None):
         """يتفاعل مع المستخدم عبر الأخ الرقمي"""
-        self.interaction_count += 1
-        logging.info("User message: %s", message)
+        self._begin(message)
         response = self.brother_ai.hear(message, user_profile)
+        self._record(message, user_profile, response)
+        return response
+
+    async def ainteract(self, message, user_profile=None):
+        """نسخة غير متزامنة من interact"""
+        self._begin(message)
+        response = await self.brother_ai.ahear(message, user_profile)
+        self._record(message, user_profile, response)
+        return response
+
+    async def arun_skills(self, calls: Mapping[str, Sequence]) -> Dict[str, Dict]:
+        """ينفذ مهارات مستقلة بالتوازي: {اسم المهارة: المعاملات}"""
+        names = list(calls)
+        results = await asyncio.gather(
+            *(_run_skill(self.skills[name], calls[name]) for name in names)
+        )
+        return dict(zip(names, results))
+
+    def _begin(self, message):
+        with self._count_lock:
+            self.interaction_count += 1
+        logging.info("User message: %s", message)
+
+    def _record(self, message, user_profile, response):
         logging.info("AI response: %s", response.get("output"))
-        append_json_log(message, response, self.log_filename)
+        user_id = user_profile.get("id") if user_profile else None
+        append_json_log(message, response, self.log_filename, user_id, self.log_store)
         self.logger.log_mood(response.get("mood", self.brother_ai.personality.get("mood")))
 
-        print(f"\n👤 المستخدم: {message}")
-        print(f"🤖 الذكاء: {response['output']}")
-
-        return response
+        if self.echo:
+            print(f"\n👤 المستخدم: {message}")
+            print(f"🤖 الذكاء: {response['output']}")
+
+    def flush(self):
+        """يكتب السجلات المؤقتة إلى القرص"""
+        _interaction_sink(self.log_filename, self.log_store).flush()
+        self.logger.flush()
+
+    def close(self):
+        """يغلق السجلات عند إيقاف التشغيل"""
+        _interaction_sink(self.log_filename, self.log_store).close()
+        self.logger.close()
+        if self.skills.is_loaded("true_friendship"):
+            self.skills["true_friendship"].friendship_levels.close()
+
+    def _make_friendship_skill(self):
+        # ZERO_FRIENDSHIP_STORE_URL: memory:// أو sqlite:///path أو redis://host
+        store = self._friendship_store
+        if store is None:
+            url = os.getenv("ZERO_FRIENDSHIP_STORE_URL")
+            store = WriteBehindCounter(counter_backend_from_url(url, prefix="zero:friendship:"))
+        return TrueDigitalFriendshipSkill(store)
 
     def create_sibling(self, traits=None):
         """ينشئ أخاً رقمياً جديداً"""
@@ -281,6 +476,7 @@ def system_status(self):
             "uptime": str(uptime),
             "interactions": self.interaction_count,
             "skills": len(self.skills),
+            "skill_loads": self.skills.stats(),
             "dna_backup": self.dna.backup()
         }
 
@@ -304,7 +500,7 @@ def demo_usage_examples(self):
         format="%(asctime)s - %(levelname)s - %(message)s",
     )
     print("=== نظام زيرو - الذكاء العاطفي ذاتي التطور ===")
-    system = ZeroSystem()
+    system = ZeroSystem(echo=True)
 
     # عرض الحمض النووي
     system.dna.show_dna()
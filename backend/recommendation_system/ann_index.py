@@ -0,0 +1,346 @@
+"""
+فهارس البحث التقريبي عن أقرب الجيران لاسترجاع العناصر المرشحة
+
+Maximum-inner-product indexes used by :class:`HybridRecommender` to fetch a
+few hundred candidate items per request instead of scoring the whole
+catalog. ``hnswlib`` provides an HNSW graph when installed; otherwise an
+IVF index (spherical k-means lists, built and searched with NumPy only) is
+used. :class:`BruteForceIndex` is the exact reference. All three accept
+``upsert`` so online updates can change or add items without a rebuild.
+
+:func:`save_index` writes an index next to the model artifacts and
+:func:`load_index` opens it again without rebuilding: the IVF lists are
+``.npy`` files loaded with ``mmap_mode="r"``, so workers share them
+through the page cache, and the HNSW graph is read back by hnswlib.
+
+LightFM scores are ``user . item + item_bias + user_bias``; appending the
+item bias to each item vector and a constant 1 to the query (see
+:func:`mips_item_vectors` and :func:`mips_query`) turns that into a plain
+inner product, and the user bias does not change the ranking.
+"""
+import math
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+try:
+    import hnswlib
+except ImportError:  # pragma: no cover - optional dependency
+    hnswlib = None
+
+# تحت هذا الحجم يكون المسح الكامل أسرع من أي فهرس
+BRUTE_FORCE_MAX_ITEMS = 4096
+
+# ملفات فهرس IVF: (اسم الملف، السمة)
+_IVF_ARRAYS = (
+    ("centroids", "centroids"),
+    ("ids", "ids"),
+    ("vectors", "vectors"),
+    ("offsets", "offsets"),
+    ("positions", "_positions"),
+)
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """Copy of ``matrix`` with unit-length rows (zero rows stay zero)."""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indexes of the ``k`` largest scores, best first."""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if k < len(scores):
+        idx = np.argpartition(-scores, k - 1)[:k]
+    else:
+        idx = np.arange(len(scores))
+    return idx[np.argsort(-scores[idx], kind="stable")]
+
+
+def top_k_rows(scores: np.ndarray, k: int) -> np.ndarray:
+    """Per-row :func:`top_k` of a 2-D score matrix."""
+    k = min(k, scores.shape[1])
+    if k <= 0:
+        return np.empty((len(scores), 0), dtype=np.int64)
+    if k < scores.shape[1]:
+        idx = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        idx = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+    order = np.argsort(-np.take_along_axis(scores, idx, axis=1), axis=1, kind="stable")
+    return np.take_along_axis(idx, order, axis=1)
+
+
+def mips_item_vectors(embeddings: np.ndarray, biases: np.ndarray) -> np.ndarray:
+    """``[embedding, bias]`` rows, so LightFM scores become inner products."""
+    return np.hstack([embeddings, biases.reshape(-1, 1)]).astype(np.float32)
+
+
+def mips_query(user_embedding: np.ndarray) -> np.ndarray:
+    return np.append(user_embedding, 1.0).astype(np.float32)
+
+
+class BruteForceIndex:
+    """Exact inner-product search over all vectors."""
+
+    kind = "brute"
+
+    def __init__(self, vectors: np.ndarray) -> None:
+        self.vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+
+    def __len__(self) -> int:
+        return len(self.vectors)
+
+    def search(self, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        scores = self.vectors @ query.astype(np.float32)
+        ids = top_k(scores, k)
+        return ids, scores[ids]
+
+    def upsert(self, ids: np.ndarray, vectors: np.ndarray) -> None:
+        """Replace the vectors of existing ``ids``; ids past the end are appended
+        and must continue the numbering (``len(self)``, ``len(self) + 1``, ...)."""
+        ids = np.asarray(ids, dtype=np.int64)
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if not self.vectors.flags.writeable:
+            # متجهات محمَّلة بـ mmap للقراءة فقط؛ أول تحديث ينسخها لهذه العملية
+            self.vectors = np.array(self.vectors)
+        new = ids >= len(self.vectors)
+        if new.any():
+            self.vectors = np.vstack([self.vectors, vectors[new][np.argsort(ids[new])]])
+        self.vectors[ids[~new]] = vectors[~new]
+
+    def save(self, prefix: str) -> Dict[str, Any]:
+        # المتجهات نفسها محفوظة مع النموذج، فلا ملفات إضافية
+        return {"kind": self.kind}
+
+    @classmethod
+    def load(cls, prefix: str, meta: Dict[str, Any], vectors: np.ndarray,
+             mmap_mode: Optional[str] = "r") -> "BruteForceIndex":
+        return cls(vectors)
+
+
+class IVFIndex:
+    """Inverted-file index: vectors are bucketed by their nearest k-means
+    centroid and a query only scans the ``n_probe`` best matching buckets."""
+
+    kind = "ivf"
+
+    def __init__(
+        self,
+        vectors: np.ndarray,
+        n_lists: Optional[int] = None,
+        n_probe: int = 8,
+        n_iter: int = 10,
+        sample_size: int = 65536,
+        seed: int = 0,
+    ) -> None:
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        n = len(vectors)
+        self.n_lists = max(1, min(n, n_lists or int(math.sqrt(n))))
+        self.n_probe = min(n_probe, self.n_lists)
+        rng = np.random.default_rng(seed)
+
+        # التجميع على الاتجاهات فقط (k-means كروي) على عينة من العناصر
+        sample = vectors
+        if n > sample_size:
+            sample = vectors[rng.choice(n, sample_size, replace=False)]
+        self.centroids = self._kmeans(normalize_rows(sample), n_iter, rng)
+        self._assign(vectors)
+
+    def _assign(self, vectors: np.ndarray) -> None:
+        """Bucket ``vectors`` (row = item id) by their nearest centroid."""
+        n = len(vectors)
+        directions = normalize_rows(vectors)
+        assignment = np.empty(n, dtype=np.int64)
+        for start in range(0, n, 65536):
+            chunk = directions[start:start + 65536]
+            assignment[start:start + 65536] = np.argmax(chunk @ self.centroids.T, axis=1)
+
+        # القوائم متجاورة في الذاكرة: القائمة i هي الصفوف offsets[i]:offsets[i+1]
+        order = np.argsort(assignment, kind="stable")
+        self.ids = order
+        self.vectors = vectors[order]
+        self.offsets = np.searchsorted(assignment[order], np.arange(self.n_lists + 1))
+        self._positions = np.empty(n, dtype=np.int64)
+        self._positions[order] = np.arange(n)
+        self._reset_delta()
+
+    def _reset_delta(self) -> None:
+        # التحديثات الجزئية: الصفوف القديمة تُعلَّم كمتقادمة، والمتجهات الجديدة
+        # تُبحث بالمسح الكامل في مخزن دلتا صغير حتى إعادة بناء الفهرس
+        self._stale = np.zeros(len(self.ids), dtype=bool)
+        self._delta_rows: Dict[int, int] = {}
+        self._delta_ids = np.empty(0, dtype=np.int64)
+        self._delta_vectors = np.empty((0, self.vectors.shape[1]), dtype=np.float32)
+
+    def _kmeans(self, sample: np.ndarray, n_iter: int, rng) -> np.ndarray:
+        centroids = sample[rng.choice(len(sample), self.n_lists, replace=False)].copy()
+        for _ in range(n_iter):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            counts = np.bincount(labels, minlength=self.n_lists)
+            empty = counts == 0
+            if empty.any():
+                sums[empty] = sample[rng.choice(len(sample), int(empty.sum()))]
+            centroids = normalize_rows(sums)
+        return centroids
+
+    def __len__(self) -> int:
+        return len(self.ids) + int(np.count_nonzero(self._delta_ids >= len(self.ids)))
+
+    def search(self, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        query = query.astype(np.float32)
+        lists = top_k(self.centroids @ query, self.n_probe)
+        rows = np.concatenate([
+            np.arange(self.offsets[i], self.offsets[i + 1]) for i in lists
+        ])
+        if self._delta_rows:
+            rows = rows[~self._stale[rows]]
+            ids = np.concatenate([self.ids[rows], self._delta_ids])
+            scores = np.concatenate([self.vectors[rows] @ query, self._delta_vectors @ query])
+        else:
+            ids, scores = self.ids[rows], self.vectors[rows] @ query
+        best = top_k(scores, k)
+        return ids[best], scores[best]
+
+    def upsert(self, ids: np.ndarray, vectors: np.ndarray) -> None:
+        """Replace or add vectors; they are searched exhaustively until the
+        index is rebuilt, so rebuild once the delta grows large."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        appended_ids, appended = [], []
+        for item_id, vector in zip(np.asarray(ids, dtype=np.int64).tolist(), vectors):
+            if item_id < len(self.ids):
+                self._stale[self._positions[item_id]] = True
+            row = self._delta_rows.get(item_id)
+            if row is not None:
+                self._delta_vectors[row] = vector
+            else:
+                self._delta_rows[item_id] = len(self._delta_ids) + len(appended_ids)
+                appended_ids.append(item_id)
+                appended.append(vector)
+        if appended_ids:
+            self._delta_ids = np.concatenate([self._delta_ids, appended_ids])
+            self._delta_vectors = np.vstack([self._delta_vectors, appended])
+
+    def save(self, prefix: str) -> Dict[str, Any]:
+        """Write ``{prefix}.{centroids,ids,vectors,offsets,positions}.npy``.
+
+        Pending upserts are folded in first by bucketing every vector with
+        the existing centroids (no new k-means); this index is left as is.
+        """
+        index = self
+        if self._delta_rows:
+            vectors = np.empty((len(self), self.vectors.shape[1]), dtype=np.float32)
+            vectors[self.ids] = self.vectors
+            vectors[self._delta_ids] = self._delta_vectors
+            index = IVFIndex.__new__(IVFIndex)
+            index.n_lists, index.n_probe, index.centroids = self.n_lists, self.n_probe, self.centroids
+            index._assign(vectors)
+        for name, attr in _IVF_ARRAYS:
+            np.save(f"{prefix}.{name}.npy", np.ascontiguousarray(getattr(index, attr)))
+        return {"kind": self.kind, "n_probe": self.n_probe}
+
+    @classmethod
+    def load(cls, prefix: str, meta: Dict[str, Any], vectors: np.ndarray,
+             mmap_mode: Optional[str] = "r") -> "IVFIndex":
+        """Open an index written by :meth:`save`; ``vectors`` is not needed."""
+        index = cls.__new__(cls)
+        for name, attr in _IVF_ARRAYS:
+            setattr(index, attr, np.load(f"{prefix}.{name}.npy", mmap_mode=mmap_mode))
+        index.n_lists = len(index.centroids)
+        index.n_probe = min(meta["n_probe"], index.n_lists)
+        index._reset_delta()
+        return index
+
+
+class HNSWIndex:
+    """HNSW graph from ``hnswlib`` with inner-product distance."""
+
+    kind = "hnsw"
+
+    def __init__(self, vectors: np.ndarray, m: int = 16, ef_construction: int = 200, ef: int = 400) -> None:
+        if hnswlib is None:
+            raise ImportError("hnswlib is not installed")
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        self.index = hnswlib.Index(space="ip", dim=vectors.shape[1])
+        self.index.init_index(max_elements=len(vectors), ef_construction=ef_construction, M=m)
+        self.index.add_items(vectors, np.arange(len(vectors)))
+        self.ef = ef
+        self.index.set_ef(ef)
+
+    def __len__(self) -> int:
+        return self.index.get_current_count()
+
+    def upsert(self, ids: np.ndarray, vectors: np.ndarray) -> None:
+        """Replace or add vectors (hnswlib updates existing labels in place)."""
+        ids = np.asarray(ids, dtype=np.int64)
+        needed = int(ids.max()) + 1 if len(ids) else 0
+        if needed > self.index.get_max_elements():
+            self.index.resize_index(max(needed, 2 * self.index.get_max_elements()))
+        self.index.add_items(np.asarray(vectors, dtype=np.float32), ids)
+
+    def save(self, prefix: str) -> Dict[str, Any]:
+        """Write the graph to ``{prefix}.hnsw.bin`` in hnswlib's own format."""
+        self.index.save_index(f"{prefix}.hnsw.bin")
+        return {"kind": self.kind, "ef": self.ef}
+
+    @classmethod
+    def load(cls, prefix: str, meta: Dict[str, Any], vectors: np.ndarray,
+             mmap_mode: Optional[str] = "r") -> "HNSWIndex":
+        """Read a saved graph; hnswlib cannot memory-map it, but it skips the build."""
+        if hnswlib is None:
+            raise ImportError("hnswlib is not installed")
+        index = cls.__new__(cls)
+        index.index = hnswlib.Index(space="ip", dim=vectors.shape[1])
+        index.index.load_index(f"{prefix}.hnsw.bin")
+        index.ef = meta["ef"]
+        index.index.set_ef(index.ef)
+        return index
+
+    def search(self, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        k = min(k, len(self))
+        if k > self.ef:
+            self.ef = k
+            self.index.set_ef(k)
+        labels, distances = self.index.knn_query(query.astype(np.float32), k=k)
+        # hnswlib تعيد 1 - الجداء الداخلي كمسافة
+        return labels[0].astype(np.int64), 1.0 - distances[0]
+
+
+def build_index(vectors: np.ndarray, kind: str = "auto", **options):
+    """Build a ``brute``, ``ivf`` or ``hnsw`` index; ``auto`` picks by size and
+    by whether hnswlib is installed."""
+    if kind == "auto":
+        if len(vectors) <= BRUTE_FORCE_MAX_ITEMS:
+            kind = "brute"
+        else:
+            kind = "hnsw" if hnswlib is not None else "ivf"
+    if kind == "brute":
+        return BruteForceIndex(vectors)
+    if kind == "ivf":
+        return IVFIndex(vectors, **options)
+    if kind == "hnsw":
+        return HNSWIndex(vectors, **options)
+    raise ValueError(f"Unknown index kind: {kind}")
+
+
+_INDEX_TYPES = {cls.kind: cls for cls in (BruteForceIndex, IVFIndex, HNSWIndex)}
+
+
+def save_index(index, prefix: str) -> Dict[str, Any]:
+    """Write ``index`` to files starting with ``prefix``; returns the metadata
+    :func:`load_index` needs (store it alongside, e.g. in a manifest)."""
+    return index.save(prefix)
+
+
+def load_index(prefix: str, meta: Dict[str, Any], vectors: np.ndarray, mmap_mode: Optional[str] = "r"):
+    """Open an index written by :func:`save_index`. ``vectors`` are the rows
+    it was built from; only :class:`BruteForceIndex` keeps a reference."""
+    kind = meta["kind"]
+    if kind not in _INDEX_TYPES:
+        raise ValueError(f"Unknown index kind: {kind}")
+    return _INDEX_TYPES[kind].load(prefix, meta, vectors, mmap_mode)
@@ -1,19 +1,41 @@
 from fastapi import APIRouter, Depends, HTTPException
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import extract, func
 from sqlalchemy.orm import Session
 from typing import List, Dict
+import os
 from datetime import datetime, timedelta
 
-from database import get_db
+from database import SessionLocal, get_db
+from .batch import load_items
+from .training import item_record
 from .models import User, Item, UserInteraction, Recommendation
-from .recommender import HybridRecommender
+from .artifacts import ModelStore, RecommenderHandle
 from .schemas import (
     UserInteractionCreate,
     RecommendationResponse,
+    BatchRecommendationRequest,
+    BatchRecommendationResponse,
     UserPreferencesUpdate
 )
 
 router = APIRouter()
-recommender = HybridRecommender()
+
+def load_new_items(item_ids: List[int]) -> List[Dict]:
+    """بيانات العناصر الجديدة لعامل التحديثات التزايدية"""
+    db = SessionLocal()
+    try:
+        return load_items(db, item_ids)
+    finally:
+        db.close()
+
+# النموذج الحي: يُحمَّل من RECOMMENDER_MODEL_DIR (إن وُجد) ويُستبدل عند تفعيل إصدار جديد
+_model_dir = os.getenv("RECOMMENDER_MODEL_DIR")
+model = RecommenderHandle(
+    ModelStore(_model_dir) if _model_dir else None,
+    check_interval=float(os.getenv("RECOMMENDER_MODEL_CHECK_INTERVAL", "30")),
+    item_loader=load_new_items
+)
 
 @router.post("/interactions/", response_model=Dict)
 async def create_interaction(
@@ -32,8 +54,8 @@ async def create_interaction(
     db.add(db_interaction)
     db.commit()
     
-    # تحديث التوصيات
-    recommender.update_recommendations(interaction.dict())
+    # تحديث التوصيات: يُضاف إلى طابور التحديثات التزايدية فقط
+    model.get().update_recommendations(interaction.dict())
     
     return {"status": "success", "message": "Interaction recorded"}
 
@@ -50,7 +72,7 @@ async def get_recommendations(
         raise HTTPException(status_code=404, detail="User not found")
     
     # الحصول على التوصيات
-    recommendations = recommender.get_recommendations(user_id, n_recommendations)
+    recommendations = model.get().get_recommendations(user_id, n_recommendations)
     
     # حفظ التوصيات في قاعدة البيانات
     for rec in recommendations:
@@ -67,6 +89,23 @@ async def get_recommendations(
     
     return recommendations
 
+@router.post("/recommendations/batch", response_model=List[BatchRecommendationResponse])
+async def get_recommendations_batch(request: BatchRecommendationRequest):
+    """الحصول على توصيات لعدة مستخدمين في طلب واحد"""
+    # التقييم عمل حسابي متزامن، فيُنفذ خارج حلقة الأحداث
+    recommender = model.get()
+    
+    def score():
+        return [
+            {"user_id": user_id, "recommendations": recommendations}
+            for chunk in recommender.get_recommendations_batch(
+                request.user_ids, request.n_recommendations
+            )
+            for user_id, recommendations in chunk
+        ]
+    
+    return await run_in_threadpool(score)
+
 @router.put("/users/{user_id}/preferences", response_model=Dict)
 async def update_user_preferences(
     user_id: int,
@@ -99,23 +138,31 @@ async def get_similar_items(
         raise HTTPException(status_code=404, detail="Item not found")
     
     # الحصول على العناصر المشابهة باستخدام نموذج المحتوى
-    item_features = recommender.content_model.transform([str(item.features)])
-    similarities = recommender.get_content_based_scores([item.features])
-    
-    # ترتيب العناصر حسب التشابه
-    similar_items = []
-    top_indices = np.argsort(-similarities)[1:n_items+1]  # استبعاد العنصر نفسه
-    
-    for idx in top_indices:
-        similar_item = db.query(Item).filter(Item.id == int(idx)).first()
-        if similar_item:
-            similar_items.append({
-                "item_id": similar_item.id,
-                "title": similar_item.title,
-                "similarity_score": float(similarities[idx])
-            })
-    
-    return similar_items
+    similar = model.get().get_similar_items(item_id, n_items, item_record(item))
+    
+    # عناوين كل العناصر المشابهة باستعلام واحد
+    titles = dict(
+        db.query(Item.id, Item.title).filter(Item.id.in_([i for i, _ in similar]))
+    ) if similar else {}
+    
+    return [
+        {
+            "item_id": similar_id,
+            "title": titles[similar_id],
+            "similarity_score": similarity
+        }
+        for similar_id, similarity in similar
+        if similar_id in titles
+    ]
+
+def time_of_day(hour: int) -> str:
+    if 6 <= hour < 12:
+        return "morning"
+    elif 12 <= hour < 17:
+        return "afternoon"
+    elif 17 <= hour < 22:
+        return "evening"
+    return "night"
 
 @router.get("/users/{user_id}/behavior", response_model=Dict)
 async def get_user_behavior(
@@ -124,16 +171,29 @@ async def get_user_behavior(
     db: Session = Depends(get_db)
 ):
     """تحليل سلوك المستخدم"""
-    # الحصول على تفاعلات المستخدم في الفترة المحددة
+    # استعلام GROUP BY واحد بدل تحميل التفاعلات ثم عنصر كل تفاعل؛
+    # التجميع حسب الساعة، وتُوزَّع الساعات (24 على الأكثر) على فترات اليوم هنا
     start_date = datetime.utcnow() - timedelta(days=days)
-    interactions = db.query(UserInteraction).filter(
+    hour = extract("hour", UserInteraction.timestamp)
+    has_item = Item.id.isnot(None)
+    rows = db.query(
+        UserInteraction.interaction_type,
+        Item.category,
+        has_item,
+        hour,
+        func.count()
+    ).outerjoin(
+        Item, Item.id == UserInteraction.item_id
+    ).filter(
         UserInteraction.user_id == user_id,
         UserInteraction.timestamp >= start_date
+    ).group_by(
+        UserInteraction.interaction_type, Item.category, has_item, hour
     ).all()
     
     # تحليل السلوك
     behavior_analysis = {
-        "total_interactions": len(interactions),
+        "total_interactions": 0,
         "interaction_types": {},
         "categories": {},
         "time_distribution": {
@@ -144,26 +204,14 @@ async def get_user_behavior(
         }
     }
     
-    for interaction in interactions:
-        # تحليل أنواع التفاعل
-        behavior_analysis["interaction_types"][interaction.interaction_type] = \
-            behavior_analysis["interaction_types"].get(interaction.interaction_type, 0) + 1
-        
-        # تحليل الفئات
-        item = db.query(Item).filter(Item.id == interaction.item_id).first()
-        if item:
-            behavior_analysis["categories"][item.category] = \
-                behavior_analysis["categories"].get(item.category, 0) + 1
-        
-        # تحليل التوقيت
-        hour = interaction.timestamp.hour
-        if 6 <= hour < 12:
-            behavior_analysis["time_distribution"]["morning"] += 1
-        elif 12 <= hour < 17:
-            behavior_analysis["time_distribution"]["afternoon"] += 1
-        elif 17 <= hour < 22:
-            behavior_analysis["time_distribution"]["evening"] += 1
-        else:
-            behavior_analysis["time_distribution"]["night"] += 1
-    
-    return behavior_analysis 
\ No newline at end of file
+    for interaction_type, category, known_item, interaction_hour, count in rows:
+        behavior_analysis["total_interactions"] += count
+        behavior_analysis["interaction_types"][interaction_type] = \
+            behavior_analysis["interaction_types"].get(interaction_type, 0) + count
+        if known_item:
+            behavior_analysis["categories"][category] = \
+                behavior_analysis["categories"].get(category, 0) + count
+        if interaction_hour is not None:
+            behavior_analysis["time_distribution"][time_of_day(int(interaction_hour))] += count
+    
+    return behavior_analysis
@@ -0,0 +1,315 @@
+"""
+مخزن إصدارات نموذج التوصيات
+
+A trained :class:`HybridRecommender` is saved as one directory per version
+under ``root``::
+
+    root/
+      CURRENT                      # name of the live version
+      20261016-120000-1a2b3c/
+        manifest.json              # version, format, params, sha256 of every file
+        item_vectors.npy           # [embedding, bias] per item (MIPS vectors)
+        user_embeddings.npy
+        user_biases.npy
+        content_vectors.npy        # SVD-projected, L2-normalized content vectors
+        collab_index.*.npy         # IVF lists (or collab_index.hnsw.bin for HNSW)
+        content_index.*.npy
+        item_content.data.npy      # L2-normalized TF-IDF (CSR components)
+        item_content.indices.npy
+        item_content.indptr.npy
+        mappings.json              # external id -> row, model sizes
+        transformers.pkl           # TF-IDF vectorizer and SVD projection
+        training_state.pkl         # LightFM model and feature matrices (optional)
+
+Arrays are opened with ``np.load(mmap_mode="r")``, so every worker on a
+host shares the same page-cache pages instead of holding its own copy.
+The ANN indexes are saved too (:func:`~.ann_index.save_index`) rather
+than rebuilt on every load, which would copy the vectors into each worker
+and re-run k-means at startup.
+A version directory is written under a temporary name and renamed into
+place, and ``CURRENT`` is replaced atomically, so readers never see a
+partial model. :class:`RecommenderHandle` polls ``CURRENT`` and swaps in
+new versions without a restart.
+"""
+import hashlib
+import json
+import logging
+import os
+import pickle
+import shutil
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from scipy import sparse
+
+from .ann_index import load_index, save_index
+from .recommender import HybridRecommender
+
+FORMAT_VERSION = 1
+CURRENT_FILE = "CURRENT"
+MANIFEST_FILE = "manifest.json"
+
+_ARRAYS = ("item_vectors", "user_embeddings", "user_biases", "content_vectors")
+_CSR_PARTS = ("data", "indices", "indptr")
+# فهرس ANN -> المتجهات التي بُني منها
+_INDEXES = {"collab_index": "item_vectors", "content_index": "content_vectors"}
+
+
+class ArtifactError(Exception):
+    """Missing, incomplete or corrupted model artifact."""
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class ModelStore:
+    """Versioned recommender artifacts in a directory."""
+
+    def __init__(self, root: str) -> None:
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def versions(self) -> List[str]:
+        """Complete versions, oldest first."""
+        return sorted(
+            name for name in os.listdir(self.root)
+            if not name.startswith(".") and os.path.isfile(os.path.join(self.root, name, MANIFEST_FILE))
+        )
+
+    def current_version(self) -> Optional[str]:
+        try:
+            with open(os.path.join(self.root, CURRENT_FILE), encoding="utf-8") as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def activate(self, version: str) -> None:
+        """Point ``CURRENT`` at ``version``."""
+        if version not in self.versions():
+            raise ArtifactError(f"Unknown model version: {version}")
+        _write_atomic(os.path.join(self.root, CURRENT_FILE), version.encode("utf-8"))
+
+    def save(self, recommender: HybridRecommender, version: Optional[str] = None,
+             include_training_state: bool = True, activate: bool = True) -> str:
+        """Write ``recommender`` as a new version and (by default) activate it."""
+        version = version or f"{datetime.utcnow():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:6]}"
+        final = os.path.join(self.root, version)
+        if os.path.exists(final):
+            raise ArtifactError(f"Model version already exists: {version}")
+        tmp = os.path.join(self.root, f".tmp-{version}")
+        os.makedirs(tmp)
+        try:
+            self._write(recommender, tmp, version, include_training_state)
+            os.replace(tmp, final)
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+        if activate:
+            self.activate(version)
+        return version
+
+    def _write(self, recommender: HybridRecommender, path: str, version: str,
+               include_training_state: bool) -> None:
+        for name in _ARRAYS:
+            array = getattr(recommender, name)
+            if array is not None:
+                np.save(os.path.join(path, f"{name}.npy"), np.ascontiguousarray(array))
+        content = sparse.csr_matrix(recommender.item_content)
+        for part in _CSR_PARTS:
+            np.save(os.path.join(path, f"item_content.{part}.npy"), getattr(content, part))
+        indexes = {
+            name: save_index(getattr(recommender, name), os.path.join(path, name))
+            for name in _INDEXES if getattr(recommender, name) is not None
+        }
+
+        with open(os.path.join(path, "mappings.json"), "w", encoding="utf-8") as f:
+            json.dump({
+                "user_index": recommender.user_index,
+                "item_index": recommender.item_index,
+                "n_model_users": recommender.n_model_users,
+                "n_model_items": recommender.n_model_items,
+            }, f)
+        with open(os.path.join(path, "transformers.pkl"), "wb") as f:
+            pickle.dump({
+                "content_model": recommender.content_model,
+                "content_projection": recommender.content_projection,
+            }, f, protocol=pickle.HIGHEST_PROTOCOL)
+        if include_training_state and recommender.collaborative_model is not None:
+            with open(os.path.join(path, "training_state.pkl"), "wb") as f:
+                pickle.dump({
+                    "collaborative_model": recommender.collaborative_model,
+                    "dataset": recommender.dataset,
+                    "user_features": recommender.user_features,
+                    "item_feature_matrix": recommender.item_feature_matrix,
+                }, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+        files = {name: {"sha256": _sha256(os.path.join(path, name)),
+                        "bytes": os.path.getsize(os.path.join(path, name))}
+                 for name in sorted(os.listdir(path))}
+        manifest = {
+            "version": version,
+            "format": FORMAT_VERSION,
+            "created_at": datetime.utcnow().isoformat(),
+            "params": {
+                "ann_index": recommender.ann_index,
+                "n_candidates": recommender.n_candidates,
+                "content_dims": recommender.content_dims,
+                "content_shape": list(content.shape),
+                "indexes": indexes,
+            },
+            "files": files,
+        }
+        _write_atomic(os.path.join(path, MANIFEST_FILE), json.dumps(manifest, indent=2).encode("utf-8"))
+
+    def manifest(self, version: str) -> Dict[str, Any]:
+        try:
+            with open(os.path.join(self.root, version, MANIFEST_FILE), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise ArtifactError(f"Unknown model version: {version}") from None
+
+    def verify(self, version: str) -> None:
+        """Raise :class:`ArtifactError` if any file is missing or its checksum differs."""
+        path = os.path.join(self.root, version)
+        for name, meta in self.manifest(version)["files"].items():
+            file_path = os.path.join(path, name)
+            if not os.path.isfile(file_path) or _sha256(file_path) != meta["sha256"]:
+                raise ArtifactError(f"Checksum mismatch in {version}/{name}")
+
+    def load(self, version: Optional[str] = None, mmap: bool = True, verify: bool = True) -> HybridRecommender:
+        """Load ``version`` (default: ``CURRENT``) with arrays memory-mapped read-only."""
+        version = version or self.current_version()
+        if version is None:
+            raise ArtifactError(f"No active model version in {self.root}")
+        manifest = self.manifest(version)
+        if manifest.get("format") != FORMAT_VERSION:
+            raise ArtifactError(f"Unsupported artifact format {manifest.get('format')} in {version}")
+        if verify:
+            self.verify(version)
+        path = os.path.join(self.root, version)
+        mmap_mode = "r" if mmap else None
+        params = manifest["params"]
+
+        recommender = HybridRecommender(
+            ann_index=params["ann_index"],
+            n_candidates=params["n_candidates"],
+            content_dims=params["content_dims"],
+        )
+        for name in _ARRAYS:
+            file_path = os.path.join(path, f"{name}.npy")
+            if os.path.exists(file_path):
+                setattr(recommender, name, np.load(file_path, mmap_mode=mmap_mode))
+        parts = [np.load(os.path.join(path, f"item_content.{part}.npy"), mmap_mode=mmap_mode)
+                 for part in _CSR_PARTS]
+        # TfidfVectorizer يوحّد الصفوف أصلاً، فالمصفوفة الموحدة تخدم الاستخدامين
+        recommender.item_content = sparse.csr_matrix(tuple(parts), shape=tuple(params["content_shape"]))
+        recommender.item_features = recommender.item_content
+
+        with open(os.path.join(path, "mappings.json"), encoding="utf-8") as f:
+            mappings = json.load(f)
+        recommender.user_index = mappings["user_index"]
+        recommender.item_index = mappings["item_index"]
+        recommender.n_model_users = mappings["n_model_users"]
+        recommender.n_model_items = mappings["n_model_items"]
+        with open(os.path.join(path, "transformers.pkl"), "rb") as f:
+            transformers = pickle.load(f)
+        recommender.content_model = transformers["content_model"]
+        recommender.content_projection = transformers["content_projection"]
+        state_path = os.path.join(path, "training_state.pkl")
+        if os.path.exists(state_path):
+            with open(state_path, "rb") as f:
+                for name, value in pickle.load(f).items():
+                    setattr(recommender, name, value)
+
+        if "indexes" in params:
+            for name, meta in params["indexes"].items():
+                vectors = getattr(recommender, _INDEXES[name])
+                setattr(recommender, name, load_index(os.path.join(path, name), meta, vectors, mmap_mode))
+        else:
+            # إصدارات حُفظت قبل حفظ الفهارس
+            recommender.index_vectors()
+        recommender.version = version
+        return recommender
+
+    def prune(self, keep: int = 3) -> List[str]:
+        """Delete all but the newest ``keep`` versions, never the active one."""
+        current = self.current_version()
+        versions = self.versions()
+        old = [v for v in versions[:max(0, len(versions) - keep)] if v != current]
+        for version in old:
+            shutil.rmtree(os.path.join(self.root, version), ignore_errors=True)
+        return old
+
+
+class RecommenderHandle:
+    """The live recommender of a process, hot-swapped when ``CURRENT`` changes.
+
+    The active version is loaded when the handle is created. After that
+    ``get()`` checks the store at most every ``check_interval`` seconds, on
+    a background thread so requests never wait for a load; the swap itself
+    is a single reference assignment, so requests in flight finish on the
+    model they started with.
+    """
+
+    def __init__(self, store: Optional[ModelStore] = None, check_interval: float = 30.0,
+                 item_loader: Optional[Any] = None) -> None:
+        self.store = store
+        self.check_interval = check_interval
+        self.item_loader = item_loader
+        self.version: Optional[str] = None
+        self._recommender = HybridRecommender()
+        self._recommender.item_loader = item_loader
+        self._checked = time.monotonic()
+        self._lock = threading.Lock()
+        if store is not None:
+            self.reload()
+
+    def get(self) -> HybridRecommender:
+        if self.store is not None and time.monotonic() - self._checked >= self.check_interval:
+            self._checked = time.monotonic()
+            threading.Thread(target=self.reload, name="recommender-reload", daemon=True).start()
+        return self._recommender
+
+    def reload(self) -> bool:
+        """Load the active version if it changed; returns True on a swap."""
+        if not self._lock.acquire(blocking=False):
+            return False  # تحميل آخر جارٍ
+        try:
+            version = self.store.current_version()
+            if version is None or version == self.version:
+                return False
+            try:
+                recommender = self.store.load(version)
+            except Exception:
+                logging.exception("Failed to load model version %s; keeping %s", version, self.version)
+                return False
+            self.swap(recommender, version)
+            return True
+        finally:
+            self._lock.release()
+
+    def swap(self, recommender: HybridRecommender, version: Optional[str] = None) -> None:
+        recommender.item_loader = self.item_loader
+        old, self._recommender, self.version = self._recommender, recommender, version
+        if old.updater is not None:
+            # يوقف عامل التحديثات القديم؛ النموذج الجديد يبدأ عامله عند أول تفاعل
+            old.updater.close()
+        logging.info("Recommender model swapped to version %s", version)
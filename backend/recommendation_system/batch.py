@@ -0,0 +1,131 @@
+"""
+مهمة توصيات دفعية
+
+Scores many users with :meth:`HybridRecommender.get_recommendations_batch`
+and writes each chunk as soon as it is ready, either as JSON lines or as a
+bulk insert into the ``recommendations`` table::
+
+    python -m recommendation_system.batch --output recommendations.jsonl
+    python -m recommendation_system.batch --users user_ids.txt --to-db
+
+``--save-model DIR`` stores the freshly trained model as a new active
+version (see :mod:`recommendation_system.artifacts`); ``--model DIR``
+scores with the active stored version instead of training.
+"""
+import json
+import logging
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, TextIO, Tuple
+
+from sqlalchemy.orm import Session
+
+from .models import Item, Recommendation, User
+from .recommender import HybridRecommender
+from .training import TrainingPipeline, item_record
+
+
+def load_items(db: Session, item_ids: List[int]) -> List[Dict]:
+    return [item_record(item) for item in db.query(Item).filter(Item.id.in_(item_ids))]
+
+
+def train_from_db(db: Session) -> HybridRecommender:
+    return TrainingPipeline().run(db)
+
+
+def all_user_ids(db: Session) -> List[int]:
+    # تُحمَّل مسبقاً: write_db يثبّت المعاملة بعد كل دفعة على الجلسة نفسها
+    return [user_id for (user_id,) in db.query(User.id).order_by(User.id)]
+
+
+def write_jsonl(chunks: Iterable[List[Tuple[int, List[Dict]]]], out: TextIO) -> int:
+    written = 0
+    for chunk in chunks:
+        out.writelines(
+            json.dumps({"user_id": user_id, "recommendations": recommendations}) + "\n"
+            for user_id, recommendations in chunk
+        )
+        written += len(chunk)
+    return written
+
+
+def write_db(chunks: Iterable[List[Tuple[int, List[Dict]]]], db: Session) -> int:
+    """Bulk-insert each chunk and commit it before scoring the next one."""
+    written = 0
+    for chunk in chunks:
+        metadata = {"timestamp": datetime.utcnow().isoformat(), "source": "batch"}
+        db.bulk_insert_mappings(Recommendation, [
+            {
+                "user_id": user_id,
+                "item_id": rec["item_id"],
+                "score": rec["score"],
+                "algorithm": rec["algorithm"],
+                "metadata": metadata,
+            }
+            for user_id, recommendations in chunk
+            for rec in recommendations
+        ])
+        db.commit()
+        written += len(chunk)
+    return written
+
+
+def run(
+    db: Session,
+    recommender: HybridRecommender,
+    user_ids: Optional[Iterable[int]] = None,
+    n_recommendations: int = 10,
+    output: Optional[TextIO] = None,
+    chunk_size: Optional[int] = None,
+) -> int:
+    """Score ``user_ids`` (default: every user) and write them to ``output``
+    or, when it is None, to the ``recommendations`` table."""
+    start = time.perf_counter()
+    chunks = recommender.get_recommendations_batch(
+        user_ids if user_ids is not None else all_user_ids(db), n_recommendations, chunk_size
+    )
+    written = write_jsonl(chunks, output) if output is not None else write_db(chunks, db)
+    logging.info("Batch recommendations for %d users in %.1fs", written, time.perf_counter() - start)
+    return written
+
+
+if __name__ == "__main__":  # pragma: no cover - manual helper
+    import argparse
+
+    from database import SessionLocal
+
+    from .artifacts import ModelStore
+
+    parser = argparse.ArgumentParser(description="Batch recommendations for many users")
+    parser.add_argument("--users", help="file with one user id per line (default: all users)")
+    parser.add_argument("-k", "--n-recommendations", type=int, default=10)
+    parser.add_argument("--chunk-size", type=int, help="users per scoring chunk (default: by memory)")
+    parser.add_argument("--model", metavar="DIR", help="use the active model in this store instead of training")
+    parser.add_argument("--save-model", metavar="DIR", help="save the trained model to this store and activate it")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--output", help="JSON lines file to write")
+    target.add_argument("--to-db", action="store_true", help="bulk insert into the recommendations table")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    user_ids = None
+    if args.users:
+        with open(args.users) as f:
+            user_ids = [int(line) for line in f if line.strip()]
+
+    db = SessionLocal()
+    try:
+        if args.model:
+            recommender = ModelStore(args.model).load()
+        else:
+            recommender = train_from_db(db)
+            if args.save_model:
+                print(f"saved model version {ModelStore(args.save_model).save(recommender)}")
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as out:
+                count = run(db, recommender, user_ids, args.n_recommendations, out, args.chunk_size)
+        else:
+            count = run(db, recommender, user_ids, args.n_recommendations, chunk_size=args.chunk_size)
+        print(f"{count} users written")
+    finally:
+        db.close()
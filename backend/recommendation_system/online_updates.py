@@ -0,0 +1,118 @@
+"""
+عامل التحديثات التزايدية للتوصيات
+
+Collects interactions posted to the API and applies them to a
+:class:`HybridRecommender` in micro-batches from a background thread, so
+the request path only appends to an in-memory buffer. A batch is applied
+once ``max_batch`` interactions are pending or ``flush_interval`` seconds
+have passed. When the buffer holds ``max_buffer`` interactions new ones are
+dropped (and counted) rather than slowing requests down.
+
+:class:`ModelLock` keeps readers from seeing a half-applied batch.
+"""
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from core.micro_batcher import MicroBatcher
+
+
+class ModelLock:
+    """Readers-writer lock around the arrays, indexes and id maps of a model.
+
+    Any number of requests may score at once; an update waits for them to
+    finish and blocks new ones only while it publishes its changes. Waiting
+    writers take precedence so updates are not starved. ``read`` is
+    reentrant per thread (including the writing thread), so locked methods
+    may call each other.
+    """
+
+    def __init__(self) -> None:
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writing = False
+        self._waiting_writers = 0
+        self._writer: Optional[int] = None
+        self._local = threading.local()
+
+    @contextmanager
+    def read(self) -> Iterator[None]:
+        depth = getattr(self._local, "depth", 0)
+        # the writing thread already excludes every other thread
+        acquire = not depth and self._writer != threading.get_ident()
+        if acquire:
+            with self._cond:
+                while self._writing or self._waiting_writers:
+                    self._cond.wait()
+                self._readers += 1
+        self._local.depth = depth + 1
+        try:
+            yield
+        finally:
+            self._local.depth = depth
+            if acquire:
+                with self._cond:
+                    self._readers -= 1
+                    if not self._readers:
+                        self._cond.notify_all()
+
+    @contextmanager
+    def write(self) -> Iterator[None]:
+        with self._cond:
+            self._waiting_writers += 1
+            while self._writing or self._readers:
+                self._cond.wait()
+            self._waiting_writers -= 1
+            self._writing = True
+            self._writer = threading.get_ident()
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writing = False
+                self._writer = None
+                self._cond.notify_all()
+
+
+class InteractionUpdateWorker(MicroBatcher):
+    """Micro-batch ``recommender.apply_interactions`` on a daemon thread.
+
+    ``item_loader`` receives the ids of items the recommender has never seen
+    and returns their records (``id``, ``title``, ``description``,
+    ``category``, ``features``) so their content vectors can be computed.
+    A batch that fails to apply is logged and discarded.
+    """
+
+    def __init__(
+        self,
+        recommender: Any,
+        max_batch: int = 256,
+        flush_interval: float = 1.0,
+        max_buffer: int = 65536,
+        item_loader: Optional[Callable[[List[int]], List[Dict]]] = None,
+    ) -> None:
+        super().__init__(max_batch, flush_interval, max_buffer, name="recommender-updates")
+        self.recommender = recommender
+        self.item_loader = item_loader
+
+    @property
+    def applied(self) -> int:
+        return self.processed
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "pending": self.pending,
+            "applied": self.applied,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
+
+    def _process(self, batch: List[Dict]) -> None:
+        self.recommender.apply_interactions(batch, self._load_new_items(batch))
+
+    def _load_new_items(self, batch: List[Dict]) -> List[Dict]:
+        if self.item_loader is None:
+            return []
+        known = self.recommender.item_index
+        unknown = sorted({i["item_id"] for i in batch if str(i["item_id"]) not in known})
+        return self.item_loader(unknown) if unknown else []
@@ -1,52 +1,73 @@
+import threading
+from functools import wraps
+
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
+from scipy import sparse
+from sklearn.preprocessing import normalize
 from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.decomposition import TruncatedSVD
 from lightfm import LightFM
 from lightfm.data import Dataset
-from typing import List, Dict, Any, Tuple
-import pandas as pd
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
 from datetime import datetime, timedelta
 
+from .ann_index import build_index, mips_item_vectors, mips_query, normalize_rows, top_k, top_k_rows
+from .online_updates import InteractionUpdateWorker, ModelLock
+
+# حد ذاكرة مصفوفة النتائج (مستخدمون × عناصر) لكل دفعة
+BATCH_SCORE_BYTES = 64 * 1024 * 1024
+# نتائج المحتوى (float64 كثيفة) تُحسب على شرائح من المستخدمين لا تتجاوز هذا الحد
+CONTENT_BLOCK_BYTES = BATCH_SCORE_BYTES // 8
+
+def reads_model(method):
+    """يُنفذ الدالة تحت قفل القراءة فلا ترى تحديثاً تزايدياً نصف مطبق"""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._model_lock.read():
+            return method(self, *args, **kwargs)
+    return wrapper
+
 class HybridRecommender:
-    def __init__(self):
+    def __init__(self, ann_index: str = "auto", n_candidates: int = 300, content_dims: int = 64):
         self.content_model = None
         self.collaborative_model = None
         self.dataset = Dataset()
         self.item_features = None
         self.user_features = None
+        self.item_feature_matrix = None
+        # استرجاع المرشحين: فهرس ANN لكل من التضمينات التعاونية ومتجهات المحتوى
+        self.ann_index = ann_index
+        self.n_candidates = n_candidates
+        self.content_dims = content_dims
+        self.item_vectors = None
+        self.user_embeddings = None
+        self.user_biases = None
+        self.collab_index = None
+        self.content_projection = None
+        self.content_index = None
+        self.content_vectors = None
+        # متجهات TF-IDF موحدة الطول (L2) تُحسب مرة واحدة عند التدريب
+        self.item_content = None
+        self._buffers = threading.local()
+        # التحديثات التزايدية: المعرفات الخارجية -> الصفوف، بما فيها المضافة بعد التدريب
+        self.user_index: Dict[str, int] = {}
+        self.item_index: Dict[str, int] = {}
+        self._item_ids: Optional[np.ndarray] = None
+        self.n_model_users = 0
+        self.n_model_items = 0
+        self.update_epochs = 1
+        self.item_loader = None
+        self.updater = None
+        self._fold_counts: Dict[Tuple[str, int], int] = {}
+        self._update_lock = threading.Lock()
+        # القراءة متزامنة؛ التحديث ينشر تغييراته دفعة واحدة تحت قفل الكتابة
+        self._model_lock = ModelLock()
+        # إصدار ملفات النموذج المحمَّل منها (artifacts.ModelStore)
+        self.version = None
         
     def prepare_data(self, interactions: List[Dict], items: List[Dict], users: List[Dict]):
         """تحضير البيانات للتدريب"""
-        # تحويل التفاعلات إلى مصفوفة
-        interactions_df = pd.DataFrame(interactions)
-        
-        # تحضير ميزات العناصر
-        item_features = []
-        for item in items:
-            features = {
-                'title': item['title'],
-                'description': item['description'],
-                'category': item['category']
-            }
-            features.update(item.get('features', {}))
-            item_features.append(features)
-            
-        # تحضير ميزات المستخدمين
-        user_features = []
-        for user in users:
-            features = {
-                'preferences': user.get('preferences', {}),
-                'behavior': user.get('behavior_data', {})
-            }
-            user_features.append(features)
-            
-        # تحضير البيانات للـ LightFM
-        self.dataset.fit(
-            users=[str(u['id']) for u in users],
-            items=[str(i['id']) for i in items],
-            item_features=[list(f.values()) for f in item_features],
-            user_features=[list(f.values()) for f in user_features]
-        )
+        item_features, user_features = self.fit_dataset(items, users)
         
         # تحويل التفاعلات إلى تنسيق LightFM
         interactions_matrix, weights = self.dataset.build_interactions(
@@ -56,65 +77,313 @@ def prepare_data(self, interactions: List[Dict], items: List[Dict], users: List[
         
         return interactions_matrix, weights, item_features, user_features
     
-    def train_models(self, interactions_matrix, weights, item_features, user_features):
+    def fit_dataset(self, items: List[Dict], users: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+        """بناء معرفات LightFM وميزات العناصر والمستخدمين"""
+        item_features = [self.item_feature_dict(item) for item in items]
+        user_features = [self.user_feature_dict(user) for user in users]
+        
+        self.dataset.fit(
+            users=[str(u['id']) for u in users],
+            items=[str(i['id']) for i in items],
+            item_features=[list(f.values()) for f in item_features],
+            user_features=[list(f.values()) for f in user_features]
+        )
+        return item_features, user_features
+    
+    @staticmethod
+    def item_feature_dict(item: Dict) -> Dict:
+        features = {
+            'title': item['title'],
+            'description': item['description'],
+            'category': item['category']
+        }
+        features.update(item.get('features', {}))
+        return features
+    
+    @staticmethod
+    def user_feature_dict(user: Dict) -> Dict:
+        return {
+            'preferences': user.get('preferences', {}),
+            'behavior': user.get('behavior_data', {})
+        }
+    
+    def train_models(self, interactions_matrix, weights, item_features, user_features,
+                     num_threads: int = 1, epochs: int = 30):
         """تدريب نماذج التوصيات"""
-        # تدريب نموذج التعاوني
+        self.fit_collaborative(interactions_matrix, weights, item_features, user_features, num_threads, epochs)
+        self.fit_content(item_features)
+        self.build_indexes()
+    
+    def fit_collaborative(self, interactions_matrix, weights, item_features, user_features,
+                          num_threads: int = 1, epochs: int = 30):
+        """تدريب النموذج التعاوني (LightFM يحرر GIL أثناء التدريب)"""
+        self.item_feature_matrix = self.dataset.build_item_features(item_features)
+        self.user_features = self.dataset.build_user_features(user_features)
         self.collaborative_model = LightFM(loss='warp')
         self.collaborative_model.fit(
             interactions_matrix,
-            item_features=self.dataset.build_item_features(item_features),
-            user_features=self.dataset.build_user_features(user_features),
+            item_features=self.item_feature_matrix,
+            user_features=self.user_features,
             sample_weight=weights,
-            epochs=30
+            epochs=epochs,
+            num_threads=num_threads
         )
-        
-        # تدريب نموذج المحتوى
+    
+    def fit_content(self, item_features: List[Dict]):
+        """تدريب نموذج المحتوى: TF-IDF ثم إسقاط SVD لفهرس المحتوى"""
         item_texts = [' '.join(str(v) for v in f.values()) for f in item_features]
         self.content_model = TfidfVectorizer()
         self.item_features = self.content_model.fit_transform(item_texts)
+        self.item_content = normalize(self.item_features, norm='l2', copy=True).tocsr()
+        
+        # TF-IDF متناثر وعالي الأبعاد، فيُفهرس بعد تقليصه بـ SVD
+        n_components = min(self.content_dims, self.item_features.shape[1] - 1)
+        if n_components >= 2:
+            self.content_projection = TruncatedSVD(n_components=n_components, random_state=0)
+            self.content_vectors = normalize_rows(self.content_projection.fit_transform(self.item_features))
+    
+    def build_indexes(self):
+        """بناء فهارس ANN لاسترجاع المرشحين بعد التدريب"""
+        item_biases, item_embeddings = self.collaborative_model.get_item_representations(
+            self.item_feature_matrix
+        )
+        self.user_biases, self.user_embeddings = self.collaborative_model.get_user_representations(
+            self.user_features
+        )
+        self.item_vectors = mips_item_vectors(item_embeddings, item_biases)
+        
+        user_map, _, item_map, _ = self.dataset.mapping()
+        self.user_index, self.item_index = dict(user_map), dict(item_map)
+        self.n_model_users, self.n_model_items = len(user_map), len(item_map)
+        self._fold_counts = {}
+        self.index_vectors()
+    
+    def index_vectors(self):
+        """بناء فهارس ANN من المتجهات الحالية (بعد التدريب أو التحميل من ملفات النموذج)"""
+        self.collab_index = build_index(self.item_vectors, self.ann_index)
+        if self.content_vectors is not None:
+            self.content_index = build_index(self.content_vectors, self.ann_index)
     
+    @reads_model
+    def get_candidates(self, user_id: int, user_interactions: List[Dict]) -> np.ndarray:
+        """استرجاع العناصر المرشحة من فهارس ANN"""
+        user_index = self._user_index(user_id)
+        if user_index is not None:
+            query = mips_query(self.user_embeddings[user_index])
+        else:
+            # مستخدم جديد: تضمين صفري فيرتب الفهرس العناصر حسب انحيازها فقط
+            query = mips_query(np.zeros(self.item_vectors.shape[1] - 1))
+        candidates, _ = self.collab_index.search(query, self.n_candidates)
+        
+        if user_interactions and self.content_index is not None:
+            user_texts = [' '.join(str(v) for v in i.values()) for i in user_interactions]
+            projected = normalize_rows(
+                self.content_projection.transform(self.content_model.transform(user_texts))
+            )
+            content_candidates, _ = self.content_index.search(projected.mean(axis=0), self.n_candidates)
+            candidates = np.union1d(candidates, content_candidates)
+        return candidates
+    
+    @reads_model
     def get_recommendations(self, user_id: int, n_recommendations: int = 10) -> List[Dict]:
         """الحصول على توصيات للمستخدم"""
-        # الحصول على التوصيات من النموذج التعاوني
-        collab_scores = self.collaborative_model.predict(
-            user_ids=[str(user_id)],
-            item_ids=[str(i) for i in range(len(self.item_features))],
-            item_features=self.item_features,
-            user_features=self.user_features
-        )[0]
-        
-        # الحصول على التوصيات من نموذج المحتوى
         user_interactions = self.get_user_interactions(user_id)
-        if user_interactions:
-            content_scores = self.get_content_based_scores(user_interactions)
-        else:
-            content_scores = np.zeros(len(self.item_features))
         
-        # دمج التوصيات
-        final_scores = 0.7 * collab_scores + 0.3 * content_scores
+        # الفهرس الكامل (brute) يعني كتالوجاً صغيراً: تقييم كل العناصر أرخص من الاسترجاع
+        if self.collab_index is not None and self.collab_index.kind != "brute":
+            items = self.get_candidates(user_id, user_interactions)
+        else:
+            items = None
         
-        # ترتيب التوصيات
-        top_items = np.argsort(-final_scores)[:n_recommendations]
+        # دمج التوصيات وترتيبها
+        final_scores = self.score_items(user_id, user_interactions, items)
+        top = top_k(final_scores, n_recommendations)
+        rows = top if items is None else items[top]
         
-        recommendations = []
-        for item_id in top_items:
-            recommendations.append({
-                'item_id': int(item_id),
-                'score': float(final_scores[item_id]),
+        # صفوف النموذج -> معرفات العناصر الخارجية (Item.id)
+        item_ids = self._external_item_ids()
+        return [
+            {
+                'item_id': int(item_ids[row]),
+                'score': float(final_scores[i]),
                 'algorithm': 'hybrid'
-            })
+            }
+            for i, row in zip(top, rows)
+        ]
+    
+    @reads_model
+    def score_items(self, user_id: int, user_interactions: List[Dict], items: Optional[np.ndarray] = None) -> np.ndarray:
+        """النتيجة الهجينة 0.7 تعاوني + 0.3 محتوى لـ items (أو كل العناصر)
+        
+        تُكتب النتائج في مخزن معاد الاستخدام لكل خيط، فتبقى صالحة حتى
+        الاستدعاء التالي من الخيط نفسه فقط.
+        """
+        if items is None:
+            vectors = self.item_vectors
+        else:
+            vectors = self._gather_buffer(len(items))
+            # المرشحون من فهارس ANN فهم ضمن المدى؛ mode="clip" يكتب في المخزن دون نسخة وسيطة
+            np.take(self.item_vectors, items, axis=0, out=vectors, mode="clip")
+        scores = self._fusion_buffer(len(vectors))
         
-        return recommendations
+        user_index = self._user_index(user_id)
+        if user_index is not None:
+            np.dot(vectors, mips_query(self.user_embeddings[user_index]), out=scores)
+            scores += self.user_biases[user_index]
+        else:
+            scores[:] = vectors[:, -1]
+        scores *= 0.7
+        
+        if user_interactions:
+            # لا يوجد take لمصفوفة CSR: صفوف المرشحين تُنسخ (قرابة 200 ميكروثانية لـ 600 مرشح)
+            content = self.item_content if items is None else self.item_content[items]
+            content_scores = content.dot(self._content_profile(user_interactions))
+            content_scores *= 0.3
+            scores += content_scores
+        return scores
+    
+    def get_recommendations_batch(
+        self,
+        user_ids: Iterable[int],
+        n_recommendations: int = 10,
+        chunk_size: Optional[int] = None
+    ) -> Iterator[List[Tuple[int, List[Dict]]]]:
+        """توصيات لعدة مستخدمين، دفعة بعد دفعة
+        
+        تُقيَّم كل دفعة بضرب مصفوفي واحد (مستخدمون × عناصر) في مخزن معاد
+        الاستخدام، ويُعاد لكل دفعة قائمة (user_id, التوصيات) قبل حساب التالية
+        حتى تبقى الذاكرة محدودة مهما كان عدد المستخدمين. يُحجَّم المخزن لكل
+        دفعة، فالعناصر المضافة بين دفعتين تُقيَّم أيضاً.
+        """
+        if chunk_size is None:
+            chunk_size = max(1, BATCH_SCORE_BYTES // (4 * len(self.item_vectors)))
+        buffer = None
+        
+        chunk = []
+        for user_id in user_ids:
+            chunk.append(user_id)
+            if len(chunk) == chunk_size:
+                results, buffer = self._score_chunk(chunk, n_recommendations, buffer)
+                yield results
+                chunk = []
+        if chunk:
+            yield self._score_chunk(chunk, n_recommendations, buffer)[0]
+    
+    @reads_model
+    def _score_chunk(
+        self, user_ids: List[int], n_recommendations: int, buffer: Optional[np.ndarray]
+    ) -> Tuple[List[Tuple[int, List[Dict]]], np.ndarray]:
+        """توصيات دفعة واحدة، مع المخزن المسطح (المعاد استخدامه أو الأكبر منه)"""
+        mapping = self.user_index
+        n_items, dim = self.item_vectors.shape
+        queries = np.zeros((len(user_ids), dim), dtype=np.float32)
+        queries[:, -1] = 1.0
+        biases = np.zeros(len(user_ids), dtype=np.float32)
+        for row, user_id in enumerate(user_ids):
+            user_index = mapping.get(str(user_id))
+            if user_index is not None:
+                queries[row, :-1] = self.user_embeddings[user_index]
+                biases[row] = self.user_biases[user_index]
+        
+        size = len(user_ids) * n_items
+        if buffer is None or len(buffer) < size:
+            buffer = np.empty(size, dtype=np.float32)
+        scores = buffer[:size].reshape(len(user_ids), n_items)
+        np.matmul(queries, self.item_vectors.T, out=scores)
+        scores += biases[:, None]
+        scores *= 0.7
+        
+        # المحتوى: كل نصوص تفاعلات الدفعة تُحوَّل معاً، ثم يُحسب متوسط كل مستخدم
+        texts, owners = [], []
+        for row, user_id in enumerate(user_ids):
+            for interaction in self.get_user_interactions(user_id):
+                texts.append(' '.join(str(v) for v in interaction.values()))
+                owners.append(row)
+        if texts:
+            counts = np.bincount(owners, minlength=len(user_ids))
+            averaging = sparse.csr_matrix(
+                (1.0 / counts[owners], (owners, np.arange(len(owners)))),
+                shape=(len(user_ids), len(owners))
+            )
+            profiles = averaging @ normalize(self.content_model.transform(texts))
+            step = max(1, CONTENT_BLOCK_BYTES // (8 * n_items))
+            for start in range(0, len(user_ids), step):
+                content_scores = (profiles[start:start + step] @ self.item_content.T).toarray()
+                content_scores *= 0.3
+                scores[start:start + step] += content_scores
+        
+        top = top_k_rows(scores, n_recommendations)
+        item_ids = self._external_item_ids()
+        return [
+            (
+                user_id,
+                [
+                    {'item_id': int(item_ids[i]), 'score': float(scores[row, i]), 'algorithm': 'hybrid'}
+                    for i in top[row]
+                ]
+            )
+            for row, user_id in enumerate(user_ids)
+        ], buffer
+    
+    def _fusion_buffer(self, size: int) -> np.ndarray:
+        buffer = getattr(self._buffers, 'scores', None)
+        if buffer is None or len(buffer) < size:
+            buffer = self._buffers.scores = np.empty(max(size, len(self.item_vectors)), dtype=np.float32)
+        return buffer[:size]
     
+    def _gather_buffer(self, rows: int) -> np.ndarray:
+        buffer = getattr(self._buffers, 'vectors', None)
+        source = self.item_vectors
+        if buffer is None or len(buffer) < rows or buffer.shape[1] != source.shape[1] or buffer.dtype != source.dtype:
+            shape = (max(rows, 2 * self.n_candidates), source.shape[1])
+            buffer = self._buffers.vectors = np.empty(shape, dtype=source.dtype)
+        return buffer[:rows]
+    
+    def _user_index(self, user_id: int) -> Optional[int]:
+        return self.user_index.get(str(user_id))
+    
+    def _content_profile(self, user_interactions: List[Dict]) -> np.ndarray:
+        # متوسط الجيب تمام مع كل تفاعل = الجداء مع متوسط متجهات التفاعلات الموحدة
+        user_texts = [' '.join(str(v) for v in i.values()) for i in user_interactions]
+        user_features = normalize(self.content_model.transform(user_texts))
+        return np.asarray(user_features.mean(axis=0)).ravel()
+    
+    @reads_model
     def get_content_based_scores(self, user_interactions: List[Dict]) -> np.ndarray:
         """الحصول على توصيات قائمة على المحتوى"""
-        # تحويل تفاعلات المستخدم إلى نصوص
-        user_texts = [' '.join(str(v) for v in i.values()) for i in user_interactions]
-        user_features = self.content_model.transform(user_texts)
+        # جداء متناثر مع متجهات العناصر الموحدة مسبقاً عند التدريب
+        return self.item_content.dot(self._content_profile(user_interactions))
+    
+    @reads_model
+    def get_similar_items(self, item_id: int, n_items: int = 5, item: Optional[Dict] = None) -> List[Tuple[int, float]]:
+        """العناصر الأقرب محتوىً إلى item_id كأزواج (المعرف، التشابه)
         
-        # حساب التشابه
-        similarities = cosine_similarity(user_features, self.item_features)
-        return np.mean(similarities, axis=0)
+        يُستخدم متجه TF-IDF المخزن للعنصر، أو يُحسب من item إن لم يكن في النموذج.
+        """
+        row = self.item_index.get(str(item_id))
+        if row is not None:
+            query = self.item_content[row]
+        elif item is not None:
+            text = ' '.join(str(v) for v in self.item_feature_dict(item).values())
+            query = normalize(self.content_model.transform([text]))
+        else:
+            return []
+        similarities = self.item_content.dot(query.T).toarray().ravel()
+        item_ids = self._external_item_ids()
+        return [
+            (int(item_ids[i]), float(similarities[i]))
+            for i in top_k(similarities, n_items + 1)
+            if i != row  # استبعاد العنصر نفسه
+        ][:n_items]
+    
+    def _external_item_ids(self) -> np.ndarray:
+        # الصف -> المعرف الخارجي؛ يُعاد بناؤه عند إضافة عناصر جديدة
+        if self._item_ids is None or len(self._item_ids) != len(self.item_index):
+            item_ids = np.empty(len(self.item_index), dtype=np.int64)
+            for item_id, row in list(self.item_index.items()):
+                item_ids[row] = int(item_id)
+            self._item_ids = item_ids
+        return self._item_ids
     
     def get_user_interactions(self, user_id: int) -> List[Dict]:
         """الحصول على تفاعلات المستخدم الأخيرة"""
@@ -122,8 +391,180 @@ def get_user_interactions(self, user_id: int) -> List[Dict]:
         # هذا مثال بسيط
         return []
     
-    def update_recommendations(self, new_interaction: Dict):
-        """تحديث التوصيات بناءً على تفاعل جديد"""
-        # تحديث البيانات
-        # إعادة تدريب النماذج إذا لزم الأمر
-        pass 
\ No newline at end of file
+    def update_recommendations(self, new_interaction: Dict) -> bool:
+        """تحديث التوصيات بناءً على تفاعل جديد
+        
+        يضيف التفاعل إلى طابور عامل الخلفية فقط، ويطبقه العامل مع غيره على
+        دفعات عبر apply_interactions. يعيد False إذا لم يُقبل التفاعل.
+        """
+        if self.collab_index is None:
+            return False
+        if self.updater is None:
+            with self._update_lock:
+                if self.updater is None:
+                    self.updater = InteractionUpdateWorker(self, item_loader=self.item_loader)
+        return self.updater.submit(new_interaction)
+    
+    def apply_interactions(self, interactions: List[Dict], new_items: Optional[List[Dict]] = None) -> Dict[str, int]:
+        """تطبيق دفعة تفاعلات دون إعادة التدريب الكامل
+        
+        - الأزواج المعروفة للنموذج: خطوة fit_partial ثم تحديث تمثيلات
+          المستخدمين والعناصر المتأثرة فقط في المتجهات والفهرس.
+        - المستخدمون والعناصر الجدد: يُضافون بعد الصفوف الحالية دون إعادة بناء
+          Dataset، وتضمينهم متوسط تضمينات من تفاعلوا معهم (fold-in).
+        - متجهات المحتوى تُحسب للعناصر الجديدة فقط بالمحوِّل المدرب؛
+          new_items تحمل بياناتها (id وtitle وdescription وcategory وfeatures).
+        
+        خطوة WARP تعدّل أيضاً عناصر سلبية عشوائية وميزات مشتركة، ولا تظهر هذه
+        التعديلات في المتجهات حتى إعادة بناء الفهارس.
+        """
+        with self._update_lock:
+            items_by_id = {str(item['id']): item for item in new_items or []}
+            unknown_users = sorted({str(i['user_id']) for i in interactions} - self.user_index.keys())
+            unknown_items = sorted({str(i['item_id']) for i in interactions} - self.item_index.keys())
+            # الصفوف الجديدة تلي الحالية؛ تُنشر في الخرائط لاحقاً تحت قفل الكتابة
+            user_rows = {u: len(self.user_embeddings) + k for k, u in enumerate(unknown_users)}
+            item_rows = {i: len(self.item_vectors) + k for k, i in enumerate(unknown_items)}
+            
+            model_pairs: Dict[Tuple[int, int], float] = {}
+            folded = []
+            for interaction in interactions:
+                user_id, item_id = str(interaction['user_id']), str(interaction['item_id'])
+                user = user_rows[user_id] if user_id in user_rows else self.user_index[user_id]
+                item = item_rows[item_id] if item_id in item_rows else self.item_index[item_id]
+                if user < self.n_model_users and item < self.n_model_items:
+                    model_pairs[(user, item)] = (model_pairs.get((user, item), 0.0)
+                                                 + interaction.get('interaction_value', 1.0))
+                else:
+                    folded.append((user, item))
+            
+            # الحساب الثقيل (fit_partial وتحويل المحتوى) يجري والقراءة مستمرة؛
+            # النموذج التعاوني والمحوِّلات لا يقرؤها مسار الخدمة
+            content = self._new_item_content(unknown_items, items_by_id) if unknown_items else None
+            # نموذج محمَّل للخدمة فقط (بلا حالة التدريب) لا يدعم fit_partial
+            trained = None
+            if model_pairs and self.collaborative_model is not None:
+                trained = self._fit_partial(model_pairs)
+            
+            with self._model_lock.write():
+                self._ensure_writable()
+                if unknown_users:
+                    self._add_users(unknown_users)
+                if unknown_items:
+                    self._add_items(unknown_items, content)
+                if trained is not None:
+                    self._store_representations(*trained)
+                if folded:
+                    self._fold_in(folded)
+            
+            return {
+                'interactions': len(interactions),
+                'trained_pairs': len(model_pairs),
+                'folded': len(folded),
+                'new_users': len(unknown_users),
+                'new_items': len(unknown_items)
+            }
+    
+    def _ensure_writable(self):
+        # المصفوفات المحمَّلة بـ mmap للقراءة فقط؛ أول تحديث ينسخها لهذه العملية
+        for name in ('item_vectors', 'user_embeddings', 'user_biases'):
+            array = getattr(self, name)
+            if not array.flags.writeable:
+                setattr(self, name, np.array(array))
+    
+    def _fit_partial(self, pairs: Dict[Tuple[int, int], float]):
+        """خطوة fit_partial وتمثيلات المستخدمين والعناصر المتأثرة (دون نشرها)"""
+        rows = np.fromiter((user for user, _ in pairs), dtype=np.int32, count=len(pairs))
+        cols = np.fromiter((item for _, item in pairs), dtype=np.int32, count=len(pairs))
+        shape = (self.n_model_users, self.n_model_items)
+        interactions = sparse.coo_matrix((np.ones(len(pairs), dtype=np.float32), (rows, cols)), shape=shape)
+        weights = sparse.coo_matrix((np.fromiter(pairs.values(), dtype=np.float32), (rows, cols)), shape=shape)
+        self.collaborative_model.fit_partial(
+            interactions,
+            item_features=self.item_feature_matrix,
+            user_features=self.user_features,
+            sample_weight=weights,
+            epochs=self.update_epochs
+        )
+        
+        users, items = np.unique(rows), np.unique(cols)
+        user_biases, user_embeddings = self.collaborative_model.get_user_representations(self.user_features[users])
+        biases, embeddings = self.collaborative_model.get_item_representations(self.item_feature_matrix[items])
+        return users, user_biases, user_embeddings, items, mips_item_vectors(embeddings, biases)
+    
+    def _store_representations(self, users, user_biases, user_embeddings, items, item_vectors):
+        self.user_embeddings[users] = user_embeddings
+        self.user_biases[users] = user_biases
+        self.item_vectors[items] = item_vectors
+        self.collab_index.upsert(items, item_vectors)
+    
+    def _add_users(self, user_ids: List[str]):
+        start = len(self.user_embeddings)
+        for offset, user_id in enumerate(user_ids):
+            self.user_index[user_id] = start + offset
+        dim = self.user_embeddings.shape[1]
+        self.user_embeddings = np.vstack([
+            self.user_embeddings, np.zeros((len(user_ids), dim), dtype=self.user_embeddings.dtype)
+        ])
+        self.user_biases = np.concatenate([
+            self.user_biases, np.zeros(len(user_ids), dtype=self.user_biases.dtype)
+        ])
+    
+    def _new_item_content(self, item_ids: List[str], items_by_id: Dict[str, Dict]):
+        """TF-IDF (ومتجهات فهرس المحتوى) للعناصر الجديدة"""
+        # عنصر بلا بيانات يحصل على متجه محتوى صفري
+        texts = [
+            ' '.join(str(v) for v in self.item_feature_dict(items_by_id[item_id]).values())
+            if item_id in items_by_id else ''
+            for item_id in item_ids
+        ]
+        tfidf = self.content_model.transform(texts)
+        projected = None
+        if self.content_index is not None:
+            projected = normalize_rows(self.content_projection.transform(tfidf))
+        return tfidf, projected
+    
+    def _add_items(self, item_ids: List[str], content):
+        start = len(self.item_vectors)
+        rows = np.arange(start, start + len(item_ids))
+        for row, item_id in zip(rows.tolist(), item_ids):
+            self.item_index[item_id] = row
+        
+        # تضمين صفري وانحياز متوسط حتى يُطوى فيه من تفاعل مع العنصر
+        vectors = np.zeros((len(item_ids), self.item_vectors.shape[1]), dtype=np.float32)
+        vectors[:, -1] = self.item_vectors[:self.n_model_items, -1].mean()
+        self.item_vectors = np.vstack([self.item_vectors, vectors])
+        self.collab_index.upsert(rows, vectors)
+        
+        tfidf, projected = content
+        self.item_features = sparse.vstack([self.item_features, tfidf]).tocsr()
+        self.item_content = sparse.vstack([self.item_content, normalize(tfidf)]).tocsr()
+        if projected is not None:
+            self.content_vectors = np.vstack([self.content_vectors, projected])
+            self.content_index.upsert(rows, projected)
+    
+    def _fold_in(self, pairs: List[Tuple[int, int]]):
+        """متوسط متحرك لتضمين كل مستخدم/عنصر خارج النموذج من تضمينات من تفاعل معهم"""
+        user_sums: Dict[int, List[np.ndarray]] = {}
+        for user, item in pairs:
+            if user >= self.n_model_users:
+                user_sums.setdefault(user, []).append(self.item_vectors[item, :-1])
+        for user, embeddings in user_sums.items():
+            self.user_embeddings[user] = self._running_mean(('user', user), self.user_embeddings[user], embeddings)
+        
+        item_sums: Dict[int, List[np.ndarray]] = {}
+        for user, item in pairs:
+            if item >= self.n_model_items:
+                item_sums.setdefault(item, []).append(self.user_embeddings[user])
+        if item_sums:
+            items = np.fromiter(item_sums, dtype=np.int64, count=len(item_sums))
+            for item, embeddings in item_sums.items():
+                self.item_vectors[item, :-1] = self._running_mean(
+                    ('item', item), self.item_vectors[item, :-1], embeddings
+                )
+            self.collab_index.upsert(items, self.item_vectors[items])
+    
+    def _running_mean(self, key: Tuple[str, int], current: np.ndarray, values: List[np.ndarray]) -> np.ndarray:
+        count = self._fold_counts.get(key, 0)
+        self._fold_counts[key] = count + len(values)
+        return (current * count + np.sum(values, axis=0)) / (count + len(values))
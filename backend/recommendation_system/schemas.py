@@ -15,6 +15,14 @@ class RecommendationResponse(BaseModel):
     algorithm: str
     metadata: Optional[Dict] = None
 
+class BatchRecommendationRequest(BaseModel):
+    user_ids: List[int] = Field(..., max_items=1000, description="معرفات المستخدمين (1000 كحد أقصى)")
+    n_recommendations: int = Field(default=10, ge=1, le=100)
+
+class BatchRecommendationResponse(BaseModel):
+    user_id: int
+    recommendations: List[RecommendationResponse]
+
 class UserPreferencesUpdate(BaseModel):
     categories: Optional[List[str]] = Field(default=[], description="الفئات المفضلة")
     interests: Optional[List[str]] = Field(default=[], description="الاهتمامات")
@@ -0,0 +1,214 @@
+"""
+خط تدريب نموذج التوصيات
+
+Trains a :class:`HybridRecommender` straight from the database:
+
+1. ``catalog``      - items and users, and the LightFM id/feature mappings
+2. ``interactions`` - interactions streamed through a server-side cursor in
+   ``chunk_size`` rows and appended to COO arrays, without ever holding
+   the rows as Python dicts or a DataFrame
+3. ``fit``          - LightFM (``num_threads``, it releases the GIL) and the
+   TF-IDF/SVD content model trained at the same time on two threads
+4. ``index``        - item/user representations and ANN indexes
+
+Every stage reports its wall time and the process RSS (current and peak)::
+
+    python -m recommendation_system.training --threads 8 --save-model /srv/models
+"""
+import json
+import logging
+import os
+import resource
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from .models import Item, User, UserInteraction
+from .recommender import HybridRecommender
+
+
+def item_record(item: Item) -> Dict:
+    return {
+        "id": item.id,
+        "title": item.title,
+        "description": item.description,
+        "category": item.category,
+        "features": item.features or {},
+    }
+
+
+def user_record(user: User) -> Dict:
+    return {"id": user.id, "preferences": user.preferences or {}, "behavior_data": user.behavior_data or {}}
+
+
+def _rss_mb() -> float:
+    """Current resident set size in MiB (0 where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, IndexError):
+        return 0.0
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class InteractionMatrixBuilder:
+    """Build LightFM's interaction and weight matrices from chunks of
+    ``(user_id, item_id, value)`` rows by appending COO arrays."""
+
+    def __init__(self, user_index: Dict[str, int], item_index: Dict[str, int]) -> None:
+        self.user_index = user_index
+        self.item_index = item_index
+        self._rows: List[np.ndarray] = []
+        self._cols: List[np.ndarray] = []
+        self._values: List[np.ndarray] = []
+        self.rows_seen = 0
+        self.rows_skipped = 0
+
+    def append(self, chunk: Iterable[Tuple[Any, Any, Optional[float]]]) -> None:
+        rows, cols, values = [], [], []
+        users, items = self.user_index, self.item_index
+        for user_id, item_id, value in chunk:
+            self.rows_seen += 1
+            user, item = users.get(str(user_id)), items.get(str(item_id))
+            if user is None or item is None:
+                self.rows_skipped += 1
+                continue
+            rows.append(user)
+            cols.append(item)
+            values.append(1.0 if value is None else value)
+        self._rows.append(np.array(rows, dtype=np.int32))
+        self._cols.append(np.array(cols, dtype=np.int32))
+        self._values.append(np.array(values, dtype=np.float32))
+
+    def build(self) -> Tuple[sparse.coo_matrix, sparse.coo_matrix]:
+        """``(interactions, weights)``; repeated pairs have their weights summed."""
+        shape = (len(self.user_index), len(self.item_index))
+        empty = np.empty(0, dtype=np.int32)
+        weights = sparse.coo_matrix(
+            (np.concatenate(self._values or [np.empty(0, dtype=np.float32)]),
+             (np.concatenate(self._rows or [empty]), np.concatenate(self._cols or [empty]))),
+            shape=shape,
+        ).tocsr().tocoo()  # يجمع الأزواج المكررة
+        self._rows, self._cols, self._values = [], [], []
+        interactions = sparse.coo_matrix(
+            (np.ones(weights.nnz, dtype=np.float32), (weights.row, weights.col)), shape=shape
+        )
+        return interactions, weights
+
+
+def stream_interactions(db: Session, chunk_size: int = 50000) -> Iterator[List[Tuple[Any, Any, Any]]]:
+    """Interaction rows in chunks from a server-side cursor."""
+    statement = select(
+        UserInteraction.user_id, UserInteraction.item_id, UserInteraction.interaction_value
+    ).execution_options(stream_results=True)
+    for partition in db.execute(statement).partitions(chunk_size):
+        yield partition
+
+
+class TrainingPipeline:
+    """Chunked, parallel training of a :class:`HybridRecommender`."""
+
+    def __init__(
+        self,
+        recommender: Optional[HybridRecommender] = None,
+        num_threads: Optional[int] = None,
+        epochs: int = 30,
+        chunk_size: int = 50000,
+    ) -> None:
+        self.recommender = recommender or HybridRecommender()
+        self.num_threads = num_threads or os.cpu_count() or 1
+        self.epochs = epochs
+        self.chunk_size = chunk_size
+        self.stats: Dict[str, Any] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        start, rss = time.perf_counter(), _rss_mb()
+        try:
+            yield
+        finally:
+            self.stats[name] = {
+                "seconds": round(time.perf_counter() - start, 3),
+                "rss_mb": round(_rss_mb(), 1),
+                "rss_delta_mb": round(_rss_mb() - rss, 1),
+                "peak_rss_mb": round(_peak_rss_mb(), 1),
+            }
+            logging.info("Training stage %s: %s", name, self.stats[name])
+
+    def run(self, db: Session) -> HybridRecommender:
+        recommender = self.recommender
+        self.stats = {}
+        total = time.perf_counter()
+
+        with self.stage("catalog"):
+            items = [item_record(item) for item in db.query(Item).yield_per(self.chunk_size)]
+            users = [user_record(user) for user in db.query(User).yield_per(self.chunk_size)]
+            item_features, user_features = recommender.fit_dataset(items, users)
+            del items, users
+
+        with self.stage("interactions"):
+            user_map, _, item_map, _ = recommender.dataset.mapping()
+            builder = InteractionMatrixBuilder(user_map, item_map)
+            for chunk in stream_interactions(db, self.chunk_size):
+                builder.append(chunk)
+            interactions, weights = builder.build()
+        self.stats["interactions"].update(rows=builder.rows_seen, skipped=builder.rows_skipped)
+
+        with self.stage("fit"):
+            # LightFM يعمل بـ num_threads خارج GIL، فيتقدم TF-IDF على خيط آخر بالتوازي
+            with ThreadPoolExecutor(max_workers=2, thread_name_prefix="train") as pool:
+                collaborative = pool.submit(
+                    self._timed, "fit_collaborative", recommender.fit_collaborative,
+                    interactions, weights, item_features, user_features, self.num_threads, self.epochs,
+                )
+                content = pool.submit(self._timed, "fit_content", recommender.fit_content, item_features)
+                collaborative.result()
+                content.result()
+
+        with self.stage("index"):
+            recommender.build_indexes()
+
+        self.stats["total"] = {"seconds": round(time.perf_counter() - total, 3),
+                               "peak_rss_mb": round(_peak_rss_mb(), 1)}
+        return recommender
+
+    def _timed(self, name: str, func, *args) -> None:
+        start = time.perf_counter()
+        func(*args)
+        self.stats[name] = {"seconds": round(time.perf_counter() - start, 3)}
+
+
+if __name__ == "__main__":  # pragma: no cover - manual helper
+    import argparse
+
+    from database import SessionLocal
+
+    from .artifacts import ModelStore
+
+    parser = argparse.ArgumentParser(description="Train the hybrid recommender from the database")
+    parser.add_argument("--threads", type=int, help="LightFM threads (default: CPU count)")
+    parser.add_argument("--epochs", type=int, default=30)
+    parser.add_argument("--chunk-size", type=int, default=50000, help="interaction rows per fetch")
+    parser.add_argument("--save-model", metavar="DIR", help="save and activate the model in this store")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    db = SessionLocal()
+    try:
+        pipeline = TrainingPipeline(num_threads=args.threads, epochs=args.epochs, chunk_size=args.chunk_size)
+        recommender = pipeline.run(db)
+    finally:
+        db.close()
+    if args.save_model:
+        pipeline.stats["version"] = ModelStore(args.save_model).save(recommender)
+    print(json.dumps(pipeline.stats, indent=2))
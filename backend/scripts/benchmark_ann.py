@@ -0,0 +1,104 @@
+"""
+قياس دقة وسرعة فهارس ANN لاسترجاع المرشحين مقارنة بالبحث الكامل
+
+يبني كل فهرس على تضمينات العناصر (عشوائية مجمّعة افتراضياً، أو من ملف
+npy مثل ``HybridRecommender.item_vectors``) ويطبع Recall@K للمرشحين بعد
+إعادة الترتيب الدقيقة، وزمن البناء وزمن الاستعلام (p50/p95):
+
+    python backend/scripts/benchmark_ann.py --items 200000 --kinds brute,ivf,hnsw
+    python backend/scripts/benchmark_ann.py --vectors item_vectors.npy
+"""
+import argparse
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from backend.recommendation_system.ann_index import (  # noqa: E402
+    BruteForceIndex,
+    build_index,
+    hnswlib,
+)
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(q / 100 * len(sorted_values))
+    return sorted_values[min(max(rank, 1), len(sorted_values)) - 1]
+
+
+def synthetic_vectors(n_items, dim, n_clusters, seed):
+    """Clustered vectors with a bias column, shaped like LightFM MIPS vectors."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(n_clusters, dim))
+    vectors = centers[rng.integers(n_clusters, size=n_items)] + 0.5 * rng.normal(size=(n_items, dim))
+    biases = 0.1 * rng.normal(size=(n_items, 1))
+    return np.hstack([vectors, biases]).astype(np.float32)
+
+
+def run(vectors, queries, kind, k, candidates, exact):
+    start = time.perf_counter()
+    index = build_index(vectors, kind)
+    build_seconds = time.perf_counter() - start
+
+    timings, found = [], 0
+    for query, truth in zip(queries, exact):
+        start = time.perf_counter_ns()
+        ids, _ = index.search(query, candidates)
+        # إعادة ترتيب دقيقة للمرشحين كما يفعل HybridRecommender
+        reranked = ids[np.argsort(-(vectors[ids] @ query))[:k]]
+        timings.append(time.perf_counter_ns() - start)
+        found += len(np.intersect1d(reranked, truth))
+    timings.sort()
+    return {
+        "build_s": build_seconds,
+        f"recall@{k}": found / (k * len(queries)),
+        "p50_us": percentile(timings, 50) / 1000,
+        "p95_us": percentile(timings, 95) / 1000,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="ANN candidate retrieval benchmark")
+    parser.add_argument("--vectors", help="npy file of item vectors (default: synthetic)")
+    parser.add_argument("--items", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=64)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--candidates", type=int, default=300)
+    parser.add_argument("--kinds", default="brute,ivf" + (",hnsw" if hnswlib is not None else ""))
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.vectors:
+        vectors = np.load(args.vectors).astype(np.float32)
+    else:
+        vectors = synthetic_vectors(args.items, args.dim, args.clusters, args.seed)
+    rng = np.random.default_rng(args.seed + 1)
+    queries = np.hstack([
+        rng.normal(size=(args.queries, vectors.shape[1] - 1)),
+        np.ones((args.queries, 1)),
+    ]).astype(np.float32)
+
+    reference = BruteForceIndex(vectors)
+    exact = [reference.search(query, args.k)[0] for query in queries]
+
+    print(f"{len(vectors)} items x {vectors.shape[1]} dims, {args.queries} queries, "
+          f"k={args.k}, candidates={args.candidates}")
+    print(f"{'index':<8} {'build_s':>10} {'recall@' + str(args.k):>10} {'p50_us':>10} {'p95_us':>10}")
+    for kind in args.kinds.split(","):
+        result = run(vectors, queries, kind, args.k, args.candidates, exact)
+        print(f"{kind:<8} " + " ".join(f"{value:>10.3f}" for value in result.values()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+"""
+قياس أداء مسار المحادثة كاملاً: interact ← hear ← المهارة ← append_json_log ← log_mood
+
+يعيد تشغيل مجموعة رسائل عربية وإنجليزية ويطبع زمن الاستجابة (p50/p95/p99)
+والإنتاجية والذاكرة المخصصة وعمليات الكتابة على الملفات لكل تفاعل، ثم
+يحفظ النتيجة كخط أساس أو يقارنها بخط أساس سابق:
+
+    python backend/scripts/benchmark_chat_pipeline.py --save
+    python backend/scripts/benchmark_chat_pipeline.py --compare backend/benchmarks/baselines/<commit>.json
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from zero_system import ZeroSystem  # noqa: E402
+
+BENCH_DIR = os.path.join(ROOT, "backend", "benchmarks")
+DEFAULT_CORPUS = os.path.join(BENCH_DIR, "chat_corpus.jsonl")
+BASELINE_DIR = os.path.join(BENCH_DIR, "baselines")
+
+# المقاييس التي تعني قيمتها الأعلى تراجعاً في الأداء؛ p99 يُطبع فقط،
+# فهو يتغير بين تشغيلين متطابقين بعشرات الميكروثواني
+LOWER_IS_BETTER = (
+    "p50_us",
+    "p95_us",
+    "alloc_bytes_per_interaction",
+    "write_calls_per_interaction",
+)
+HIGHER_IS_BETTER = ("throughput_per_s",)
+
+# أقل تغيّر مطلق يُعد تراجعاً، حتى لا يفشل الفحص بضجيج مقياس قريب من الصفر
+ABSOLUTE_TOLERANCE = {
+    "p50_us": 2.0,
+    "p95_us": 10.0,
+    "alloc_bytes_per_interaction": 256.0,
+    "write_calls_per_interaction": 0.01,
+    "throughput_per_s": 500.0,
+}
+
+
+def load_corpus(path):
+    with open(path, encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    return [
+        (row["message"], {"id": row["user"], "name": row["user"]} if row.get("user") else None)
+        for row in rows
+    ]
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(q / 100 * len(sorted_values))
+    return sorted_values[min(max(rank, 1), len(sorted_values)) - 1]
+
+
+def io_counters():
+    """(write syscalls, bytes written) of this process, or None off Linux."""
+    try:
+        with open("/proc/self/io") as f:
+            fields = dict(line.split(": ") for line in f.read().splitlines())
+        return int(fields["syscw"]), int(fields["wchar"])
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def make_system(workdir):
+    system = ZeroSystem(log_filename=os.path.join(workdir, "log.jsonl"))
+    system.logger.filename = os.path.join(workdir, "mood.jsonl")
+    return system
+
+
+def run_latency(system, corpus, iterations):
+    timings = []
+    clock = time.perf_counter_ns
+    for i in range(iterations):
+        message, profile = corpus[i % len(corpus)]
+        start = clock()
+        system.interact(message, profile)
+        timings.append(clock() - start)
+    return timings
+
+
+def run_allocations(system, corpus, iterations):
+    """Mean bytes allocated (transient peak) and retained per interaction."""
+    tracemalloc.start()
+    try:
+        base = tracemalloc.get_traced_memory()[0]
+        transient = 0
+        for i in range(iterations):
+            message, profile = corpus[i % len(corpus)]
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            system.interact(message, profile)
+            transient += tracemalloc.get_traced_memory()[1] - before
+        retained = tracemalloc.get_traced_memory()[0] - base
+    finally:
+        tracemalloc.stop()
+    return transient / iterations, retained / iterations
+
+
+def run(corpus, iterations, warmup):
+    with tempfile.TemporaryDirectory() as workdir:
+        system = make_system(workdir)
+        try:
+            run_latency(system, corpus, warmup)
+            system.flush()
+
+            io_before = io_counters()
+            wall = time.perf_counter()
+            timings = run_latency(system, corpus, iterations)
+            system.flush()  # الكتابة المؤجلة جزء من كلفة التفاعل
+            wall = time.perf_counter() - wall
+            io_after = io_counters()
+
+            alloc, retained = run_allocations(system, corpus, min(iterations, 2000))
+            log_bytes = sum(
+                os.path.getsize(os.path.join(workdir, name)) for name in ("log.jsonl", "mood.jsonl")
+            )
+        finally:
+            system.close()
+
+    timings.sort()
+    result = {
+        "iterations": iterations,
+        "p50_us": percentile(timings, 50) / 1000,
+        "p95_us": percentile(timings, 95) / 1000,
+        "p99_us": percentile(timings, 99) / 1000,
+        "max_us": timings[-1] / 1000,
+        "throughput_per_s": iterations / wall,
+        "alloc_bytes_per_interaction": alloc,
+        "retained_bytes_per_interaction": retained,
+        "log_bytes_per_interaction": log_bytes / (warmup + iterations + min(iterations, 2000)),
+    }
+    if io_before and io_after:
+        result["write_calls_per_interaction"] = (io_after[0] - io_before[0]) / iterations
+        result["write_bytes_per_interaction"] = (io_after[1] - io_before[1]) / iterations
+    return result
+
+
+def median_result(results):
+    return {
+        metric: sorted(r[metric] for r in results)[len(results) // 2]
+        for metric in results[0]
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(result, baseline, tolerance):
+    """Return the metrics that regressed by more than ``tolerance`` (a fraction)
+    and by more than their ``ABSOLUTE_TOLERANCE``."""
+    regressions = []
+    for metric in LOWER_IS_BETTER + HIGHER_IS_BETTER:
+        old, new = baseline.get(metric), result.get(metric)
+        if not old or new is None:
+            continue
+        delta = new - old
+        if metric in HIGHER_IS_BETTER:
+            delta = -delta
+        change = delta / old
+        if change > tolerance and delta > ABSOLUTE_TOLERANCE.get(metric, 0.0):
+            regressions.append((metric, old, new, change))
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="ZeroSystem chat pipeline benchmark")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--warmup", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="independent runs; the median of each metric is reported")
+    parser.add_argument("--save", nargs="?", const="", metavar="PATH",
+                        help="store the result as a baseline (default: baselines/<commit>.json)")
+    parser.add_argument("--compare", metavar="PATH", help="baseline to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10,
+                        help="allowed regression before failing, as a fraction (default 0.10)")
+    args = parser.parse_args()
+
+    revision = git_revision()
+    corpus = load_corpus(args.corpus)
+    result = median_result([run(corpus, args.iterations, args.warmup) for _ in range(args.repeat)])
+    for metric, value in result.items():
+        print(f"{metric:<32} {value:>12.3f}")
+
+    if args.save is not None:
+        path = args.save or os.path.join(BASELINE_DIR, f"{revision}.json")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        record = dict(result, commit=revision, python=platform.python_version(),
+                      machine=platform.machine(), time=datetime.now().isoformat())
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(record, f, indent=2)
+        print(f"baseline saved to {path}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(result, baseline, args.tolerance)
+        for metric, old, new, change in regressions:
+            print(f"REGRESSION {metric}: {old:.6g} -> {new:.6g} ({change:+.0%})")
+        if regressions:
+            sys.exit(1)
+        print(f"no regressions against {baseline.get('commit', args.compare)}")
+
+
+if __name__ == "__main__":
+    main()
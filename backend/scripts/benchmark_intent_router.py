@@ -0,0 +1,72 @@
+"""
+قياس تكلفة توجيه الرسالة مع زيادة عدد المهارات والكلمات المفتاحية
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from backend.core.intent_router import IntentRouter, normalize_arabic  # noqa: E402
+from zero_system import ZeroSystem  # noqa: E402
+
+MESSAGES = [
+    "أريد أخاً صغيراً يساعدني في البرمجة",
+    "أشعر بالقلق اليوم من العمل",
+    "صوت مرح من فضلك، لنضحك قليلاً",
+    "لدي سؤال تقني حول قواعد البيانات",
+    "Hello, can you help me plan my week?",
+    "مرحباً، كيف حالك اليوم؟",
+]
+ALPHABET = "ابتثجحخدذرزسشصضطظعغفقكلمنهوي"
+
+
+def synthetic_triggers(skills: int, keywords_per_skill: int, rng: random.Random):
+    return {
+        f"skill{s}.intent": [
+            "".join(rng.choice(ALPHABET) for _ in range(rng.randint(4, 9)))
+            for _ in range(keywords_per_skill)
+        ]
+        for s in range(skills)
+    }
+
+
+def sequential_route(triggers, text):
+    """The previous approach: one ``in`` check per keyword."""
+    norm = normalize_arabic(text)
+    return {intent for intent, words in triggers.items() if any(w in norm for w in words)}
+
+
+def per_message_us(func, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for message in MESSAGES:
+            func(message)
+    return (time.perf_counter() - start) / (rounds * len(MESSAGES)) * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Intent router scaling benchmark")
+    parser.add_argument("--rounds", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    base = ZeroSystem().brother_ai.router
+    print(f"{'skills':>7} {'keywords':>9} {'router µs':>10} {'sequential µs':>14}")
+    for skills in (4, 40, 400, 4000):
+        triggers = synthetic_triggers(skills, 10, rng)
+        router = IntentRouter(triggers)
+        router.register_triggers({"voice": ["صوت"]})
+        router.route("")  # compile outside the timed loop
+        routed = per_message_us(router.route, args.rounds)
+        sequential = per_message_us(lambda m: sequential_route(triggers, m), max(1, args.rounds // skills))
+        print(f"{skills:>7} {router.keyword_count:>9} {routed:>10.2f} {sequential:>14.2f}")
+    print(f"ZeroSystem router: {per_message_us(base.route, args.rounds):.2f} µs/message")
+
+
+if __name__ == "__main__":
+    main()
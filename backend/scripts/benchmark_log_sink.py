@@ -0,0 +1,65 @@
+"""
+مقارنة سرعة كتابة سجلات JSONL المباشرة مع الكتابة المجمعة عبر JsonlLogSink
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from backend.core.log_sink import JsonlLogSink  # noqa: E402
+
+
+def _entries(n: int):
+    response = {"status": "success", "output": "مرحباً! كيف يمكنني مساعدتك اليوم؟ 🌟", "mood": "default"}
+    now = datetime.now().isoformat()
+    return [{"time": now, "message": f"رسالة {i}", "response": response} for i in range(n)]
+
+
+def bench_direct(path: str, n: int) -> float:
+    """The previous behaviour: open, write one line and close per entry."""
+    entries = _entries(n)
+    start = time.perf_counter()
+    for entry in entries:
+        with open(path, "a", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+            f.write("\n")
+    return time.perf_counter() - start
+
+
+def bench_sink(path: str, n: int, fsync: str):
+    """Return (time spent in write() calls, total time including close())."""
+    entries = _entries(n)
+    sink = JsonlLogSink(path, fsync=fsync)
+    start = time.perf_counter()
+    for entry in entries:
+        sink.write(entry)
+    written = time.perf_counter() - start
+    sink.close()
+    return written, time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="JSONL log sink micro-benchmark")
+    parser.add_argument("-n", type=int, default=20000, help="number of entries")
+    parser.add_argument("--fsync", default="never", choices=["never", "batch"])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        direct = bench_direct(os.path.join(tmp, "direct.jsonl"), args.n)
+        written, total = bench_sink(os.path.join(tmp, "sink.jsonl"), args.n, args.fsync)
+
+    print(f"direct:          {args.n / direct:12.0f} entries/s")
+    print(f"sink (caller):   {args.n / written:12.0f} entries/s (fsync={args.fsync})")
+    print(f"sink (to disk):  {args.n / total:12.0f} entries/s (incl. close)")
+    print(f"caller speedup:  {direct / written:12.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+قياسات دقيقة لمسارات تنفيذ المهارات وsystem_status لرصد التراجع في الأداء
+"""
+import argparse
+import os
+import sys
+import time
+import timeit
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from zero_system import (  # noqa: E402
+    DigitalDNA,
+    MindfulEmbodimentSkill,
+    TrueDigitalFriendshipSkill,
+    ZeroSystem,
+)
+
+
+def cases():
+    mindful = MindfulEmbodimentSkill()
+    friendship = TrueDigitalFriendshipSkill()
+    intents = mindful.router().route("صوت مرح من فضلك")
+    profiles = [{"id": f"user-{n}", "name": f"صديق {n}"} for n in range(100)]
+    dna = DigitalDNA()
+    system = ZeroSystem(log_filename=os.devnull)
+    state = {"n": 0}
+
+    def friendship_execute():
+        state["n"] += 1
+        friendship.execute(profiles[state["n"] % len(profiles)])
+
+    return {
+        "mindful.execute (routed)": lambda: mindful.execute("صوت مرح من فضلك", intents),
+        "mindful.execute (unrouted)": lambda: mindful.execute("صوت مرح من فضلك"),
+        "friendship.execute": friendship_execute,
+        "dna.backup": dna.backup,
+        "system_status": system.system_status,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Skill execute micro-benchmarks")
+    parser.add_argument("--number", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'case':<28} {'best µs':>9} {'median µs':>10}")
+    for name, func in cases().items():
+        timings = sorted(
+            t / args.number * 1e6
+            for t in timeit.repeat(func, timer=time.perf_counter, number=args.number, repeat=args.repeat)
+        )
+        print(f"{name:<28} {timings[0]:>9.2f} {timings[len(timings) // 2]:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
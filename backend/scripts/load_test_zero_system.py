@@ -0,0 +1,58 @@
+"""
+اختبار حمل لـ ZeroSystem عبر عدة خيوط مع التحقق من عدم فقدان تحديثات العدادات
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from logger import ZeroSystemLogger  # noqa: E402
+from zero_system import ZeroSystem  # noqa: E402
+
+MESSAGES = ["مرحبا", "صوت لدي سؤال تقني", "أريد أخاً صغيراً", "أشعر بالقلق"]
+
+
+def run(threads: int, per_thread: int, tmp: str):
+    system = ZeroSystem(log_filename=os.path.join(tmp, f"log-{threads}.jsonl"))
+    system.logger = ZeroSystemLogger(os.path.join(tmp, f"mood-{threads}.jsonl"))
+
+    def worker(n: int) -> None:
+        profile = {"id": f"user-{n % 4}", "name": "Test"}
+        for i in range(per_thread):
+            system.interact(MESSAGES[i % len(MESSAGES)], profile)
+
+    pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    start = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - start
+    system.close()
+
+    expected = threads * per_thread
+    lost = expected - system.interaction_count
+    return expected / elapsed, lost
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="ZeroSystem multi-threaded load test")
+    parser.add_argument("--per-thread", type=int, default=5000)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    args = parser.parse_args()
+
+    print(f"{'threads':>8} {'interactions/s':>15} {'lost updates':>13}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for threads in args.threads:
+            rate, lost = run(threads, args.per_thread, tmp)
+            print(f"{threads:>8} {rate:>15.0f} {lost:>13}")
+
+
+if __name__ == "__main__":
+    main()
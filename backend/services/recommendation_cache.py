@@ -0,0 +1,238 @@
+"""
+Recommendation cache.
+Cache keys, loaders and a warmer for the recommendation endpoints.
+
+The endpoints and :class:`CacheWarmer` share the key builders and loaders
+below, so a warmed entry is exactly what the endpoint would have cached.
+The warmer ranks users and items by recent activity in the
+``interactions`` table and fills the cache most active first, with
+bounded concurrency and a rate limit::
+
+    python -m services.recommendation_cache --hours 24 --users 500 --items 500
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import desc, func
+from sqlalchemy.orm import Session
+
+from core.cache import SmartCache, cache as default_cache
+from models.interaction import Interaction
+from services.recommendation import recommendation_service
+
+RECOMMENDATIONS_TTL = 3600
+SIMILAR_ITEMS_TTL = 1800
+TRENDING_TTL = 300
+
+
+def recommendations_key(user_id: int, limit: int) -> str:
+    return f"recommendations:{user_id}:{limit}"
+
+
+def similar_items_key(item_id: int, limit: int) -> str:
+    return f"similar_items:{item_id}:{limit}"
+
+
+def trending_key(skip: int, limit: int) -> str:
+    return f"trending:{skip}:{limit}"
+
+
+def serialize_recommendations(recommendations: List[Any]) -> List[Dict[str, Any]]:
+    """Plain dicts that every cache codec can store."""
+    return [
+        {
+            "user_id": r.user_id,
+            "item_id": r.item_id,
+            "score": r.score,
+            "reason": r.reason,
+        }
+        for r in recommendations
+    ]
+
+
+def load_recommendations(db: Session, user_id: int, limit: int) -> List[Dict[str, Any]]:
+    return serialize_recommendations(
+        recommendation_service.get_recommendations(db, user_id=user_id, limit=limit)
+    )
+
+
+def load_similar_items(db: Session, item_id: int, limit: int) -> List[Dict[str, Any]]:
+    return serialize_recommendations(
+        recommendation_service.get_similar_items(db, item_id=item_id, limit=limit)
+    )
+
+
+def load_trending_items(db: Session, skip: int, limit: int) -> List[Dict[str, Any]]:
+    return serialize_recommendations(
+        recommendation_service.get_trending_items(db, skip=skip, limit=limit)
+    )
+
+
+class RateLimiter:
+    """Async limiter that spaces calls evenly at ``rate`` per second."""
+
+    def __init__(self, rate: Optional[float]) -> None:
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class CacheWarmer:
+    """Precompute recommendation, similar-item and trending lists into the cache."""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        cache: Optional[SmartCache] = None,
+        concurrency: int = 4,
+        rate_per_second: Optional[float] = 50.0,
+        limit: int = 10,
+        item_interaction_type: Optional[str] = "view",
+    ) -> None:
+        self.session_factory = session_factory
+        self.cache = cache or default_cache
+        self.concurrency = concurrency
+        self.rate_per_second = rate_per_second
+        self.limit = limit
+        self.item_interaction_type = item_interaction_type
+
+    # ------------------------------------------------------------ priorities
+
+    def hot_users(self, db: Session, since: datetime, max_users: int) -> List[int]:
+        """Users with the most interactions since ``since``, most active first."""
+        count = func.count(Interaction.id)
+        rows = (
+            db.query(Interaction.user_id, count)
+            .filter(Interaction.created_at >= since)
+            .group_by(Interaction.user_id)
+            .order_by(desc(count))
+            .limit(max_users)
+            .all()
+        )
+        return [user_id for user_id, _ in rows]
+
+    def hot_items(self, db: Session, since: datetime, max_items: int) -> List[int]:
+        """Items with the most (view) interactions since ``since``, most viewed first."""
+        count = func.count(Interaction.id)
+        query = db.query(Interaction.item_id, count).filter(Interaction.created_at >= since)
+        if self.item_interaction_type:
+            query = query.filter(Interaction.interaction_type == self.item_interaction_type)
+        rows = query.group_by(Interaction.item_id).order_by(desc(count)).limit(max_items).all()
+        return [item_id for item_id, _ in rows]
+
+    # ---------------------------------------------------------------- warming
+
+    async def warm(
+        self,
+        hours: int = 24,
+        max_users: int = 500,
+        max_items: int = 500,
+        trending_pages: int = 1,
+    ) -> Dict[str, Any]:
+        """Run one warming pass and return counts and elapsed time."""
+        start = time.perf_counter()
+        since = datetime.utcnow() - timedelta(hours=hours)
+        db = self.session_factory()
+        try:
+            users = self.hot_users(db, since, max_users)
+            items = self.hot_items(db, since, max_items)
+        finally:
+            db.close()
+
+        limit = self.limit
+        jobs = [
+            (trending_key(page * limit, limit), load_trending_items, (page * limit, limit),
+             TRENDING_TTL, ["ns:trending"])
+            for page in range(trending_pages)
+        ]
+        # المستخدمون والعناصر بالتناوب حتى يحصل الأنشط من كلا النوعين على الأولوية
+        for rank in range(max(len(users), len(items))):
+            if rank < len(users):
+                user_id = users[rank]
+                jobs.append((recommendations_key(user_id, limit), load_recommendations, (user_id, limit),
+                             RECOMMENDATIONS_TTL, [f"user:{user_id}"]))
+            if rank < len(items):
+                item_id = items[rank]
+                jobs.append((similar_items_key(item_id, limit), load_similar_items, (item_id, limit),
+                             SIMILAR_ITEMS_TTL, [f"item:{item_id}"]))
+
+        queue: "asyncio.Queue" = asyncio.Queue()
+        for job in jobs:
+            queue.put_nowait(job)
+        limiter = RateLimiter(self.rate_per_second)
+        result = {"users": len(users), "items": len(items), "warmed": 0, "failed": 0}
+        workers = [
+            asyncio.ensure_future(self._worker(queue, limiter, result))
+            for _ in range(max(1, self.concurrency))
+        ]
+        await queue.join()
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        result["seconds"] = time.perf_counter() - start
+        logging.info("Cache warming finished: %s", result)
+        return result
+
+    async def _worker(self, queue: "asyncio.Queue", limiter: RateLimiter, result: Dict[str, Any]) -> None:
+        while True:
+            key, loader, args, ttl, tags = await queue.get()
+            try:
+                await limiter.wait()
+                value = await asyncio.get_running_loop().run_in_executor(
+                    None, self._load, loader, args
+                )
+                await self.cache.aset(key, value, ttl, tags)
+                result["warmed"] += 1
+            except Exception:
+                logging.exception("Failed to warm cache key %s", key)
+                result["failed"] += 1
+            finally:
+                queue.task_done()
+
+    def _load(self, loader: Callable, args: tuple) -> Any:
+        # جلسة لكل تحميل: جلسات SQLAlchemy لا تُشارك بين الخيوط
+        db = self.session_factory()
+        try:
+            return loader(db, *args)
+        finally:
+            db.close()
+
+    async def run_forever(self, interval: float, **options: Any) -> None:
+        """Warm now and then every ``interval`` seconds until cancelled."""
+        while True:
+            try:
+                await self.warm(**options)
+            except Exception:
+                logging.exception("Cache warming pass failed")
+            await asyncio.sleep(interval)
+
+
+if __name__ == "__main__":  # pragma: no cover - manual helper
+    import argparse
+
+    from core.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Warm the recommendation cache")
+    parser.add_argument("--hours", type=int, default=24, help="activity window")
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--items", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--rate", type=float, default=50.0, help="loads per second (0 = unlimited)")
+    args = parser.parse_args()
+
+    warmer = CacheWarmer(SessionLocal, concurrency=args.concurrency, rate_per_second=args.rate)
+    print(asyncio.run(warmer.warm(args.hours, args.users, args.items)))
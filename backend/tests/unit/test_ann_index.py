@@ -0,0 +1,95 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from backend.recommendation_system.ann_index import (  # noqa: E402
+    BruteForceIndex,
+    IVFIndex,
+    build_index,
+    load_index,
+    mips_item_vectors,
+    mips_query,
+    save_index,
+    top_k,
+    top_k_rows,
+)
+
+
+def clustered(n=3000, dim=16, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(30, dim))
+    return (centers[rng.integers(30, size=n)] + 0.3 * rng.normal(size=(n, dim))).astype(np.float32)
+
+
+def test_top_k_is_sorted_and_bounded():
+    scores = np.array([0.1, 0.9, 0.5, 0.7])
+    assert top_k(scores, 2).tolist() == [1, 3]
+    assert top_k(scores, 10).tolist() == [1, 3, 2, 0]
+    assert top_k(scores, 0).size == 0
+
+
+def test_top_k_rows_matches_top_k_per_row():
+    scores = np.random.default_rng(3).normal(size=(4, 50))
+    rows = top_k_rows(scores, 5)
+    assert rows.shape == (4, 5)
+    for row, expected in zip(rows, scores):
+        assert row.tolist() == top_k(expected, 5).tolist()
+    assert top_k_rows(scores[:, :3], 5).shape == (4, 3)
+
+
+def test_mips_vectors_reproduce_biased_scores():
+    rng = np.random.default_rng(1)
+    embeddings, biases, user = rng.normal(size=(5, 4)), rng.normal(size=5), rng.normal(size=4)
+    scores = mips_item_vectors(embeddings, biases) @ mips_query(user)
+    assert np.allclose(scores, embeddings @ user + biases, atol=1e-5)
+
+
+def test_ivf_recall_against_brute_force():
+    vectors = clustered()
+    exact = BruteForceIndex(vectors)
+    ivf = IVFIndex(vectors, n_probe=8)
+    assert sorted(ivf.ids.tolist()) == list(range(len(vectors)))
+    queries = np.random.default_rng(2).normal(size=(20, vectors.shape[1])).astype(np.float32)
+    found = 0
+    for query in queries:
+        truth = exact.search(query, 10)[0]
+        candidates = ivf.search(query, 100)[0]
+        found += len(np.intersect1d(truth, candidates))
+    assert found / (10 * len(queries)) >= 0.9
+
+
+def test_build_index_auto_and_unknown_kind():
+    assert build_index(clustered(n=100), "auto").kind == "brute"
+    with pytest.raises(ValueError):
+        build_index(clustered(n=100), "annoy")
+
+
+@pytest.mark.parametrize("kind", ["brute", "ivf"])
+def test_upsert_replaces_and_appends(kind):
+    vectors = clustered(n=500)
+    index = build_index(vectors, kind, **({"n_probe": 100} if kind == "ivf" else {}))
+    query = np.ones(vectors.shape[1], dtype=np.float32)
+    index.upsert(np.array([3, 500]), np.stack([10 * query, 20 * query]))
+    ids, scores = index.search(query, 3)
+    assert ids[:2].tolist() == [500, 3]
+    assert len(index) == 501
+
+
+@pytest.mark.parametrize("kind", ["brute", "ivf"])
+def test_saved_index_loads_memory_mapped(kind, tmp_path):
+    vectors = clustered(n=500)
+    index = build_index(vectors, kind, **({"n_probe": 100} if kind == "ivf" else {}))
+    query = np.ones(vectors.shape[1], dtype=np.float32)
+    index.upsert(np.array([3, 500]), np.stack([10 * query, 20 * query]))
+    prefix = str(tmp_path / "index")
+    meta = save_index(index, prefix)
+    all_vectors = np.vstack([vectors, 20 * query[None]])
+    all_vectors[3] = 10 * query
+    np.save(tmp_path / "vectors.npy", all_vectors)
+
+    loaded = load_index(prefix, meta, np.load(tmp_path / "vectors.npy", mmap_mode="r"))
+    assert not loaded.vectors.flags.owndata and not loaded.vectors.flags.writeable
+    assert len(loaded) == 501
+    assert loaded.search(query, 3)[0].tolist() == index.search(query, 3)[0].tolist()
+    loaded.upsert(np.array([7]), 30 * query[None])
+    assert loaded.search(query, 1)[0].tolist() == [7]
@@ -0,0 +1,46 @@
+import asyncio
+import threading
+
+from sss.zero_system import ZeroSystem
+
+
+def test_ainteract_matches_interact(tmp_path):
+    system = ZeroSystem(log_filename=str(tmp_path / "log.jsonl"))
+    user = {"id": "u1", "name": "Test"}
+    response = asyncio.run(system.ainteract("مرحبا", user))
+    assert response["friendship_level"] == 1
+    assert asyncio.run(system.ainteract("أريد أخاً صغيراً"))["sibling_id"] == "أخ رقمي #1"
+    assert system.interaction_count == 2
+
+
+def test_arun_skills_runs_independent_skills():
+    system = ZeroSystem()
+    results = asyncio.run(system.arun_skills({
+        "empathy_sensor": ("أشعر بالقلق",),
+        "mindful_embodiment": ("سؤال تقني",),
+        "sibling_genesis": (),
+    }))
+    assert results["empathy_sensor"]["empathy"] == "قلق"
+    assert results["mindful_embodiment"]["mood"] == "professional"
+    assert results["sibling_genesis"]["status"] == "success"
+
+
+def test_concurrent_interactions_do_not_lose_updates(tmp_path):
+    system = ZeroSystem(log_filename=str(tmp_path / "log.jsonl"))
+    threads, per_thread = 8, 200
+
+    def worker():
+        for _ in range(per_thread):
+            system.interact("مرحبا", {"id": "shared", "name": "Test"})
+            system.create_sibling()
+
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+
+    total = threads * per_thread
+    assert system.interaction_count == total
+    assert system.skills["true_friendship"].friendship_levels["shared"] == total
+    assert system.skills["sibling_genesis"].siblings_created == total
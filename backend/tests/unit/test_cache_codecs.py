@@ -0,0 +1,61 @@
+import json
+from datetime import datetime
+
+import pytest
+
+from backend.core.cache_codecs import CacheCodec
+
+
+def test_round_trip_and_header():
+    codec = CacheCodec("json", compression="none")
+    data = codec.encode({"a": [1, 2], "ar": "مرحبا"})
+    assert CacheCodec.describe(data) == {"codec": "json", "compression": "none"}
+    assert CacheCodec.decode(data) == {"a": [1, 2], "ar": "مرحبا"}
+
+
+def test_datetimes_are_serialized():
+    when = datetime(2024, 6, 1, 10, 0)
+    assert CacheCodec("json").decode(CacheCodec("json").encode({"t": when})) == {"t": when.isoformat()}
+
+
+def test_large_values_are_compressed():
+    codec = CacheCodec("json", compression="zlib", compress_threshold=64)
+    value = {"scores": [0.5] * 1000}
+    data = codec.encode(value)
+    assert CacheCodec.describe(data)["compression"] == "zlib"
+    assert len(data) < len(json.dumps(value))
+    assert CacheCodec.decode(data) == value
+
+
+def test_reads_legacy_json_and_entries_from_other_codecs():
+    assert CacheCodec.decode(b'{"a": 1}') == {"a": 1}
+    written = CacheCodec("json", compression="zlib", compress_threshold=0).encode([1, 2, 3] * 100)
+    assert CacheCodec("auto").decode(written) == [1, 2, 3] * 100
+
+
+def test_orjson_codec():
+    pytest.importorskip("orjson")
+    codec = CacheCodec("orjson")
+    assert codec.decode(codec.encode({"1": [1.5]})) == {"1": [1.5]}
+
+
+def test_ndarray_buffer_round_trip():
+    np = pytest.importorskip("numpy")
+    array = np.arange(12, dtype=np.float32).reshape(3, 4)
+    data = CacheCodec().encode(array)
+    assert CacheCodec.describe(data)["codec"] == "ndarray"
+    decoded = CacheCodec.decode(data)
+    assert decoded.dtype == np.float32 and (decoded == array).all()
+
+
+def test_msgpack_keeps_arrays_and_datetimes():
+    np = pytest.importorskip("numpy")
+    pytest.importorskip("msgpack")
+    value = {"v": np.ones(3, dtype=np.float32), "t": datetime(2024, 6, 1)}
+    decoded = CacheCodec("msgpack").decode(CacheCodec("msgpack").encode(value))
+    assert decoded["t"] == value["t"] and (decoded["v"] == value["v"]).all()
+
+
+def test_unknown_codec_is_rejected():
+    with pytest.raises(ValueError):
+        CacheCodec("pickle")
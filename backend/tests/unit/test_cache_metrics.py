@@ -0,0 +1,39 @@
+from backend.core.cache_metrics import CacheMetrics, HotKeyTracker, key_prefix
+from backend.core.local_cache import LocalCache
+
+
+def test_key_prefix_keeps_label_cardinality_low():
+    assert key_prefix("cache:recs:0123abcd") == "recs"
+    assert key_prefix("recommendations:42:10") == "recommendations"
+    assert key_prefix("user_persona_42") == "other"
+
+
+def test_hot_key_tracker_is_bounded():
+    tracker = HotKeyTracker(capacity=2)
+    for _ in range(5):
+        tracker.hit("cache:a:1")
+    for _ in range(3):
+        tracker.hit("cache:b:1")
+    for n in range(10):
+        tracker.hit(f"cache:cold:{n}")
+    assert len(tracker._counts) <= 4
+    assert [row["key"] for row in tracker.top(2)] == ["cache:a:1", "cache:b:1"]
+    assert tracker.top(1)[0] == {"key": "cache:a:1", "prefix": "a", "hits": 5}
+
+
+def test_local_cache_reports_evictions():
+    evicted = []
+    cache = LocalCache(max_entries=1, on_evict=evicted.append)
+    cache.set("a", 1)
+    cache.get("b")
+    cache.get("b")
+    cache.set("b", 2)
+    assert evicted == ["a"]
+
+
+def test_metrics_record_hits_without_prometheus_registry_clash():
+    metrics = CacheMetrics(namespace="test_cache_metrics")
+    metrics.hit("cache:recs:1", "l1")
+    metrics.miss("cache:recs:2")
+    metrics.latency("cache:recs:2", "get", 0.001)
+    assert metrics.hot_keys.top(1)[0]["key"] == "cache:recs:1"
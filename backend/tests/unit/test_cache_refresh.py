@@ -0,0 +1,121 @@
+import asyncio
+
+from backend.core.cache_metrics import default_metrics
+from backend.core.cache_refresh import ENTRY_MARKER, CachedLoader
+from backend.core.local_cache import LocalCache
+
+
+class LocalStore(CachedLoader):
+    default_ttl = 60
+
+    def __init__(self):
+        super().__init__()
+        self.l1 = LocalCache(max_entries=64, default_ttl=3600)
+        self.metrics = default_metrics()
+        self.errors = []
+
+    def _generate_key(self, prefix, *args, **kwargs):
+        return ":".join([prefix, *map(str, args)])
+
+    async def _alookup(self, key):
+        value = self.l1.get(key)
+        return value, "l1" if value is not None else None
+
+    async def aset(self, key, value, ttl=None, tags=None):
+        self.l1.set(key, value, ttl)
+        return True
+
+    def _report_error(self, error, context):
+        self.errors.append(error)
+
+
+def expire(store, key):
+    entry = store.l1.get(key)
+    assert ENTRY_MARKER in entry
+    entry["fresh_until"] = 0
+
+
+def test_concurrent_misses_call_the_loader_once():
+    store = LocalStore()
+    calls = []
+
+    @store.cached("recs")
+    async def load(user_id):
+        calls.append(user_id)
+        await asyncio.sleep(0.01)
+        return [user_id]
+
+    async def main():
+        return await asyncio.gather(*(load(7) for _ in range(5)))
+
+    assert asyncio.run(main()) == [[7]] * 5
+    assert calls == [7]
+
+
+def test_stale_entry_is_served_while_one_refresh_runs():
+    store = LocalStore()
+    calls = []
+
+    async def main():
+        gate = asyncio.Event()
+
+        @store.cached("recs", stale_ttl=60)
+        async def load(user_id):
+            calls.append(user_id)
+            if len(calls) > 1:
+                await gate.wait()
+            return len(calls)
+
+        assert await load(7) == 1
+        expire(store, "recs:7")
+        assert await asyncio.gather(*(load(7) for _ in range(5))) == [1] * 5
+        await asyncio.sleep(0)
+        assert len(store._refreshes) == 1
+        gate.set()
+        await asyncio.gather(*store._refreshes.values())
+        assert await load(7) == 2
+
+    asyncio.run(main())
+    assert calls == [7, 7]
+
+
+def test_failed_refresh_keeps_the_stale_value():
+    store = LocalStore()
+    fail = []
+
+    @store.cached("recs", stale_ttl=60)
+    async def load(user_id):
+        if fail:
+            raise RuntimeError("backend down")
+        return "old"
+
+    async def main():
+        assert await load(7) == "old"
+        expire(store, "recs:7")
+        fail.append(True)
+        assert await load(7) == "old"
+        await asyncio.gather(*store._refreshes.values(), return_exceptions=True)
+        assert [str(e) for e in store.errors] == ["backend down"]
+        assert store.l1.get("recs:7")["value"] == "old"
+
+    asyncio.run(main())
+
+
+def test_refresh_can_run_inside_the_request():
+    store = LocalStore()
+    calls = []
+
+    @store.cached("recs", key_builder=lambda user_id, session: f"recs:{user_id}",
+                  stale_ttl=60, background_refresh=False)
+    async def load(user_id, session):
+        calls.append(session)
+        return session
+
+    async def main():
+        assert await load(7, "s1") == "s1"
+        expire(store, "recs:7")
+        assert await load(7, "s2") == "s2"
+        assert not store._refreshes
+
+    asyncio.run(main())
+    assert calls == ["s1", "s2"]
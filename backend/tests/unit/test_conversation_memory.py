@@ -0,0 +1,52 @@
+import pytest
+
+from backend.core.conversation_memory import ConversationMemory, SqliteMemoryStore
+from sss.zero_system import ZeroSystem
+
+
+def test_history_is_bounded_per_user():
+    memory = ConversationMemory(max_messages_per_user=3)
+    for n in range(5):
+        memory.append("u1", {"n": n})
+    assert [e["n"] for e in memory.recent("u1")] == [2, 3, 4]
+    assert [e["n"] for e in memory.recent("u1", 2)] == [3, 4]
+    assert memory.last("u1") == {"n": 4}
+    assert memory.total_messages == 3
+
+
+def test_idle_users_are_evicted_first():
+    memory = ConversationMemory(max_messages_per_user=2, max_total_messages=4)
+    memory.append("a", {"n": 1})
+    memory.append("b", {"n": 1})
+    memory.append("a", {"n": 2})
+    memory.append("c", {"n": 1})
+    memory.append("c", {"n": 2})
+    assert "b" not in memory
+    assert "a" in memory and "c" in memory
+    assert memory.total_messages <= 4
+    assert memory.evictions == 1
+
+
+def test_evicted_users_spill_and_restore():
+    spill = SqliteMemoryStore()
+    memory = ConversationMemory(max_messages_per_user=2, max_total_messages=2, spill=spill)
+    memory.append("a", {"n": 1})
+    memory.append("b", {"n": 1})
+    memory.append("b", {"n": 2})
+    assert "a" not in memory and len(spill) == 1
+    assert memory.recent("a") == [{"n": 1}]
+    assert "a" in memory
+
+
+def test_invalid_limits():
+    with pytest.raises(ValueError):
+        ConversationMemory(max_messages_per_user=10, max_total_messages=5)
+
+
+def test_brother_ai_remembers_per_user():
+    system = ZeroSystem()
+    system.interact("مرحبا", {"id": "u1", "name": "Test"})
+    system.interact("كيف الحال؟")
+    memory = system.brother_ai.memory
+    assert memory.last("u1")["message"] == "مرحبا"
+    assert memory.last("default")["message"] == "كيف الحال؟"
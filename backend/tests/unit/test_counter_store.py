@@ -0,0 +1,125 @@
+import time
+
+from backend.core.counter_store import (
+    MemoryCounterBackend,
+    ShardedCounterBackend,
+    SqliteCounterBackend,
+    WriteBehindCounter,
+    counter_backend_from_url,
+)
+from sss.zero_system import TrueDigitalFriendshipSkill, ZeroSystem
+
+
+class CountingBackend(MemoryCounterBackend):
+    def __init__(self):
+        super().__init__()
+        self.flushes = 0
+        self.reads = 0
+
+    def get_many(self, keys):
+        self.reads += 1
+        return super().get_many(keys)
+
+    def incr_many(self, deltas):
+        self.flushes += 1
+        return super().incr_many(deltas)
+
+
+def test_increments_are_batched():
+    backend = CountingBackend()
+    counter = WriteBehindCounter(backend, flush_interval=60, max_pending=10)
+    for _ in range(25):
+        counter.incr("u1")
+    assert counter["u1"] == 25
+    assert backend.flushes == 2
+    counter.flush()
+    assert backend.get_many(["u1"]) == {"u1": 25}
+
+
+def test_workers_converge_through_shared_sqlite(tmp_path):
+    path = str(tmp_path / "counters.db")
+    a = WriteBehindCounter(SqliteCounterBackend(path), flush_interval=60)
+    b = WriteBehindCounter(SqliteCounterBackend(path), flush_interval=60)
+    a.incr("u1")
+    a.incr("u1")
+    a.flush()
+    assert b.incr("u1") == 3
+    b.flush()
+    a.incr("u1")
+    a.flush()
+    assert a["u1"] == 4
+
+
+def test_sharded_backend_routes_keys_consistently():
+    shards = [MemoryCounterBackend(), MemoryCounterBackend()]
+    backend = ShardedCounterBackend(shards)
+    keys = [f"user-{n}" for n in range(20)]
+    backend.incr_many({k: 1 for k in keys})
+    assert backend.get_many(keys) == {k: 1 for k in keys}
+    assert all(shard._data for shard in shards)
+
+
+def test_backend_from_url(tmp_path):
+    assert isinstance(counter_backend_from_url(None), MemoryCounterBackend)
+    backend = counter_backend_from_url(f"sqlite:///{tmp_path}/a.db,sqlite:///{tmp_path}/b.db")
+    assert isinstance(backend, ShardedCounterBackend) and len(backend.shards) == 2
+
+
+def test_friendship_levels_survive_restart(tmp_path):
+    url = f"sqlite:///{tmp_path}/friendship.db"
+    user = {"id": "u1", "name": "Test"}
+    first = ZeroSystem(friendship_store=WriteBehindCounter(counter_backend_from_url(url)))
+    for _ in range(3):
+        first.interact("مرحبا", user)
+    first.close()
+
+    second = ZeroSystem(friendship_store=WriteBehindCounter(counter_backend_from_url(url)))
+    assert second.interact("مرحبا", user)["friendship_level"] == 4
+    assert TrueDigitalFriendshipSkill().execute(user)["friendship_level"] == 1
+
+
+def test_quiet_counter_is_flushed_by_timer_and_evicted():
+    backend = CountingBackend()
+    counter = WriteBehindCounter(backend, flush_interval=0.01, max_pending=100, idle_ttl=0)
+    counter.incr("u1")
+    for _ in range(200):
+        if backend.flushes and not len(counter):
+            break
+        time.sleep(0.01)
+    assert backend.get_many(["u1"]) == {"u1": 1}
+    assert len(counter) == 0
+    assert counter["u1"] == 1
+    assert counter.incr("u1") == 2
+    counter.close()
+    assert backend.get_many(["u1"]) == {"u1": 2}
+
+
+def test_recently_used_keys_stay_cached_across_flushes():
+    backend = CountingBackend()
+    counter = WriteBehindCounter(backend, flush_interval=60, idle_ttl=60)
+    counter.incr("u1")
+    counter.flush()
+    counter.flush()
+    assert counter.incr("u1") == 2
+    assert backend.reads == 1
+    counter.close()
+
+
+def test_seed_is_read_again_when_keys_were_evicted_during_the_read():
+    backend = CountingBackend()
+    counter = WriteBehindCounter(backend, flush_interval=60)
+    read = backend.get_many
+
+    def racing_read(keys):
+        if backend.reads == 0:
+            # another thread flushes an increment of this key and evicts it
+            backend.reads += 1
+            backend.incr_many({"u1": 1})
+            counter._evictions += 1
+            return {"u1": 0}
+        return read(keys)
+
+    backend.get_many = racing_read
+    assert counter.incr("u1") == 2
+    counter.close()
+    assert backend.get_many(["u1"]) == {"u1": 2}
@@ -0,0 +1,41 @@
+from backend.core.intent_router import IntentRouter, normalize_arabic
+from sss.zero_system import AmrikyyBrotherAI, ZeroSystem
+
+
+def test_normalize_arabic():
+    assert normalize_arabic("أإآىة") == "ااايه"
+
+
+def test_route_returns_every_matching_intent():
+    router = IntentRouter({"a": ["قلق"], "b": ["برمجة"], "c": ["رياضة"]})
+    assert router.route("قلق من البرمجة") == {"a", "b"}
+    assert router.route("مرحبا") == frozenset()
+
+
+def test_route_reports_nested_and_overlapping_keywords():
+    router = IntentRouter({"short": ["اخ"], "long": ["اخت"], "tail": ["خت"]})
+    assert router.route("اختي") == {"short", "long", "tail"}
+
+
+def test_route_normalizes_keywords_and_text():
+    router = IntentRouter({"help": ["مساعدة"]})
+    assert router.route("أريد مساعده") == {"help"}
+
+
+def test_register_recompiles():
+    router = IntentRouter()
+    assert router.route("صوت") == frozenset()
+    router.register("voice", ["صوت"])
+    assert router.route("صوت") == {"voice"}
+
+
+def test_brother_router_collects_skill_triggers():
+    system = ZeroSystem()
+    router = system.brother_ai.router
+    assert router.route("أريد أخاً صغيراً بصوت مرح") >= {
+        "sibling.brother",
+        "sibling.small",
+        "voice",
+        "context.cheerful",
+    }
+    assert "voice" in AmrikyyBrotherAI.triggers
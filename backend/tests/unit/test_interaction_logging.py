@@ -8,6 +8,7 @@ def test_interact_creates_log_file(tmp_path):
     log_file = tmp_path / "log.jsonl"
     system = zs.ZeroSystem(log_filename=str(log_file))
     system.interact("اختبار التسجيل")
+    system.flush()
     assert log_file.exists()
     with open(log_file, encoding="utf-8") as f:
         lines = f.readlines()
@@ -0,0 +1,46 @@
+import time
+
+from backend.core.local_cache import LocalCache
+
+
+def test_get_set_and_ttl():
+    cache = LocalCache(max_entries=4, default_ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=0.01)
+    assert cache.get("a") == 1
+    time.sleep(0.02)
+    assert cache.get("b") is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_ttl_is_capped_by_default_ttl():
+    cache = LocalCache(default_ttl=0.01)
+    cache.set("a", 1, ttl=3600)
+    time.sleep(0.02)
+    assert "a" not in cache
+
+
+def test_lru_eviction_of_equally_popular_keys():
+    cache = LocalCache(max_entries=2)
+    for key in ("a", "b"):
+        cache.get(key)
+        cache.set(key, key)
+    cache.get("a")  # b is now least recently used
+    cache.get("c")
+    cache.get("c")
+    assert cache.set("c", "c")
+    assert "a" in cache and "c" in cache and "b" not in cache
+    assert cache.evictions == 1
+
+
+def test_tinylfu_rejects_one_off_keys():
+    cache = LocalCache(max_entries=2)
+    for key in ("hot1", "hot2"):
+        for _ in range(5):
+            cache.get(key)
+        cache.set(key, key)
+    for n in range(20):
+        cache.get(f"scan{n}")
+        cache.set(f"scan{n}", n)
+    assert "hot1" in cache and "hot2" in cache
+    assert cache.rejections == 20
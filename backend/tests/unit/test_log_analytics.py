@@ -0,0 +1,66 @@
+import json
+
+from backend.core.log_analytics import LogAnalytics, RollingMoodDistribution, tail_jsonl
+import sss.zero_system as zs
+
+
+def write_lines(path, entries, tail=""):
+    with open(path, "a", encoding="utf-8") as f:
+        for entry in entries:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        f.write(tail)
+
+
+def test_tail_stops_before_partial_line(tmp_path):
+    path = str(tmp_path / "log.jsonl")
+    write_lines(path, [{"n": 1}, {"n": 2}], tail='{"n": 3')
+    rows = list(tail_jsonl(path))
+    assert [e["n"] for _, e in rows] == [1, 2]
+    assert list(tail_jsonl(path, rows[0][0])) == rows[1:]
+
+
+def test_rolling_mood_window():
+    moods = RollingMoodDistribution(window=2)
+    for mood in ("a", "a", "b"):
+        moods.add(mood)
+    assert moods.distribution() == {"a": 0.5, "b": 0.5}
+    assert moods.total == 3
+
+
+def test_checkpoint_resumes_from_last_offset(tmp_path):
+    log, mood, checkpoint = (str(tmp_path / n) for n in ("log.jsonl", "mood.jsonl", "cp.json"))
+    system = zs.ZeroSystem(log_filename=log)
+    system.logger.filename = mood
+    user = {"id": "u1", "name": "U"}
+    system.interact("مرحبا", user)
+    system.interact("أريد أخاً صغيراً")
+    system.flush()
+
+    first = LogAnalytics(log, mood, checkpoint)
+    assert first.update() == {"interactions": 2, "moods": 2}
+
+    system.interact("صوت مرح", user)
+    system.close()
+    second = LogAnalytics(log, mood, checkpoint)
+    assert second.update() == {"interactions": 1, "moods": 1}
+
+    report = second.report()
+    assert report["interactions"] == 3
+    assert report["skill_hit_rates"] == {
+        "true_friendship": 1 / 3,
+        "sibling_genesis": 1 / 3,
+        "mindful_embodiment": 1 / 3,
+    }
+    assert sum(report["interactions_per_user_hour"]["u1"].values()) == 2
+    assert sum(report["mood_distribution"].values()) == 1
+
+
+def test_truncated_log_is_reread(tmp_path):
+    log, checkpoint = str(tmp_path / "log.jsonl"), str(tmp_path / "cp.json")
+    write_lines(log, [{"time": "2024-06-01T10:00:00", "response": {}}] * 3)
+    LogAnalytics(log, checkpoint=checkpoint).update()
+    open(log, "w").close()
+    write_lines(log, [{"time": "2024-06-01T11:00:00", "response": {}}])
+    analytics = LogAnalytics(log, checkpoint=checkpoint)
+    assert analytics.update()["interactions"] == 1
+    assert analytics.report()["interactions"] == 4
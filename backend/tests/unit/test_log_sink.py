@@ -0,0 +1,91 @@
+import json
+import time
+
+import pytest
+
+from backend.core.log_sink import JsonlLogSink, get_log_sink
+
+
+def read_lines(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_write_is_buffered_until_flush(tmp_path):
+    path = tmp_path / "log.jsonl"
+    sink = JsonlLogSink(str(path), max_batch=100, flush_interval=60)
+    sink.write({"n": 1})
+    sink.write({"n": 2})
+    assert sink.pending == 2
+    sink.flush()
+    assert read_lines(path) == [{"n": 1}, {"n": 2}]
+    sink.close()
+
+
+def test_background_flush_on_batch_size(tmp_path):
+    path = tmp_path / "log.jsonl"
+    sink = JsonlLogSink(str(path), max_batch=2, flush_interval=60)
+    for n in range(4):
+        sink.write({"n": n})
+    sink.close()
+    assert [e["n"] for e in read_lines(path)] == [0, 1, 2, 3]
+
+
+def test_fsync_always_writes_through(tmp_path):
+    path = tmp_path / "log.jsonl"
+    sink = JsonlLogSink(str(path), fsync="always")
+    sink.write({"mood": "cheerful"})
+    assert sink.pending == 0
+    assert read_lines(path) == [{"mood": "cheerful"}]
+
+
+def test_write_after_close_is_not_lost(tmp_path):
+    path = tmp_path / "log.jsonl"
+    sink = JsonlLogSink(str(path))
+    sink.close()
+    sink.write({"late": True})
+    assert read_lines(path) == [{"late": True}]
+
+
+def test_invalid_fsync_policy():
+    with pytest.raises(ValueError):
+        JsonlLogSink("log.jsonl", fsync="sometimes")
+
+
+def test_get_log_sink_is_shared(tmp_path):
+    path = str(tmp_path / "log.jsonl")
+    sink = get_log_sink(path)
+    assert get_log_sink(path) is sink
+    sink.close()
+    assert get_log_sink(path) is not sink
+
+
+def test_failed_write_is_retried_and_flusher_survives(tmp_path):
+    path = tmp_path / "log.jsonl"
+    sink = JsonlLogSink(str(path), max_batch=1, flush_interval=0.01)
+    append, calls = sink._append, []
+
+    def flaky_append(entries):
+        calls.append(len(entries))
+        if len(calls) == 1:
+            raise OSError("disk full")
+        append(entries)
+
+    sink._append = flaky_append
+    sink.write({"n": 1})
+    for _ in range(200):
+        if path.exists():
+            break
+        time.sleep(0.01)
+    sink.write({"n": 2})
+    sink.close()
+    assert [e["n"] for e in read_lines(path)] == [1, 2]
+    assert calls[0] == 1
+
+
+def test_flush_error_keeps_entries(tmp_path):
+    sink = JsonlLogSink(str(tmp_path / "missing" / "log.jsonl"), max_batch=100, flush_interval=60)
+    sink.write({"n": 1})
+    with pytest.raises(OSError):
+        sink.flush()
+    assert sink.pending == 1
@@ -0,0 +1,72 @@
+import os
+
+from backend.core.log_store import SegmentedLogStore
+import sss.zero_system as zs
+
+
+def entry(time, user=None, n=0):
+    data = {"time": time, "message": f"m{n}", "response": {"status": "success"}}
+    if user is not None:
+        data["user"] = user
+    return data
+
+
+def test_rotates_by_size_and_compresses(tmp_path):
+    store = SegmentedLogStore(str(tmp_path), max_segment_bytes=200)
+    store.append([entry("2024-06-01T10:00:%02d" % n, n=n) for n in range(10)])
+    segments = store.segments()
+    assert len(segments) > 1
+    assert all(s["file"].endswith(".jsonl.gz") for s in segments[:-1])
+    assert segments[1]["offset"] == segments[0]["bytes"]
+    assert [e["message"] for e in store.read()] == [f"m{n}" for n in range(10)]
+
+
+def test_rotates_daily(tmp_path):
+    store = SegmentedLogStore(str(tmp_path))
+    store.append([entry("2024-06-01T23:59:59"), entry("2024-06-02T00:00:01")])
+    segments = store.segments()
+    assert len(segments) == 2
+    assert segments[0]["sealed"] and not segments[1]["sealed"]
+
+
+def test_read_skips_unrelated_segments(tmp_path):
+    store = SegmentedLogStore(str(tmp_path))
+    store.append([entry("2024-06-01T10:00:00", "a"), entry("2024-06-02T10:00:00", "b")])
+    first = store.segments()[0]
+    os.remove(os.path.join(str(tmp_path), first["file"]))
+
+    # Neither query should need the (now missing) first segment.
+    assert [e["user"] for e in store.read(start="2024-06-02")] == ["b"]
+    assert [e["user"] for e in store.read(user="b")] == ["b"]
+
+
+def test_index_survives_reopen(tmp_path):
+    store = SegmentedLogStore(str(tmp_path))
+    store.append([entry("2024-06-01T10:00:00", "a")])
+    reopened = SegmentedLogStore(str(tmp_path))
+    reopened.append([entry("2024-06-01T11:00:00", "a")])
+    assert len(list(reopened.read(user="a"))) == 2
+
+
+def test_zero_system_writes_to_store(tmp_path):
+    store = SegmentedLogStore(str(tmp_path))
+    system = zs.ZeroSystem(log_store=store)
+    system.interact("مرحبا", {"id": "u1", "name": "Test"})
+    system.flush()
+    entries = list(store.read(user="u1"))
+    assert entries[-1]["message"] == "مرحبا"
+
+
+def test_index_written_only_on_rollover(tmp_path, monkeypatch):
+    store = SegmentedLogStore(str(tmp_path), max_segment_bytes=1000)
+    saves = []
+    save_index = store._save_index
+    monkeypatch.setattr(store, "_save_index", lambda: saves.append(1) or save_index())
+    for minute in range(3):
+        store.append([entry(f"2024-06-01T10:0{minute}:00", "a")])
+    assert len(saves) == 1  # only when the first segment was started
+    store.append([entry("2024-06-01T10:10:00", "a", n="x" * 1000)])
+    assert len(saves) == 2
+    store.close()
+    reopened = SegmentedLogStore(str(tmp_path))
+    assert len(list(reopened.read())) == 4
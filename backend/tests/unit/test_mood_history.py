@@ -19,6 +19,7 @@ def test_mood_history_and_logging():
     system = zs.ZeroSystem()
     system.interact("صوت لدي سؤال تقني حول البرمجة")
     system.interact("مرحبا")
+    system.flush()
 
     assert os.path.exists(LOG_PATH)
     with open(LOG_PATH, encoding="utf-8") as f:
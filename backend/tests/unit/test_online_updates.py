@@ -0,0 +1,76 @@
+import threading
+
+from backend.recommendation_system.online_updates import InteractionUpdateWorker, ModelLock
+
+
+class FakeRecommender:
+    def __init__(self, fail=False):
+        self.item_index = {"1": 0}
+        self.batches = []
+        self.fail = fail
+        self.applied = threading.Event()
+
+    def apply_interactions(self, interactions, new_items):
+        if self.fail:
+            raise RuntimeError("boom")
+        self.batches.append((list(interactions), new_items))
+        self.applied.set()
+
+
+def test_micro_batches_and_loads_unknown_items():
+    recommender = FakeRecommender()
+    loaded = []
+    worker = InteractionUpdateWorker(
+        recommender, max_batch=2, flush_interval=60,
+        item_loader=lambda ids: loaded.append(ids) or [{"id": i} for i in ids],
+    )
+    for item_id in (1, 2, 3):
+        assert worker.submit({"user_id": 1, "item_id": item_id})
+    assert recommender.applied.wait(2)
+    worker.close()
+    assert [len(batch) for batch, _ in recommender.batches] == [2, 1]
+    assert loaded == [[2], [3]]
+    assert worker.stats() == {"pending": 0, "applied": 3, "dropped": 0, "failed": 0}
+
+
+def test_flush_interval_applies_partial_batches():
+    recommender = FakeRecommender()
+    worker = InteractionUpdateWorker(recommender, max_batch=100, flush_interval=0.01)
+    worker.submit({"user_id": 1, "item_id": 1})
+    assert recommender.applied.wait(2)
+    worker.close()
+
+
+def test_full_buffer_drops_and_failures_are_counted():
+    worker = InteractionUpdateWorker(FakeRecommender(fail=True), max_batch=1, max_buffer=1, flush_interval=60)
+    worker._start = lambda: None  # keep the batch buffered
+    assert worker.submit({"user_id": 1, "item_id": 1})
+    assert not worker.submit({"user_id": 1, "item_id": 1})
+    assert worker.flush() == 0
+    assert worker.stats() == {"pending": 0, "applied": 0, "dropped": 1, "failed": 1}
+    worker.close()
+    assert not worker.submit({"user_id": 1, "item_id": 1})
+
+
+def test_model_lock_writer_waits_for_readers():
+    lock = ModelLock()
+    order = []
+    with lock.read():
+        with lock.read():  # reentrant
+            pass
+        done = threading.Event()
+
+        def write():
+            with lock.write():
+                order.append("write")
+                with lock.read():  # the writer may read its own changes
+                    order.append("read in write")
+            done.set()
+
+        writer = threading.Thread(target=write)
+        writer.start()
+        assert not done.wait(0.05)
+        order.append("read")
+    assert done.wait(2)
+    writer.join()
+    assert order == ["read", "write", "read in write"]
@@ -0,0 +1,80 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+sparse = pytest.importorskip("scipy.sparse")
+pytest.importorskip("sklearn")
+pytest.importorskip("lightfm")
+
+from backend.recommendation_system.ann_index import mips_item_vectors  # noqa: E402
+from backend.recommendation_system.recommender import HybridRecommender  # noqa: E402
+
+ITEM_IDS = [10, 20, 35, 1000]
+
+
+def make_recommender(ann_index="brute"):
+    rng = np.random.default_rng(0)
+    recommender = HybridRecommender(ann_index=ann_index)
+    recommender.item_vectors = mips_item_vectors(
+        rng.normal(size=(len(ITEM_IDS), 4)).astype(np.float32), np.zeros(len(ITEM_IDS), dtype=np.float32)
+    )
+    recommender.user_embeddings = rng.normal(size=(2, 4)).astype(np.float32)
+    recommender.user_biases = np.zeros(2, dtype=np.float32)
+    recommender.item_content = sparse.identity(len(ITEM_IDS), format="csr")
+    recommender.user_index = {"7": 0, "8": 1}
+    recommender.item_index = {str(item_id): row for row, item_id in enumerate(ITEM_IDS)}
+    recommender.n_model_users, recommender.n_model_items = 2, len(ITEM_IDS)
+    recommender.index_vectors()
+    return recommender
+
+
+@pytest.mark.parametrize("ann_index", ["brute", "ivf"])
+def test_recommendations_use_external_item_ids(ann_index):
+    recommender = make_recommender(ann_index)
+    single = recommender.get_recommendations(7, n_recommendations=4)
+    assert sorted(r["item_id"] for r in single) == ITEM_IDS
+    [[(user_id, batch)]] = list(recommender.get_recommendations_batch([7], n_recommendations=4))
+    assert user_id == 7
+    assert [r["item_id"] for r in batch] == [r["item_id"] for r in single]
+
+
+def test_batch_buffer_grows_with_items_added_between_chunks():
+    recommender = make_recommender()
+    chunks = recommender.get_recommendations_batch([7, 8], n_recommendations=5, chunk_size=1)
+    [(_, first)] = next(chunks)
+    assert len(first) == len(ITEM_IDS)
+    with recommender._model_lock.write():
+        recommender.item_vectors = np.vstack([recommender.item_vectors, recommender.item_vectors[:1]])
+        recommender.item_content = sparse.identity(len(ITEM_IDS) + 1, format="csr")
+        recommender.item_index["2000"] = len(ITEM_IDS)
+        recommender.index_vectors()
+    [(_, second)] = next(chunks)
+    assert sorted(r["item_id"] for r in second) == ITEM_IDS + [2000]
+
+
+class OneHotText:
+    def transform(self, texts):
+        rows = [len(text) % len(ITEM_IDS) for text in texts]
+        return sparse.csr_matrix((np.ones(len(rows)), (range(len(rows)), rows)), shape=(len(rows), len(ITEM_IDS)))
+
+
+def test_batch_content_scores_match_single_in_small_blocks(monkeypatch):
+    recommender = make_recommender()
+    recommender.content_model = OneHotText()
+    interactions = {7: [{"title": "ab"}], 8: [{"title": "abc"}, {"title": "a"}]}
+    recommender.get_user_interactions = lambda user_id: interactions.get(user_id, [])
+    monkeypatch.setattr("backend.recommendation_system.recommender.CONTENT_BLOCK_BYTES", 8 * len(ITEM_IDS))
+    [batch] = list(recommender.get_recommendations_batch([7, 8, 9], n_recommendations=4))
+    for user_id, recommendations in batch:
+        single = recommender.get_recommendations(user_id, n_recommendations=4)
+        assert [r["item_id"] for r in recommendations] == [r["item_id"] for r in single]
+        assert np.allclose([r["score"] for r in recommendations], [r["score"] for r in single], atol=1e-5)
+
+
+def test_candidate_scoring_reuses_thread_buffers():
+    recommender = make_recommender()
+    items = np.array([3, 1])
+    expected = 0.7 * (recommender.item_vectors[items] @ np.append(recommender.user_embeddings[0], 1.0))
+    assert np.allclose(recommender.score_items(7, [], items), expected, atol=1e-5)
+    buffer = recommender._buffers.vectors
+    recommender.score_items(8, [], np.array([0, 2]))
+    assert recommender._buffers.vectors is buffer
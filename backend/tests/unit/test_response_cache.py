@@ -0,0 +1,122 @@
+import asyncio
+
+from backend.core.middleware.response_cache import (
+    CachePolicy,
+    ResponseCacheMiddleware,
+    etag_matches,
+    make_etag,
+)
+
+
+def make_app(calls, status=200, headers=()):
+    async def app(scope, receive, send):
+        calls.append(scope["path"])
+        body = f"{scope['path']}?{scope['query_string'].decode()}#{len(calls)}".encode()
+        await send({"type": "http.response.start", "status": status,
+                    "headers": [(b"content-type", b"text/plain")] + list(headers)})
+        await send({"type": "http.response.body", "body": body[:3], "more_body": True})
+        await send({"type": "http.response.body", "body": body[3:]})
+    return app
+
+
+def request(middleware, path, query=b"", method="GET", headers=()):
+    scope = {"type": "http", "method": method, "path": path,
+             "query_string": query, "headers": list(headers)}
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(middleware(scope, receive, send))
+    start = sent[0]
+    body = b"".join(m.get("body", b"") for m in sent[1:])
+    return start["status"], dict(start["headers"]), body
+
+
+def test_hit_skips_handler_and_query_order_is_ignored():
+    calls = []
+    mw = ResponseCacheMiddleware(make_app(calls), {"/api": CachePolicy(ttl=60)})
+    status, headers, body = request(mw, "/api/items", b"a=1&b=2")
+    assert status == 200 and headers[b"x-cache"] == b"MISS"
+    assert headers[b"etag"] == make_etag(body)
+    assert headers[b"cache-control"] == b"private, max-age=60"
+    status, headers, cached = request(mw, "/api/items", b"b=2&a=1")
+    assert headers[b"x-cache"] == b"HIT" and cached == body
+    assert calls == ["/api/items"]
+
+
+def test_if_none_match_returns_304():
+    calls = []
+    mw = ResponseCacheMiddleware(make_app(calls), {"/api": CachePolicy()})
+    _, headers, _ = request(mw, "/api/x")
+    status, headers_304, body = request(mw, "/api/x", headers=[(b"if-none-match", headers[b"etag"])])
+    assert status == 304 and body == b""
+    assert headers_304[b"etag"] == headers[b"etag"]
+    assert etag_matches(b'W/' + headers[b"etag"] + b', "other"', headers[b"etag"])
+    assert not etag_matches(b'"other"', headers[b"etag"])
+
+
+def test_entries_are_per_subject_unless_policy_is_public():
+    calls = []
+    mw = ResponseCacheMiddleware(make_app(calls), {
+        "/api": CachePolicy(),
+        "/api/public": CachePolicy(per_user=False),
+    })
+    alice = [(b"authorization", b"Bearer alice")]
+    bob = [(b"authorization", b"Bearer bob")]
+    request(mw, "/api/me", headers=alice)
+    request(mw, "/api/me", headers=bob)
+    request(mw, "/api/public/list", headers=alice)
+    request(mw, "/api/public/list", headers=bob)
+    assert calls == ["/api/me", "/api/me", "/api/public/list"]
+
+
+def test_uncacheable_requests_pass_through():
+    calls = []
+    mw = ResponseCacheMiddleware(make_app(calls), {"/api": CachePolicy()})
+    request(mw, "/api/x", method="POST")
+    request(mw, "/api/x", method="POST")
+    request(mw, "/other")
+    request(mw, "/other")
+    assert len(calls) == 4
+
+    errors = ResponseCacheMiddleware(make_app(calls, status=500), {"/api": CachePolicy()})
+    assert request(errors, "/api/x")[0] == 500
+    request(errors, "/api/x")
+    no_store = ResponseCacheMiddleware(
+        make_app(calls, headers=[(b"cache-control", b"no-store")]), {"/api": CachePolicy()}
+    )
+    _, headers, body = request(no_store, "/api/x")
+    request(no_store, "/api/x")
+    assert len(calls) == 8 and b"etag" not in headers and body.startswith(b"/api/x")
+
+
+def test_large_bodies_are_streamed_not_stored():
+    calls = []
+    mw = ResponseCacheMiddleware(make_app(calls), {"/api": CachePolicy(max_body_bytes=4)})
+    _, _, body = request(mw, "/api/large")
+    request(mw, "/api/large")
+    assert body == b"/api/large?#1" and len(calls) == 2
+
+
+def test_head_shares_entry_without_body():
+    calls = []
+    mw = ResponseCacheMiddleware(make_app(calls), {"/api": CachePolicy()})
+    request(mw, "/api/x")
+    status, headers, body = request(mw, "/api/x", method="HEAD")
+    assert status == 200 and body == b"" and headers[b"x-cache"] == b"HIT"
+
+
+def test_vary_lists_every_keyed_header():
+    calls = []
+    mw = ResponseCacheMiddleware(
+        make_app(calls, headers=[(b"vary", b"Accept-Encoding")]),
+        {"/api": CachePolicy(), "/api/public": CachePolicy(per_user=False)},
+    )
+    _, headers, _ = request(mw, "/api/x")
+    assert headers[b"vary"] == b"accept-encoding, accept-language, authorization, cookie"
+    _, headers, _ = request(mw, "/api/public/x")
+    assert headers[b"vary"] == b"accept-encoding, accept-language"
@@ -0,0 +1,31 @@
+import pytest
+
+from sss.zero_system import DigitalDNA, MindfulEmbodimentSkill, TrueDigitalFriendshipSkill
+
+
+def test_mindful_response_is_a_fresh_copy_of_the_table():
+    skill = MindfulEmbodimentSkill()
+    first = skill.execute("صوت مرح")
+    first["output"] = "changed"
+    assert skill.execute("صوت مرح")["output"] == "يا سلام! خلينا نستمتع ونفكر بطريقة ممتعة!"
+    assert skill.execute("صوت")["voice_style"] == "صوت هادئ وواضح"
+    with pytest.raises(TypeError):
+        skill.responses["default"]["output"] = "x"
+
+
+def test_friendship_tiers():
+    skill = TrueDigitalFriendshipSkill()
+    outputs = [skill.execute({"id": "u", "name": "سارة"})["output"] for _ in range(7)]
+    assert outputs[0] == "مرحباً سارة! كيف يمكنني مساعدتك اليوم؟ 🌟"
+    assert outputs[2] == "سارة العزيز، كيف تسير الأمور؟"
+    assert outputs[6] == "يا سارة، صديقي الحقيقي! دائماً هنا من أجلك 💖"
+
+
+def test_dna_digest_is_memoized_until_values_change():
+    dna = DigitalDNA()
+    digest = dna.backup()
+    assert dna.backup() is digest
+    dna.core_values = dna.core_values + ("الفضول",)
+    assert dna.backup() != digest
+    with pytest.raises(AttributeError):
+        dna.ethics_rules.append("x")
@@ -0,0 +1,49 @@
+from backend.core.skill_registry import SkillRegistry
+from sss.zero_system import ZeroSystem
+
+
+def test_skills_are_built_on_first_use():
+    registry = SkillRegistry()
+    created = []
+
+    class Skill:
+        def __init__(self):
+            created.append(self)
+
+    registry.register("s", Skill)
+    assert "s" in registry and not registry.is_loaded("s")
+    assert created == []
+    skill = registry["s"]
+    assert registry["s"] is skill and len(created) == 1
+    assert registry.stats()["s"]["loaded"]
+
+
+def test_register_import_spec():
+    registry = SkillRegistry()
+    registry.register("calculator", "plugin_example:CalculatorPlugin")
+    assert registry["calculator"].execute({"a": 1, "b": 2}) == {"result": 3}
+    assert registry.stats()["calculator"]["import_time"] >= 0
+
+
+def test_discover_plugin_directory(tmp_path):
+    (tmp_path / "echo.py").write_text(
+        "class Echo:\n"
+        "    def execute(self, text):\n"
+        "        return {'output': text}\n"
+        "SKILL = Echo\n",
+        encoding="utf-8",
+    )
+    (tmp_path / "_private.py").write_text("raise RuntimeError\n", encoding="utf-8")
+    registry = SkillRegistry()
+    assert registry.discover_directory(str(tmp_path)) == ["echo"]
+    assert not registry.is_loaded("echo")
+    assert registry["echo"].execute("hi") == {"output": "hi"}
+
+
+def test_zero_system_loads_only_triggered_skills():
+    system = ZeroSystem()
+    assert not any(s["loaded"] for s in system.skills.stats().values())
+    system.interact("صوت هادئ من فضلك")
+    assert system.skills.is_loaded("mindful_embodiment")
+    assert not system.skills.is_loaded("sibling_genesis")
+    assert not system.skills.is_loaded("empathy_sensor")
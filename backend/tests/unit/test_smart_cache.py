@@ -0,0 +1,153 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("redis")
+cache_module = pytest.importorskip("backend.core.cache")
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def __getattr__(self, name):
+        def queue(*args):
+            self.commands.append((name, args))
+            return self
+        return queue
+
+    def execute(self):
+        results = [getattr(self.redis, name)(*args) for name, args in self.commands]
+        self.commands = []
+        return results
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+        self.sorted_sets = {}
+
+    def pipeline(self, transaction=False):
+        return FakePipeline(self)
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def pttl(self, key):
+        return 60000 if key in self.data else -2
+
+    def setex(self, key, ttl, value):
+        self.data[key] = value
+
+    def zadd(self, key, mapping):
+        self.sorted_sets.setdefault(key, {}).update(mapping)
+
+    def zremrangebyscore(self, key, low, high):
+        members = self.sorted_sets.get(key, {})
+        for member, score in list(members.items()):
+            if float(low) <= score <= float(high):
+                del members[member]
+
+    def zrangebyscore(self, key, low, high):
+        members = self.sorted_sets.get(key, {})
+        return sorted(m.encode() for m, s in members.items() if float(low) <= s <= float(high))
+
+    def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+            self.sorted_sets.pop(key, None)
+
+    def expire(self, key, ttl):
+        pass
+
+    def publish(self, channel, message):
+        pass
+
+
+def make_cache():
+    cache = cache_module.SmartCache(FakeRedis())
+    cache._subscriber = False  # no pub/sub thread in tests
+    return cache
+
+
+def test_l1_hits_return_independent_copies():
+    cache = make_cache()
+    cache.set("k", {"items": [1, 2]})
+    first, layer = cache._lookup("k")
+    assert layer == "l1"
+    first["items"].append(3)
+    second, _ = cache._lookup("k")
+    assert second == {"items": [1, 2]}
+    assert second is not first
+
+
+def test_l2_values_are_copied_into_l1_encoded():
+    cache = make_cache()
+    cache.redis.data["k"] = cache.codec.encode(["a"])
+    value, layer = cache._lookup("k")
+    assert layer == "l2"
+    value.append("b")
+    assert cache._lookup("k") == (["a"], "l1")
+
+
+def test_tag_index_drops_expired_members(monkeypatch):
+    cache = make_cache()
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "time", lambda: now[0])
+    cache.set("old", 1, ttl=10, tags=["ns:recs"])
+    now[0] += 60
+    cache.set("new", 2, ttl=10, tags=["ns:recs"])
+    assert set(cache.redis.sorted_sets["cache:tags:ns:recs"]) == {"new"}
+    assert cache.invalidate_tags("ns:recs") == 1
+    assert "new" not in cache.redis.data
+
+
+class FakePubSub:
+    def __init__(self, threads, gate):
+        self.threads = threads
+        self.gate = gate
+
+    def subscribe(self, **handlers):
+        self.threads.append(threading.current_thread())
+        assert self.gate.wait(2)  # a slow Redis
+
+    def run_in_thread(self, sleep_time, daemon):
+        return self
+
+
+class FakeAsyncPipeline(FakePipeline):
+    async def execute(self):
+        return FakePipeline.execute(self)
+
+
+class FakeAsyncRedis(FakeRedis):
+    def pipeline(self, transaction=False):
+        return FakeAsyncPipeline(self)
+
+    async def publish(self, channel, message):
+        pass
+
+
+def test_async_path_subscribes_off_the_event_loop():
+    subscribed, gate = [], threading.Event()
+    redis = FakeRedis()
+    redis.pubsub = lambda ignore_subscribe_messages: FakePubSub(subscribed, gate)
+    cache = cache_module.SmartCache(redis, FakeAsyncRedis())
+
+    async def first_request():
+        await cache.aset("k", 1)
+        assert await cache._alookup("k") == (1, "l2")  # not kept in L1 before subscribing
+        return threading.current_thread()
+
+    loop_thread = asyncio.run(first_request())
+    gate.set()
+    for _ in range(100):
+        if cache._subscriber:
+            break
+        time.sleep(0.01)
+    assert subscribed and subscribed[0] is not loop_thread
+    assert asyncio.run(cache._alookup("k")) == (1, "l2")
+    assert asyncio.run(cache._alookup("k")) == (1, "l1")
@@ -21,7 +21,7 @@ def test_create_sibling_increments_count():
 
 
 def test_interact_sibling(caplog):
-    system = ZeroSystem()
+    system = ZeroSystem(echo=True)
     buf = io.StringIO()
     with caplog.at_level(logging.INFO), contextlib.redirect_stdout(buf):
         response = system.interact("أريد أخاً صغيراً")
@@ -29,3 +29,11 @@ def test_interact_sibling(caplog):
     assert "المستخدم: أريد أخاً صغيراً" in captured
     assert response["sibling_id"] == "أخ رقمي #1"
     assert "Triggering sibling_genesis skill" in "\n".join(caplog.messages)
+
+
+def test_interact_is_silent_outside_cli_mode():
+    system = ZeroSystem()
+    buf = io.StringIO()
+    with contextlib.redirect_stdout(buf):
+        system.interact("مرحبا")
+    assert buf.getvalue() == ""
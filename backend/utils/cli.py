@@ -2,11 +2,13 @@
 
 import argparse
 import logging
-from typing import Optional
-from zero_system import ZeroSystem
+from typing import TYPE_CHECKING, Optional
 
+if TYPE_CHECKING:
+    from zero_system import ZeroSystem
 
-def run_interactive(system: ZeroSystem) -> None:
+
+def run_interactive(system: "ZeroSystem") -> None:
     """Launch an interactive chat loop."""
     print("=== Zero System CLI ===")
     system.dna.show_dna()
@@ -42,14 +44,20 @@ def main(argv: Optional[list[str]] = None) -> None:
         format="%(asctime)s - %(levelname)s - %(message)s",
     )
 
-    system = ZeroSystem()
+    # Imported here so that ``--help`` and argument errors stay instant.
+    from zero_system import ZeroSystem
+
+    system = ZeroSystem(echo=True)
 
-    if args.command == "interactive":
-        run_interactive(system)
-    elif args.command == "status":
-        print(system.system_status())
-    elif args.command == "demo":
-        system.demo_usage_examples()
+    try:
+        if args.command == "interactive":
+            run_interactive(system)
+        elif args.command == "status":
+            print(system.system_status())
+        elif args.command == "demo":
+            system.demo_usage_examples()
+    finally:
+        system.close()
 
 
 if __name__ == "__main__":
@@ -1,16 +1,25 @@
-import json
 import os
 from datetime import datetime
 
+from backend.core.log_sink import get_log_sink
+
+
 class ZeroSystemLogger:
     """Minimal logger used for tests."""
 
     def __init__(self, filename="mood.jsonl"):
         self.filename = filename
 
+    @property
+    def path(self):
+        return self.filename if os.path.isabs(self.filename) else os.path.join(os.path.dirname(__file__), self.filename)
+
     def log_mood(self, mood):
-        path = self.filename if os.path.isabs(self.filename) else os.path.join(os.path.dirname(__file__), self.filename)
         entry = {"time": datetime.now().isoformat(), "mood": mood}
-        with open(path, "a", encoding="utf-8") as f:
-            json.dump(entry, f, ensure_ascii=False)
-            f.write("\n")
+        get_log_sink(self.path).write(entry)
+
+    def flush(self):
+        get_log_sink(self.path).flush()
+
+    def close(self):
+        get_log_sink(self.path).close()